@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from api.blog.stats import connect_stats_rollup
+        from api.core.cache import connect_cache_invalidation
+        from api.core.conditional import connect_conditional_touch
+        from api.search.index import connect_search_indexing
+        connect_cache_invalidation()
+        connect_conditional_touch()
+        connect_stats_rollup()
+        connect_search_indexing()
@@ -1,9 +1,17 @@
 from django.db import models
+from django.db.models import Count, Prefetch, Q
 from django.utils.text import slugify
 import shortuuid
 from api.core.models import User, Profile
 
 
+class CategoryQuerySet(models.QuerySet):
+    def with_post_count(self):
+        """附带作者信息和文章数，避免序列化时逐条查询"""
+        return self.select_related('user__profile__role').annotate(
+            post_count=Count('posts', distinct=True))
+
+
 class Category(models.Model):
     title = models.CharField(max_length=100)
     image = models.URLField(max_length=500, null=True, blank=True)
@@ -11,6 +19,8 @@ class Category(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, null=True, blank=True)
 
+    objects = CategoryQuerySet.as_manager()
+
     class Meta:
         db_table = 'api_category'
         verbose_name_plural = "Categories"
@@ -24,6 +34,26 @@ class Category(models.Model):
         super(Category, self).save(*args, **kwargs)
 
 
+class PostQuerySet(models.QuerySet):
+    def with_related(self, translations=None):
+        """
+        预加载 PostSerializer 用到的全部关联数据，查询数与结果条数无关
+
+        Args:
+            translations: 可选的 PostTranslation 查询集，用于只加载部分语言或字段
+        """
+        return self.select_related(
+            'user__profile__role',
+            'profile__user',
+            'profile__role',
+        ).prefetch_related(
+            Prefetch('category', queryset=Category.objects.with_post_count()),
+            Prefetch('translations', queryset=translations)
+            if translations is not None else 'translations',
+            'likes',
+        )
+
+
 class Post(models.Model):
     STATUS = (
         ('Active', 'Active'),
@@ -41,13 +71,29 @@ class Post(models.Model):
     status = models.CharField(max_length=100, choices=STATUS, default='Draft')
     views = models.IntegerField(default=0)
     likes = models.ManyToManyField(User, related_name='likes_user', blank=True)
+    # 点赞数，由点赞的 m2m_changed 信号用 F() 维护，仪表盘按它取热门文章
+    like_count = models.IntegerField(default=0, editable=False)
     date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     need_ai_generate = models.BooleanField(default=False)
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         db_table = 'api_post'
         ordering = ['-date']
         verbose_name_plural = "Posts"
+        indexes = [
+            # 公开列表只查 Active，按 -date, id 排序（与游标分页的键一致）
+            models.Index(fields=['-date', 'id'], condition=Q(status='Active'),
+                         name='post_active_date_idx'),
+            models.Index(fields=['category', '-date'], condition=Q(status='Active'),
+                         name='post_active_category_date_idx'),
+            models.Index(fields=['status', '-date'], name='post_status_date_idx'),
+            # 作者后台的文章列表按 -id 排序
+            models.Index(fields=['user', '-id'], name='post_user_id_idx'),
+            models.Index(fields=['user', '-like_count', '-date'], name='post_user_popular_idx'),
+        ]
 
     def __str__(self):
         return str(self.slug)
@@ -55,6 +101,13 @@ class Post(models.Model):
     def save(self, *args, **kwargs):
         if self.slug is None or self.slug == "":
             self.slug = shortuuid.ShortUUID().random(length=8)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # like_count 只由信号更新，实例中的值可能已过期，保存时不写回
+            deferred = self.get_deferred_fields() | {'like_count'}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+            ]
         super(Post, self).save(*args, **kwargs)
 
 
@@ -72,6 +125,10 @@ class PostTranslation(models.Model):
     description = models.TextField(null=True, blank=True)
     content = models.TextField()
     is_ai_generated = models.BooleanField(default=False)
+    # AI 翻译时各字段的原文哈希和译文哈希，用于增量翻译和识别人工修改
+    source_hashes = models.JSONField(default=dict, blank=True)
+    translated_hashes = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'api_posttranslation'
@@ -108,6 +165,9 @@ class Bookmark(models.Model):
     class Meta:
         db_table = 'api_bookmark'
         verbose_name_plural = "Bookmarks"
+        indexes = [
+            models.Index(fields=['user', 'post'], name='bookmark_user_post_idx'),
+        ]
 
 
 class Notification(models.Model):
@@ -130,3 +190,55 @@ class Notification(models.Model):
     class Meta:
         db_table = 'api_notification'
         verbose_name_plural = "Notifications"
+        indexes = [
+            # 通知列表只查未读
+            models.Index(fields=['user', '-date'], condition=Q(seen=False),
+                         name='notification_user_unseen_idx'),
+        ]
+
+
+class AuthorDailyStats(models.Model):
+    """
+    作者每日统计汇总，由文章、点赞、收藏、评论事件增量维护，仪表盘直接读取
+
+    点赞、收藏、评论按事件发生日计入，浏览量按写回当天计入；删除文章时，
+    其点赞数和浏览量从发布当天扣减。
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    posts = models.IntegerField(default=0)
+    likes = models.IntegerField(default=0)
+    views = models.IntegerField(default=0)
+    bookmarks = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'api_author_daily_stats'
+        unique_together = ('user', 'day')
+        verbose_name_plural = "Author daily stats"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.day}"
+
+
+class AuthorCategoryStats(models.Model):
+    """
+    作者在各分类下的文章数和点赞数，由文章、点赞事件增量维护
+
+    仪表盘的分类统计直接读取，不再加载作者的全部文章。没有分类的文章不计入。
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='category_stats')
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name='author_stats')
+    posts = models.IntegerField(default=0)
+    likes = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'api_author_category_stats'
+        unique_together = ('user', 'category')
+        verbose_name_plural = "Author category stats"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.category_id}"
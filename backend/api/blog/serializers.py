@@ -14,6 +14,8 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ["id", "title", "image", "slug", "post_count", "user"]
 
     def get_post_count(self, category):
+        if hasattr(category, 'post_count'):
+            return category.post_count
         return category.posts.count()
 
     def get_image(self, obj):
@@ -32,6 +34,9 @@ class PostSerializer(serializers.ModelSerializer):
     translations = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
 
+    translation_fields = ['title', 'description', 'content', 'is_ai_generated']
+    translation_heavy_fields = ['content']
+
     class Meta:
         model = Post
         fields = [
@@ -39,29 +44,36 @@ class PostSerializer(serializers.ModelSerializer):
             'status', 'views', 'likes', 'date', 'translations', 'need_ai_generate'
         ]
 
+    def nested(self, serializer_class, obj):
+        """
+        序列化关联对象；列表中各文章共用同一个子序列化器，
+        同一作者、分类只序列化一次，不再为每篇文章重新构建嵌套序列化器
+        """
+        if obj is None:
+            return None
+        cache = self.__dict__.setdefault('_nested_data', {})
+        key = (serializer_class, obj.pk)
+        if key not in cache:
+            cache[key] = serializer_class(obj, context=self.context).data
+        return cache[key]
+
     def get_user(self, obj):
-        return UserSerializer(obj.user, context=self.context).data
+        return self.nested(UserSerializer, obj.user)
 
     def get_profile(self, obj):
-        if obj.profile:
-            return ProfileSerializer(obj.profile, context=self.context).data
-        return None
+        return self.nested(ProfileSerializer, obj.profile)
 
     def get_category(self, obj):
-        if obj.category:
-            return CategorySerializer(obj.category, context=self.context).data
-        return None
+        return self.nested(CategorySerializer, obj.category)
 
     def get_image(self, obj):
         return get_file_url(obj, 'image', self.context.get('request'))
 
     def get_translations(self, obj):
+        fields = self.context.get('translation_fields', self.translation_fields)
         return {
             t.language: {
-                "title": t.title,
-                "description": t.description,
-                "content": t.content,
-                "is_ai_generated": t.is_ai_generated,
+                field: getattr(t, field) for field in fields
             } for t in obj.translations.all()
         }
 
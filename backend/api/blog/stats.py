@@ -0,0 +1,324 @@
+from collections import OrderedDict, defaultdict
+from datetime import datetime, time, timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import Count, F
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.utils import timezone
+
+from api.blog.models import (
+    AuthorCategoryStats, AuthorDailyStats, Bookmark, Category, Comment, Post)
+
+
+def bump_author_stats(user_id, day, create=True, **deltas):
+    """
+    按增量更新作者某天的汇总，deltas 如 posts=1、likes=-2
+
+    扣减已有事件时传 create=False，只更新事件发生当天已存在的行，
+    避免级联删除作者时又插入新行。
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not user_id or not deltas:
+        return
+
+    rows = AuthorDailyStats.objects.filter(user_id=user_id, day=day)
+    if create:
+        row, _ = AuthorDailyStats.objects.get_or_create(
+            user_id=user_id, day=day)
+        rows = AuthorDailyStats.objects.filter(pk=row.pk)
+    rows.update(**{field: F(field) + delta for field, delta in deltas.items()})
+
+
+def bump_category_stats(user_id, category_id, create=True, **deltas):
+    """按增量更新作者在某分类下的汇总，没有分类时忽略"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not user_id or not category_id or not deltas:
+        return
+
+    rows = AuthorCategoryStats.objects.filter(
+        user_id=user_id, category_id=category_id)
+    if create:
+        row, _ = AuthorCategoryStats.objects.get_or_create(
+            user_id=user_id, category_id=category_id)
+        rows = AuthorCategoryStats.objects.filter(pk=row.pk)
+    rows.update(**{field: F(field) + delta for field, delta in deltas.items()})
+
+
+def on_post_loaded(sender, instance, **kwargs):
+    # 记下加载时的分类，保存时判断是否需要在分类汇总间移动；
+    # 用 __dict__ 读取，only() 延迟加载时不触发查询
+    instance._loaded_category_id = instance.__dict__.get('category_id')
+
+
+def on_post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        bump_author_stats(
+            instance.user_id, timezone.localdate(instance.date), posts=1,
+            views=instance.views)
+        bump_category_stats(instance.user_id, instance.category_id, posts=1)
+    else:
+        previous = getattr(instance, '_loaded_category_id', instance.category_id)
+        if previous != instance.category_id:
+            # 实例中的 like_count 可能已过期，以数据库为准
+            likes = Post.objects.filter(pk=instance.pk).values_list(
+                'like_count', flat=True).first() or 0
+            bump_category_stats(instance.user_id, previous, create=False,
+                                posts=-1, likes=-likes)
+            bump_category_stats(instance.user_id, instance.category_id,
+                                posts=1, likes=likes)
+    instance._loaded_category_id = instance.category_id
+
+
+def on_post_deleting(sender, instance, **kwargs):
+    # 级联删除点赞时不会发送 m2m_changed，在删除前从发布当天和所在分类扣减
+    likes, views = Post.objects.filter(pk=instance.pk).values_list(
+        'like_count', 'views').first() or (0, 0)
+    bump_author_stats(
+        instance.user_id, timezone.localdate(instance.date), create=False,
+        likes=-likes, views=-views)
+    bump_category_stats(instance.user_id, instance.category_id, create=False,
+                        posts=-1, likes=-likes)
+
+
+def on_post_deleted(sender, instance, **kwargs):
+    bump_author_stats(
+        instance.user_id, timezone.localdate(instance.date), create=False,
+        posts=-1)
+
+
+def on_likes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    点赞变化时更新文章的 like_count、作者当天和所在分类的点赞数
+
+    每个被点赞或取消点赞的文章计一次，记为 (文章 id, 作者 id, 分类 id)。
+    remove() 的 pk_set 是调用方传入的 id，不保证对应的点赞存在；pre_remove 时
+    锁定并记下实际存在的点赞行，并发取消同一个点赞时只有一方扣减。
+    """
+    fields = ('pk', 'user_id', 'category_id')
+    if action == 'pre_remove':
+        # remove() 在事务中发送信号并删除，锁会保持到删除提交
+        through = Post.likes.through.objects.select_for_update()
+        if reverse:
+            rows = through.filter(user_id=instance.pk, post_id__in=pk_set)
+            instance._removed_likes = list(rows.values_list('post_id', flat=True))
+        else:
+            rows = through.filter(post_id=instance.pk, user_id__in=pk_set)
+            instance._removed_likes = list(rows.values_list('user_id', flat=True))
+        return
+
+    if action == 'pre_clear':
+        # clear 之后拿不到被移除的点赞，先记下涉及的文章
+        if reverse:
+            instance._cleared_likes = list(
+                instance.likes_user.values_list(*fields))
+        else:
+            instance._cleared_likes = [
+                (instance.pk, instance.user_id, instance.category_id)] * instance.likes.count()
+        return
+
+    if action == 'post_clear':
+        liked = getattr(instance, '_cleared_likes', [])
+        sign = -1
+    elif action in ('post_add', 'post_remove'):
+        if action == 'post_remove':
+            pk_set = instance.__dict__.pop('_removed_likes', [])
+        if reverse:
+            # 从用户一侧修改时 pk_set 为文章
+            liked = list(Post.objects.filter(pk__in=pk_set).values_list(*fields))
+        else:
+            liked = [(instance.pk, instance.user_id, instance.category_id)] * len(pk_set)
+        sign = 1 if action == 'post_add' else -1
+    else:
+        return
+
+    post_counts = defaultdict(int)
+    author_counts = defaultdict(int)
+    category_counts = defaultdict(int)
+    for post_id, user_id, category_id in liked:
+        post_counts[post_id] += 1
+        author_counts[user_id] += 1
+        category_counts[(user_id, category_id)] += 1
+
+    for post_id, count in post_counts.items():
+        Post.objects.filter(pk=post_id).update(
+            like_count=F('like_count') + sign * count)
+    today = timezone.localdate()
+    for user_id, count in author_counts.items():
+        bump_author_stats(user_id, today, likes=sign * count)
+    for (user_id, category_id), count in category_counts.items():
+        bump_category_stats(user_id, category_id, likes=sign * count)
+
+
+def on_post_views_flushed(counts):
+    """
+    浏览量写回后计入作者当天的汇总，由 post_views 计数器调用
+
+    Args:
+        counts: {文章 slug: 本次写回的浏览次数}
+    """
+    author_views = defaultdict(int)
+    for slug, user_id in Post.objects.filter(slug__in=list(counts)).values_list('slug', 'user_id'):
+        author_views[user_id] += counts[slug]
+    today = timezone.localdate()
+    for user_id, views in author_views.items():
+        bump_author_stats(user_id, today, views=views)
+
+
+def make_post_event_handler(field, sign):
+    """收藏、评论的新增和删除，都计入其创建当天"""
+    def handler(sender, instance, created=True, raw=False, **kwargs):
+        if not created or raw:
+            return
+        author_id = Post.objects.filter(
+            pk=instance.post_id).values_list('user_id', flat=True).first()
+        bump_author_stats(
+            author_id, timezone.localdate(instance.date), create=sign > 0,
+            **{field: sign})
+    return handler
+
+
+def connect_stats_rollup():
+    """注册汇总表的事件处理，在 ApiConfig.ready 中调用"""
+    post_init.connect(on_post_loaded, sender=Post,
+                      dispatch_uid='author-stats:post-loaded')
+    post_save.connect(on_post_saved, sender=Post,
+                      dispatch_uid='author-stats:post-saved')
+    pre_delete.connect(on_post_deleting, sender=Post,
+                       dispatch_uid='author-stats:post-deleting')
+    post_delete.connect(on_post_deleted, sender=Post,
+                        dispatch_uid='author-stats:post-deleted')
+    m2m_changed.connect(on_likes_changed, sender=Post.likes.through,
+                        dispatch_uid='author-stats:likes')
+
+    for model, field in [(Bookmark, 'bookmarks'), (Comment, 'comments')]:
+        post_save.connect(make_post_event_handler(field, 1), sender=model,
+                          weak=False, dispatch_uid=f'author-stats:{field}-saved')
+        post_delete.connect(make_post_event_handler(field, -1), sender=model,
+                            weak=False, dispatch_uid=f'author-stats:{field}-deleted')
+
+
+def rebuild_author_stats(user_ids=None):
+    """
+    从原始数据重建汇总表
+
+    历史点赞和浏览量没有时间，计入文章发布当天；同时校正文章的 like_count。
+
+    Args:
+        user_ids: 只重建这些作者，默认全部
+    """
+    rows = defaultdict(lambda: defaultdict(int))
+    category_rows = defaultdict(lambda: defaultdict(int))
+
+    posts = Post.objects.all()
+    if user_ids is not None:
+        posts = posts.filter(user_id__in=user_ids)
+
+    counted = posts.annotate(liked=Count('likes', distinct=True)).values_list(
+        'pk', 'user_id', 'category_id', 'date', 'like_count', 'liked', 'views')
+    for pk, user_id, category_id, date, like_count, likes, views in counted:
+        if like_count != likes:
+            Post.objects.filter(pk=pk).update(like_count=likes)
+        day = timezone.localdate(date)
+        rows[(user_id, day)]['posts'] += 1
+        rows[(user_id, day)]['likes'] += likes
+        # 历史浏览量同样没有时间，计入发布当天
+        rows[(user_id, day)]['views'] += views
+        if category_id is not None:
+            category_rows[(user_id, category_id)]['posts'] += 1
+            category_rows[(user_id, category_id)]['likes'] += likes
+
+    for model, field in [(Bookmark, 'bookmarks'), (Comment, 'comments')]:
+        events = model.objects.filter(post__in=posts).values_list(
+            'post__user_id', 'date')
+        for user_id, date in events:
+            rows[(user_id, timezone.localdate(date))][field] += 1
+
+    for model in (AuthorDailyStats, AuthorCategoryStats):
+        existing = model.objects.all()
+        if user_ids is not None:
+            existing = existing.filter(user_id__in=user_ids)
+        existing.delete()
+
+    AuthorDailyStats.objects.bulk_create([
+        AuthorDailyStats(user_id=user_id, day=day, **counts)
+        for (user_id, day), counts in rows.items()
+    ])
+    AuthorCategoryStats.objects.bulk_create([
+        AuthorCategoryStats(user_id=user_id, category_id=category_id, **counts)
+        for (user_id, category_id), counts in category_rows.items()
+    ])
+    return len(rows)
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def get_author_dashboard_stats(user):
+    """
+    作者仪表盘统计，共四条查询，均不随作者的文章数增长：
+
+    1. 汇总表：文章 / 浏览 / 点赞 / 收藏 / 评论总数及按月、按日的发文数
+    2. 分类汇总表：各分类下作者的文章数和点赞数
+    3. 热门文章：按 (user, -like_count, -date) 索引取前五篇
+    4. 全部分类
+    """
+    today = timezone.localdate()
+    one_year_ago = today - timedelta(days=365)
+    first_month = today.replace(day=1) - relativedelta(months=11)
+
+    totals = defaultdict(int)
+    monthly = OrderedDict(
+        ((first_month + relativedelta(months=i)).strftime('%Y-%m'), 0)
+        for i in range(12)
+    )
+    daily = []
+
+    for row in AuthorDailyStats.objects.filter(user=user).order_by('day'):
+        for field in ('posts', 'views', 'likes', 'bookmarks', 'comments'):
+            totals[field] += getattr(row, field)
+        if row.posts <= 0:
+            continue
+        month = row.day.strftime('%Y-%m')
+        if month in monthly:
+            monthly[month] += row.posts
+        if row.day >= one_year_ago:
+            daily.append({"day": day_start(row.day), "count": row.posts})
+
+    category_stats = list(
+        AuthorCategoryStats.objects.filter(user=user, posts__gt=0)
+        .order_by('category_id')
+        .values('category_id', 'category__title', 'posts', 'likes')
+    )
+    post_counts = {row['category_id']: row['posts'] for row in category_stats}
+
+    popular_posts = (
+        Post.objects.filter(user=user)
+        .order_by('-like_count', '-date')
+        .values('id', 'slug', 'date', 'like_count', 'image')[:5]
+    )
+
+    categories = [
+        {**category, "post_count": post_counts.get(category['id'], 0)}
+        for category in Category.objects.values('id', 'title', 'slug')
+    ]
+
+    return {
+        "views": totals['views'],
+        "posts": totals['posts'],
+        "likes": totals['likes'],
+        "comments": totals['comments'],
+        "bookmarks": totals['bookmarks'],
+        "categories": categories,
+        "monthly_posts": [
+            {"month": month, "count": count} for month, count in monthly.items()
+        ],
+        "popular_posts": list(popular_posts),
+        "category_likes": [
+            {"title": row['category__title'], "like_count": row['likes']}
+            for row in category_stats
+        ],
+        "daily_posts": daily,
+    }
@@ -0,0 +1,430 @@
+from openai import OpenAI
+import os
+import time
+from bs4 import BeautifulSoup
+import logging
+import re
+import json
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from api.blog.models import Post, PostTranslation
+from api.core.metrics import DEEPSEEK_ERRORS, DEEPSEEK_LATENCY, record_token_usage
+from api.core.profiling import timed
+from api.core.translation import get_max_workers, record_translations, reuse_previous_translations
+from api.core.translation_memory import translation_memory
+
+logger = logging.getLogger(__name__)
+
+# 修改对应提示词时需要提升版本号，使旧的翻译记忆失效
+OPENAI_PROMPT_VERSION = 'openai-v1'
+SEGMENT_PROMPT_VERSION = 'segment-v2'
+
+DEFAULT_BATCH_TOKENS = 1500
+CJK_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]')
+# TipTap 中不翻译的节点和标记
+TIPTAP_SKIP_NODES = {'codeBlock'}
+TIPTAP_SKIP_MARKS = {'code'}
+# 每波翻译的文本节点数，波内按 token 预算分批并发
+TIPTAP_WAVE_SIZE = 500
+SEGMENT_MARKER = re.compile(r'^[ \t]*<<<(\d+)>>>[ \t]*', re.MULTILINE)
+
+# OpenAI 客户端配置
+client = OpenAI(
+    api_key=os.environ.get("DEEPSEEK_API_KEY"),
+    base_url="https://api.deepseek.com",
+    timeout=90.0
+)
+
+
+def clean_translated_content(text):
+    """清理翻译结果中的代码块标记"""
+    if not text:
+        return text
+
+    # 移除 Markdown 代码块标记
+    text = re.sub(r'^```(?:json|html|xml)?\s*\n', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\n```$', '', text, flags=re.MULTILINE)
+
+    # 移除首尾空白
+    text = text.strip()
+
+    return text
+
+
+def estimate_tokens(text):
+    """粗略估算 token 数：中日韩字符按 1 个计，其余字符按 4 个字符 1 个计"""
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+def get_batch_tokens():
+    """每批片段的 token 预算，可通过环境变量 TRANSLATION_BATCH_TOKENS 配置"""
+    try:
+        return max(100, int(os.getenv('TRANSLATION_BATCH_TOKENS', DEFAULT_BATCH_TOKENS)))
+    except ValueError:
+        return DEFAULT_BATCH_TOKENS
+
+
+def request_translation(text, target_lang, source_lang="zh"):
+    """调用 DeepSeek 接口翻译一段文本，带重试，不使用翻译记忆"""
+    # 优化 prompt，明确要求不要添加代码块
+    prompt = f"将以下{source_lang}文本翻译为{target_lang}。注意：\n1. 只返回翻译后的纯文本\n2. 不要添加任何代码块标记（如 ```json 或 ```）\n3. 不要添加任何解释说明\n4. 保持原文格式\n\n原文：\n{text}"
+
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            with DEEPSEEK_LATENCY.time(operation='text'):
+                response = client.chat.completions.create(
+                    model="deepseek-chat",
+                    messages=[
+                        {"role": "system", "content": "你是一个专业翻译助手。只返回翻译结果，不要添加代码块标记或任何其他内容。"},
+                        {"role": "user", "content": prompt}
+                    ],
+                    timeout=60.0
+                )
+            record_token_usage(response.usage)
+
+            result = response.choices[0].message.content.strip()
+
+            # 清理可能的代码块标记
+            return clean_translated_content(result)
+
+        except Exception as e:
+            DEEPSEEK_ERRORS.inc(operation='text')
+            if attempt < max_retries - 1:
+                time.sleep((attempt + 1) * 2)
+            else:
+                logger.error(
+                    f"Translation failed after {max_retries} attempts: {str(e)}")
+                raise
+
+    return ""
+
+
+@timed('deepseek')
+def call_openai_translate(text, target_lang, source_lang="zh"):
+    """使用 DeepSeek 接口翻译，优先使用翻译记忆，超长文本按行分批翻译"""
+    if not text or not text.strip():
+        return ""
+
+    cached = translation_memory.get(
+        text, source_lang, target_lang, OPENAI_PROMPT_VERSION)
+    if cached is not None:
+        return cached
+
+    if estimate_tokens(text) > get_batch_tokens():
+        # 不截断：按行拆成片段批量翻译
+        lines = text.split("\n")
+        indexes = [i for i, line in enumerate(lines) if line.strip()]
+        translated = translate_segments(
+            [lines[i] for i in indexes], target_lang, source_lang)
+        if any(value is None for value in translated):
+            raise RuntimeError("Long text translation failed")
+        for i, value in zip(indexes, translated):
+            lines[i] = value
+        result = "\n".join(lines)
+    else:
+        result = request_translation(text, target_lang, source_lang)
+
+    translation_memory.set(
+        text, source_lang, target_lang, OPENAI_PROMPT_VERSION, result)
+    return result
+
+
+def build_segment_batches(segments, max_tokens):
+    """
+    按 token 预算把片段依次打包成批
+
+    Returns:
+        片段下标列表的列表；单个超出预算的片段独占一批
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+
+    for index, segment in enumerate(segments):
+        tokens = estimate_tokens(segment)
+        if current and current_tokens + tokens > max_tokens:
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_segment_batch(content, ids):
+    """
+    解析带编号的批量译文
+
+    Returns:
+        {编号: 译文}，编号与请求不一致时返回 None
+    """
+    parts = SEGMENT_MARKER.split(content)
+    # split 结果为 [前缀, 编号, 译文, 编号, 译文, ...]
+    result = {}
+    for i in range(1, len(parts) - 1, 2):
+        result[int(parts[i])] = parts[i + 1].strip()
+
+    if sorted(result) != sorted(ids) or not all(result.values()):
+        return None
+    return result
+
+
+def request_segment_batch(batch, target_lang, source_lang):
+    """
+    翻译一批带编号的片段，返回的编号与请求不一致时拆成两半分别重试
+
+    接口错误（超时、限流、服务不可用）不拆分，直接抛出，由任务退避后重试，
+    避免故障期间把一批请求放大成逐段请求。
+
+    Args:
+        batch: [(编号, 原文)]
+
+    Returns:
+        {编号: 译文}
+    """
+    if len(batch) == 1:
+        segment_id, segment = batch[0]
+        return {segment_id: request_translation(segment, target_lang, source_lang)}
+
+    combined_text = "\n".join(
+        f"<<<{segment_id}>>>\n{segment}" for segment_id, segment in batch)
+    prompt = f"将以下{source_lang}文本翻译为{target_lang}。每段以 <<<编号>>> 开头，请保留所有编号标记及顺序，逐段翻译，不要合并或拆分段落。\n\n{combined_text}"
+
+    try:
+        with DEEPSEEK_LATENCY.time(operation='segments'):
+            response = client.chat.completions.create(
+                model="deepseek-chat",
+                messages=[
+                    {"role": "system", "content": "你是一个专业翻译助手。只返回翻译结果，保留 <<<编号>>> 标记。不要添加代码块标记。"},
+                    {"role": "user", "content": prompt}
+                ],
+                timeout=90.0
+            )
+    except Exception:
+        DEEPSEEK_ERRORS.inc(operation='segments')
+        raise
+    record_token_usage(response.usage)
+    content = clean_translated_content(
+        response.choices[0].message.content)
+    result = parse_segment_batch(
+        content, [segment_id for segment_id, _ in batch])
+    if result is not None:
+        return result
+    logger.warning(
+        f"Segment batch mismatch for {len(batch)} segments, splitting")
+
+    middle = len(batch) // 2
+    result = request_segment_batch(batch[:middle], target_lang, source_lang)
+    result.update(request_segment_batch(
+        batch[middle:], target_lang, source_lang))
+    return result
+
+
+@timed('deepseek')
+def translate_segments(segments, target_lang, source_lang="zh"):
+    """
+    翻译文本片段列表，已在翻译记忆中的片段不再请求接口
+
+    未命中的片段按 token 预算打包成带编号的批次并发翻译，
+    译文数量不符的批次会拆分重试，接口错误直接抛出。
+
+    Returns:
+        与 segments 等长的译文列表
+    """
+    results = translation_memory.get_many(
+        [(segment, source_lang, target_lang) for segment in segments],
+        SEGMENT_PROMPT_VERSION
+    )
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+
+    batches = [
+        [(pending[i], segments[pending[i]]) for i in batch]
+        for batch in build_segment_batches(
+            [segments[i] for i in pending], get_batch_tokens())
+    ]
+
+    translated = {}
+    error = None
+    with ThreadPoolExecutor(max_workers=min(get_max_workers(), len(batches))) as executor:
+        futures = [
+            executor.submit(request_segment_batch, batch, target_lang, source_lang)
+            for batch in batches
+        ]
+        for future in futures:
+            try:
+                translated.update(future.result())
+            except Exception as e:
+                error = error or e
+
+    logger.info(
+        f"Translated {len(translated)} of {len(pending)} segments in {len(batches)} batch(es)")
+
+    translation_memory.set_many(
+        [
+            (segments[i], source_lang, target_lang, value)
+            for i, value in translated.items()
+        ],
+        SEGMENT_PROMPT_VERSION
+    )
+    # 已成功的批次先写入翻译记忆，任务重试时只请求失败的批次
+    if error is not None:
+        raise error
+    for i, value in translated.items():
+        results[i] = value
+
+    return results
+
+
+def translate_rich_text(html, target_lang, source_lang="zh"):
+    """翻译 HTML 富文本，分段处理；任一片段翻译失败时抛出异常，不返回半翻译的内容"""
+    if not html or not html.strip():
+        return ""
+
+    # 尝试解析 JSON 格式的富文本（如 TipTap）
+    try:
+        json_data = json.loads(html)
+        if isinstance(json_data, dict) and json_data.get("type") == "doc":
+            return translate_tiptap_json(json_data, target_lang, source_lang)
+    except (json.JSONDecodeError, TypeError):
+        pass
+
+    # 普通 HTML 翻译
+    soup = BeautifulSoup(html, "html.parser")
+
+    text_segments = []
+    text_nodes = []
+
+    for tag in soup.find_all(string=True):
+        text = tag.strip()
+        if text:
+            text_segments.append(text)
+            text_nodes.append(tag)
+
+    if not text_segments:
+        return str(soup)
+
+    translated_segments = translate_segments(
+        text_segments, target_lang, source_lang)
+    if any(value is None for value in translated_segments):
+        raise RuntimeError("Rich text translation failed")
+
+    for tag, translated in zip(text_nodes, translated_segments):
+        tag.replace_with(translated)
+
+    return str(soup)
+
+
+def iter_tiptap_text_nodes(doc):
+    """
+    迭代遍历 TipTap 文档，按文档顺序产出需要翻译的文本节点
+
+    使用显式栈代替递归，跳过代码块和带 code 标记的文本。
+    产出的是节点本身，修改 node["text"] 即原地更新文档。
+    """
+    stack = [doc]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node[::-1])
+            continue
+        if not isinstance(node, dict):
+            continue
+
+        node_type = node.get("type")
+        if node_type == "text":
+            text = node.get("text")
+            if isinstance(text, str) and text.strip() and not _has_skipped_mark(node):
+                yield node
+        elif node_type not in TIPTAP_SKIP_NODES:
+            content = node.get("content")
+            if content:
+                stack.extend(content[::-1])
+
+
+def _has_skipped_mark(node):
+    for mark in node.get("marks") or ():
+        if isinstance(mark, dict) and mark.get("type") in TIPTAP_SKIP_MARKS:
+            return True
+    return False
+
+
+def translate_tiptap_json(json_data, target_lang, source_lang="zh"):
+    """
+    翻译 TipTap JSON 格式的内容
+
+    文本节点按批次分波翻译并原地替换，不复制文档也不一次性收集全部文本。
+    任一片段翻译失败时抛出异常，此时 json_data 可能已部分替换，调用方不应再使用。
+    """
+    nodes = iter_tiptap_text_nodes(json_data)
+    while True:
+        wave = list(islice(nodes, TIPTAP_WAVE_SIZE))
+        if not wave:
+            break
+
+        translated_texts = translate_segments(
+            [node["text"].strip() for node in wave], target_lang, source_lang)
+        if any(value is None for value in translated_texts):
+            raise RuntimeError("TipTap JSON translation failed")
+        for node, translated in zip(wave, translated_texts):
+            node["text"] = translated
+
+    return json.dumps(json_data, ensure_ascii=False)
+
+
+POST_TEXT_FIELDS = ['title', 'description', 'content']
+
+
+def translate_post(post_id, lang_code, source_lang, source_data):
+    """
+    将文章翻译为指定语言并保存，失败时抛出异常以便任务重试
+
+    已有译文时只翻译原文有变化的字段，人工修改过的字段保持不变。
+
+    Args:
+        post_id: 文章 ID
+        lang_code: 目标语言
+        source_lang: 源语言
+        source_data: 源语言的 title / description / content
+    """
+    post = Post.objects.get(id=post_id)
+    previous = PostTranslation.objects.filter(post=post, language=lang_code).values(
+        *POST_TEXT_FIELDS, 'source_hashes', 'translated_hashes').first()
+
+    result = {field: source_data.get(field) or "" for field in POST_TEXT_FIELDS}
+    slots = [(result, field, field) for field in POST_TEXT_FIELDS]
+    pending, source_hashes, translated_hashes = reuse_previous_translations(
+        slots, previous)
+
+    translated = []
+    for index in pending:
+        field = slots[index][1]
+        if field == "content":
+            # translate_rich_text 会自动识别 TipTap JSON 和 HTML
+            translated.append(translate_rich_text(
+                result[field], lang_code, source_lang))
+        else:
+            translated.append(call_openai_translate(
+                result[field], lang_code, source_lang))
+
+    record_translations(slots, pending, translated,
+                        source_hashes, translated_hashes)
+    logger.info(
+        f"Post {post_id} -> {lang_code}: translated {len(pending)} of {len(slots)} fields")
+
+    PostTranslation.objects.update_or_create(
+        post=post,
+        language=lang_code,
+        defaults={
+            **result,
+            'source_hashes': source_hashes,
+            'translated_hashes': translated_hashes,
+            'is_ai_generated': True
+        }
+    )
@@ -1,5 +1,3 @@
-from django.db.models import Sum, Count, Q
-from django.db.models.functions import TruncMonth, TruncDay
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 
@@ -11,288 +9,38 @@ from rest_framework import generics, viewsets
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
 from drf_yasg.utils import swagger_auto_schema
-from datetime import timedelta
-from dateutil.relativedelta import relativedelta
-
-from openai import OpenAI
-import os
-import time
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor
+
 import logging
-import re
-import json
 
 # Custom Imports
 from api.blog.models import Bookmark, Category, Comment, Notification, Post, PostTranslation
+from api.blog.stats import get_author_dashboard_stats
 from api.blog.serializers import CategorySerializer, CommentSerializer, DashboardSerializer, NotificationSerializer, PostSerializer
 from api.core.models import User
+from api.core.cache import CachedResponseMixin
+from api.core.conditional import ConditionalGetMixin, aggregate_last_modified
+from api.core.mixins import TranslationProjectionMixin
 from api.core.pagination import CustomPageNumberPagination
+from api.core.view_counter import post_views
 from api.core.permissions import IsOwnerOrReadOnly, IsNotGuest, CanCreate, CanEdit, CanDelete, IsAdminOrReadOnly
+from api.jobs.models import Job
 
 logger = logging.getLogger(__name__)
 
-# 创建线程池
-translator_executor = ThreadPoolExecutor(max_workers=3)
-
-# OpenAI 客户端配置
-client = OpenAI(
-    api_key=os.environ.get("DEEPSEEK_API_KEY"),
-    base_url="https://api.deepseek.com",
-    timeout=90.0
-)
-
-
-def clean_translated_content(text):
-    """清理翻译结果中的代码块标记"""
-    if not text:
-        return text
-
-    # 移除 Markdown 代码块标记
-    text = re.sub(r'^```(?:json|html|xml)?\s*\n', '', text, flags=re.MULTILINE)
-    text = re.sub(r'\n```$', '', text, flags=re.MULTILINE)
-
-    # 移除首尾空白
-    text = text.strip()
-
-    return text
-
-
-def call_openai_translate(text, target_lang, source_lang="zh"):
-    """使用 DeepSeek 接口翻译，带超时和重试"""
-    if not text or not text.strip():
-        return ""
-
-    max_length = 2000
-    if len(text) > max_length:
-        text = text[:max_length]
-
-    # 优化 prompt，明确要求不要添加代码块
-    prompt = f"将以下{source_lang}文本翻译为{target_lang}。注意：\n1. 只返回翻译后的纯文本\n2. 不要添加任何代码块标记（如 ```json 或 ```）\n3. 不要添加任何解释说明\n4. 保持原文格式\n\n原文：\n{text}"
-
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": "你是一个专业翻译助手。只返回翻译结果，不要添加代码块标记或任何其他内容。"},
-                    {"role": "user", "content": prompt}
-                ],
-                timeout=60.0
-            )
-
-            result = response.choices[0].message.content.strip()
-
-            # 清理可能的代码块标记
-            result = clean_translated_content(result)
-
-            return result
-
-        except Exception as e:
-            if attempt < max_retries - 1:
-                time.sleep((attempt + 1) * 2)
-            else:
-                logger.error(
-                    f"Translation failed after {max_retries} attempts: {str(e)}")
-                raise
-
-    return ""
-
-
-def translate_rich_text(html, target_lang, source_lang="zh"):
-    """翻译 HTML 富文本，分段处理"""
-    if not html or not html.strip():
-        return ""
-
-    # 尝试解析 JSON 格式的富文本（如 TipTap）
-    try:
-        json_data = json.loads(html)
-        if isinstance(json_data, dict) and json_data.get("type") == "doc":
-            return translate_tiptap_json(json_data, target_lang, source_lang)
-    except (json.JSONDecodeError, TypeError):
-        pass
-
-    # 普通 HTML 翻译
-    soup = BeautifulSoup(html, "html.parser")
-
-    text_segments = []
-    text_nodes = []
-
-    for tag in soup.find_all(string=True):
-        text = tag.strip()
-        if text:
-            text_segments.append(text)
-            text_nodes.append(tag)
-
-    if not text_segments:
-        return str(soup)
-
-    try:
-        total_length = sum(len(s) for s in text_segments)
-
-        if total_length < 1500:
-            # 批量翻译
-            combined_text = "\n###SPLIT###\n".join(text_segments)
-            prompt = f"将以下{source_lang}文本翻译为{target_lang}。保持 ###SPLIT### 分隔符不变。\n\n{combined_text}"
-
-            response = client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": "你是一个专业翻译助手。只返回翻译结果，保持分隔符不变。"},
-                    {"role": "user", "content": prompt}
-                ],
-                timeout=90.0
-            )
-
-            result = response.choices[0].message.content.strip()
-            result = clean_translated_content(result)
-
-            translated_segments = result.split("\n###SPLIT###\n")
-
-            for i, tag in enumerate(text_nodes):
-                if i < len(translated_segments):
-                    tag.replace_with(translated_segments[i])
-
-            return str(soup)
-        else:
-            # 逐段翻译
-            for tag in text_nodes:
-                try:
-                    translated = call_openai_translate(
-                        tag.strip(), target_lang, source_lang)
-                    tag.replace_with(translated)
-                except Exception:
-                    continue
-
-            return str(soup)
-
-    except Exception as e:
-        logger.error(f"Rich text translation failed: {str(e)}")
-        return str(soup)
-
-
-def translate_tiptap_json(json_data, target_lang, source_lang="zh"):
-    """翻译 TipTap JSON 格式的内容"""
-    try:
-        # 提取所有纯文本内容
-        texts = []
-
-        def extract_texts(node):
-            if isinstance(node, dict):
-                if node.get("type") == "text":
-                    text = node.get("text", "").strip()
-                    if text:
-                        texts.append(text)
-
-                if "content" in node:
-                    for child in node["content"]:
-                        extract_texts(child)
-            elif isinstance(node, list):
-                for item in node:
-                    extract_texts(item)
-
-        extract_texts(json_data)
-
-        if not texts:
-            return json.dumps(json_data, ensure_ascii=False)
-
-        # 批量翻译
-        combined_text = "\n###SPLIT###\n".join(texts)
-        prompt = f"将以下{source_lang}文本翻译为{target_lang}。保持 ###SPLIT### 分隔符不变。\n\n{combined_text}"
-
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": "你是一个专业翻译助手。只返回翻译结果，保持分隔符不变。不要添加代码块标记。"},
-                {"role": "user", "content": prompt}
-            ],
-            timeout=90.0
-        )
-
-        result = response.choices[0].message.content.strip()
-        result = clean_translated_content(result)
-        translated_texts = result.split("\n###SPLIT###\n")
-
-        # 替换原文本
-        text_index = 0
-
-        def replace_texts(node):
-            nonlocal text_index
-            if isinstance(node, dict):
-                if node.get("type") == "text" and node.get("text", "").strip():
-                    if text_index < len(translated_texts):
-                        node["text"] = translated_texts[text_index]
-                        text_index += 1
-
-                if "content" in node:
-                    for child in node["content"]:
-                        replace_texts(child)
-            elif isinstance(node, list):
-                for item in node:
-                    replace_texts(item)
-
-        replace_texts(json_data)
-
-        return json.dumps(json_data, ensure_ascii=False)
-
-    except Exception as e:
-        logger.error(f"TipTap JSON translation failed: {str(e)}")
-        return json.dumps(json_data, ensure_ascii=False)
-
-
-def translate_post_background(post_id, lang_code, source_lang, source_data):
-    """后台翻译任务"""
-    try:
-        translated_title = call_openai_translate(
-            source_data.get("title", ""),
-            lang_code,
-            source_lang
-        )
-
-        translated_description = ""
-        if source_data.get("description"):
-            translated_description = call_openai_translate(
-                source_data["description"],
-                lang_code,
-                source_lang
-            )
-
-        translated_content = ""
-        if source_data.get("content"):
-            # 检测内容格式
-            content = source_data["content"]
-            try:
-                # 尝试作为 JSON 解析
-                json.loads(content)
-                translated_content = translate_rich_text(
-                    content, lang_code, source_lang)
-            except (json.JSONDecodeError, TypeError):
-                # 普通 HTML
-                translated_content = translate_rich_text(
-                    content, lang_code, source_lang)
-
-        post = Post.objects.get(id=post_id)
-
-        PostTranslation.objects.update_or_create(
-            post=post,
-            language=lang_code,
-            defaults={
-                'title': translated_title,
-                'description': translated_description,
-                'content': translated_content,
-                'is_ai_generated': True
-            }
-        )
-
-        return True
 
-    except Exception as e:
-        logger.error(
-            f"Background translation failed for {lang_code}: {str(e)}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return False
+def enqueue_post_translation(post, lang_code, source_lang, source_data):
+    """将文章翻译加入任务队列，由 run_worker 执行"""
+    return Job.objects.enqueue(
+        Job.KIND_POST,
+        post.id,
+        lang_code,
+        source_lang,
+        {
+            'title': source_data.get('title', ''),
+            'description': source_data.get('description', ''),
+            'content': source_data.get('content', ''),
+        }
+    )
 
 
 class CategoryCreateApiView(generics.CreateAPIView):
@@ -324,48 +72,83 @@ class CategoryUpdateAPIView(generics.RetrieveUpdateDestroyAPIView):
         return Response({"message": "分类已成功删除"}, status=status.HTTP_204_NO_CONTENT)
 
 
-class CategoryListApiView(generics.ListAPIView):
+class CategoryListApiView(CachedResponseMixin, generics.ListAPIView):
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
+    cache_namespaces = ('categories',)
 
     def get_queryset(self):
-        return Category.objects.all()
+        return Category.objects.with_post_count()
 
 
-class PostCategoryListApiView(generics.ListAPIView):
+class PostCategoryListApiView(ConditionalGetMixin, CachedResponseMixin, TranslationProjectionMixin, generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [AllowAny]
+    cache_namespaces = ('posts', 'categories')
+    translation_list_view = True
+
+    def get_conditional_state(self):
+        return aggregate_last_modified(
+            Post.objects.filter(
+                category__slug=self.kwargs['category_slug'], status='Active'),
+            'updated_at', 'translations__updated_at'
+        )
 
     def get_queryset(self):
         category_slug = self.kwargs['category_slug']
         category = Category.objects.get(slug=category_slug)
-        posts = Post.objects.filter(category=category, status='Active')
+        posts = Post.objects.with_related(
+            translations=self.get_translation_queryset()
+        ).filter(category=category, status='Active')
         return posts
 
 
-class PostListAPIView(generics.ListAPIView):
+class PostListAPIView(ConditionalGetMixin, CachedResponseMixin, TranslationProjectionMixin, generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [AllowAny]
+    cache_namespaces = ('posts', 'categories')
     pagination_class = CustomPageNumberPagination
+    translation_list_view = True
+
+    def get_conditional_state(self):
+        return aggregate_last_modified(
+            Post.objects.filter(status='Active'),
+            'updated_at', 'translations__updated_at'
+        )
 
     def get_queryset(self):
-        return Post.objects.filter(status='Active')
+        return Post.objects.with_related(
+            translations=self.get_translation_queryset()
+        ).filter(status='Active')
 
     def list(self, request, *args, **kwargs):
         response = super().list(request, *args, **kwargs)
         return response
 
 
-class PostDetailAPIView(generics.RetrieveAPIView):
+class PostDetailAPIView(ConditionalGetMixin, CachedResponseMixin, TranslationProjectionMixin, generics.RetrieveAPIView):
     serializer_class = PostSerializer
     permission_classes = [AllowAny]
+    cache_namespaces = ('posts', 'categories')
+
+    def get_conditional_state(self):
+        return aggregate_last_modified(
+            Post.objects.filter(slug=self.kwargs['slug'], status='Active'),
+            'updated_at', 'translations__updated_at'
+        )
+
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        # 浏览量先记在缓存中，定期批量写回，304 和缓存命中同样计数
+        if response.status_code in (200, 304):
+            post_views.record(request, self.kwargs['slug'])
+        return response
 
     def get_object(self):
         slug = self.kwargs['slug']
-        post = Post.objects.get(slug=slug, status='Active')
-        post.views += 1
-        post.save()
-        return post
+        return Post.objects.with_related(
+            translations=self.get_translation_queryset()
+        ).get(slug=slug, status='Active')
 
 
 class LikePostAPIView(APIView):
@@ -432,92 +215,28 @@ class BookmarkPostAPIView(APIView):
 class DashboradAPIView(APIView):
     permission_classes = [AllowAny]
 
-    def get_monthly_post_counts(self, user):
-        end_date = timezone.now().replace(day=1)
-        months = [end_date - relativedelta(months=i)
-                  for i in range(11, -1, -1)]
-        month_labels = [m.strftime('%Y-%m') for m in months]
-
-        raw_data = (
-            Post.objects
-            .filter(user=user, date__gte=months[0])
-            .annotate(month=TruncMonth('date'))
-            .values('month')
-            .annotate(count=Count('id'))
-        )
-
-        stats_dict = {item['month'].strftime(
-            '%Y-%m'): item['count'] for item in raw_data}
-
-        return [
-            {"month": month, "count": stats_dict.get(month, 0)}
-            for month in month_labels
-        ]
-
     def get(self, request, user_id):
         user = User.objects.get(id=user_id)
 
-        views = Post.objects.filter(user=user).aggregate(
-            view=Sum('views'))["view"] or 0
-        posts = Post.objects.filter(user=user).count()
-        likes = Post.objects.filter(user=user).aggregate(
-            total_likes=Count('likes'))["total_likes"] or 0
-        bookmarks = Bookmark.objects.filter(post__user=user).count()
-
-        category_counts = list(Category.objects
-                               .all()
-                               .annotate(post_count=Count('posts', filter=Q(posts__user=user)))
-                               .values('id', 'title', 'slug', 'post_count'))
-
-        monthly_posts = self.get_monthly_post_counts(user)
-
-        popular_posts = list(Post.objects
-                             .filter(user=user)
-                             .annotate(like_count=Count('likes'))
-                             .order_by('-like_count', '-date')[:5]
-                             .values('id', 'slug', 'date', 'like_count', 'image'))
-
-        category_likes = list(Category.objects
-                              .filter(posts__user=user)
-                              .annotate(like_count=Count('posts__likes'))
-                              .values('title', 'like_count'))
-
-        one_year_ago = timezone.now() - timedelta(days=365)
-        daily_posts = list(
-            Post.objects
-            .filter(user=user, date__gte=one_year_ago)
-            .annotate(day=TruncDay('date'))
-            .values('day')
-            .annotate(count=Count('id'))
-            .order_by('day')
-        )
-
-        data = {
-            "views": views,
-            "posts": posts,
-            "likes": likes,
-            "comments": 0,
-            "bookmarks": bookmarks,
-            "categories": category_counts,
-            "monthly_posts": monthly_posts,
-            "popular_posts": popular_posts,
-            "category_likes": category_likes,
-            "daily_posts": daily_posts,
-        }
+        # 计数和时间序列来自增量维护的每日汇总表，见 api/blog/stats.py
+        data = get_author_dashboard_stats(user)
 
         serializer = DashboardSerializer(data)
         return Response(serializer.data)
 
 
-class DashboardPostLists(generics.ListAPIView):
+class DashboardPostLists(TranslationProjectionMixin, generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [AllowAny]
     pagination_class = CustomPageNumberPagination
+    translation_list_view = True
 
     def get_queryset(self):
         user_id = self.kwargs['user_id']
         user = User.objects.get(id=user_id)
-        return Post.objects.filter(user=user).order_by("-id")
+        return Post.objects.with_related(
+            translations=self.get_translation_queryset()
+        ).filter(user=user).order_by("-id")
 
 
 class DashboardCommentLists(generics.ListAPIView):
@@ -592,6 +311,7 @@ class DashboardPostCreateAPIView(generics.CreateAPIView):
 
         available_langs = {
             k: v for k, v in translations_data.items() if v and v.get("title")}
+        translation_jobs = []
 
         for lang_code in ["zh", "en", "ja"]:
             translation = translations_data.get(lang_code)
@@ -610,33 +330,13 @@ class DashboardPostCreateAPIView(generics.CreateAPIView):
                     continue
 
                 source_lang, source_data = list(available_langs.items())[0]
-
-                try:
-                    translated_title = call_openai_translate(
-                        source_data["title"], lang_code, source_lang)
-                    translated_description = call_openai_translate(
-                        source_data["description"], lang_code, source_lang)
-                    translated_content = translate_rich_text(
-                        source_data["content"], lang_code, source_lang)
-
-                    PostTranslation.objects.create(
-                        post=post,
-                        language=lang_code,
-                        title=translated_title,
-                        description=translated_description,
-                        content=translated_content,
-                        is_ai_generated=True
-                    )
-                except Exception as e:
-                    logger.error(
-                        f"Translation failed for {lang_code}: {str(e)}")
-                    return Response(
-                        {"error": f"翻译失败: {lang_code} - {str(e)}"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+                translation_jobs.append(enqueue_post_translation(
+                    post, lang_code, source_lang, source_data))
 
         return Response({
             "message": "Post created with translations",
+            "translating": len(translation_jobs) > 0,
+            "translation_jobs": [job.id for job in translation_jobs],
             "post": {
                 "id": post.id,
                 "user": post.user.id,
@@ -663,7 +363,7 @@ class DashboardPostUpdateAPIView(generics.RetrieveUpdateDestroyAPIView):
         user_id = self.kwargs['user_id']
         post_id = self.kwargs['post_id']
         user = User.objects.get(id=user_id)
-        post = Post.objects.get(id=post_id, user=user)
+        post = Post.objects.with_related().get(id=post_id, user=user)
         return post
 
     def update(self, request, *args, **kwargs):
@@ -705,6 +405,8 @@ class DashboardPostUpdateAPIView(generics.RetrieveUpdateDestroyAPIView):
 
         translations_updated = False
         background_tasks = []
+        # 本次人工修改过的语言
+        edited_langs = []
 
         available_langs = {}
         for lang_code, translation in translations_data.items():
@@ -744,6 +446,9 @@ class DashboardPostUpdateAPIView(generics.RetrieveUpdateDestroyAPIView):
                     else:
                         translations_updated = True
 
+                    if (created or changed) and not post_translation.is_ai_generated:
+                        edited_langs.append(lang_code)
+
                 except Exception as e:
                     logger.error(
                         f"Failed to save {lang_code} translation: {str(e)}")
@@ -771,32 +476,43 @@ class DashboardPostUpdateAPIView(generics.RetrieveUpdateDestroyAPIView):
                     if not source_data:
                         continue
 
-                    # 使用后台线程执行翻译
-                    future = translator_executor.submit(
-                        translate_post_background,
-                        post_instance.id,
-                        lang_code,
-                        source_lang,
-                        source_data
-                    )
-                    background_tasks.append(future)
+                    # 加入翻译任务队列，由 worker 在后台执行
+                    background_tasks.append(enqueue_post_translation(
+                        post_instance, lang_code, source_lang, source_data))
                     translations_updated = True
 
                 except Exception as e:
                     logger.error(
-                        f"Failed to submit translation task for {lang_code}: {str(e)}")
+                        f"Failed to enqueue translation job for {lang_code}: {str(e)}")
                     continue
 
+        # 源语言被人工修改时，重新翻译其他语言的 AI 译文，worker 只会翻译有变化的字段
+        if need_ai_generate and edited_langs:
+            source_lang = next(
+                lang for lang in ["zh", "ja", "en"] if lang in edited_langs)
+            queued_langs = {job.language for job in background_tasks}
+            stale_translations = PostTranslation.objects.filter(
+                post=post_instance,
+                is_ai_generated=True
+            ).exclude(language__in=edited_langs).exclude(language__in=queued_langs)
+
+            for post_translation in stale_translations:
+                background_tasks.append(enqueue_post_translation(
+                    post_instance, post_translation.language, source_lang, available_langs[source_lang]))
+
         message = "Post updated successfully"
         if background_tasks:
             message += f". AI translation in progress for {len(background_tasks)} language(s)."
 
         if updated or translations_updated:
+            # 重新加载，避免返回预加载时的旧翻译
+            post_instance = Post.objects.with_related().get(id=post_instance.id)
             serializer = self.get_serializer(post_instance)
             return Response({
                 "message": message,
                 "data": serializer.data,
-                "translating": len(background_tasks) > 0
+                "translating": len(background_tasks) > 0,
+                "translation_jobs": [job.id for job in background_tasks]
             }, status=status.HTTP_200_OK)
         else:
             return Response({
@@ -804,13 +520,15 @@ class DashboardPostUpdateAPIView(generics.RetrieveUpdateDestroyAPIView):
             }, status=status.HTTP_200_OK)
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(TranslationProjectionMixin, viewsets.ModelViewSet):
     serializer_class = PostSerializer
     permission_classes = [AllowAny]
     pagination_class = CustomPageNumberPagination
 
     def get_queryset(self):
-        return Post.objects.filter(status='Active')
+        return Post.objects.with_related(
+            translations=self.get_translation_queryset()
+        ).filter(status='Active')
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
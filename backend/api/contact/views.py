@@ -7,6 +7,7 @@ from django.core.mail import EmailMessage
 from django.conf import settings
 from django.template.loader import render_to_string
 from api.contact.serializers import ContactSerializer
+from api.core.profiling import timed
 from datetime import datetime
 import logging
 
@@ -176,7 +177,8 @@ Received at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
             email_message.body = html_message
 
             # 发送邮件
-            email_message.send(fail_silently=False)
+            with timed('smtp'):
+                email_message.send(fail_silently=False)
 
             logger.info(f"Contact form submitted successfully by {email}")
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from api.core.models import Role, Profile, User
+from api.core.models import Role, Profile, User, TranslationMemory
 
 @admin.register(Role)
 class RoleAdmin(admin.ModelAdmin):
@@ -12,4 +12,11 @@ class ProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'role', 'full_name', 'author', 'country']
     list_filter = ['role', 'author']
     search_fields = ['user__username', 'user__email', 'full_name']
-    raw_id_fields = ['user']
\ No newline at end of file
+    raw_id_fields = ['user']
+
+
+@admin.register(TranslationMemory)
+class TranslationMemoryAdmin(admin.ModelAdmin):
+    list_display = ['source_lang', 'target_lang', 'prompt_version', 'text_hash', 'created_at']
+    list_filter = ['source_lang', 'target_lang', 'prompt_version']
+    search_fields = ['text_hash', 'translated_text']
@@ -0,0 +1,234 @@
+import hashlib
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from rest_framework.response import Response
+
+from api.core.metrics import RESPONSE_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'response-cache'
+
+
+class ResponseCache:
+    """
+    公开接口的响应缓存
+
+    每个命名空间（posts、projects 等）有一个版本号，缓存键包含相关命名空间的
+    当前版本。模型变更时只需提升版本号，旧缓存不再命中并随过期时间淘汰，
+    不需要逐个删除键，对 locmem / 文件 / Redis 后端都适用。
+    """
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+        self._warned_locmem = False
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def shared(self):
+        """缓存是否所有进程共享，locmem 只在当前进程内可见"""
+        return not isinstance(self.cache, LocMemCache)
+
+    @property
+    def enabled(self):
+        if not getattr(settings, 'RESPONSE_CACHE_ENABLED', True):
+            return False
+        if not self.shared and not getattr(settings, 'RESPONSE_CACHE_ALLOW_LOCMEM', False):
+            # 其他进程的写入无法让本进程的 locmem 缓存失效，开启会返回旧数据
+            if not self._warned_locmem:
+                self._warned_locmem = True
+                logger.warning(
+                    "Response cache disabled: locmem is per-process, "
+                    "use CACHE_BACKEND=redis or file (or RESPONSE_CACHE_ALLOW_LOCMEM=true)")
+            return False
+        return True
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+    def _version_key(self, namespace):
+        return f'{KEY_PREFIX}:version:{namespace}'
+
+    @staticmethod
+    def _initial_version():
+        """
+        版本号键不存在时的初始值
+
+        版本号键可能被 Redis 淘汰，若固定从 1 开始，淘汰前按 1、2… 写入且尚未
+        过期的缓存会重新命中。改用毫秒时间戳加随机低位，每次初始化都比之前
+        任何一次失效得到的版本号大。
+        """
+        return (time.time_ns() // 1_000_000) << 16 | random.getrandbits(16)
+
+    def _init_versions(self, keys):
+        """用 add() 初始化缺失的版本号，并发时以先写入的为准"""
+        for key in keys:
+            self.cache.add(key, self._initial_version(), timeout=None)
+        return self.cache.get_many(keys)
+
+    def get_versions(self, namespaces):
+        keys = [self._version_key(namespace) for namespace in namespaces]
+        versions = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in versions]
+        if missing:
+            versions.update(self._init_versions(missing))
+        # 缓存不可写时仍返回新的版本号，只是不会命中
+        return [versions.get(key) or self._initial_version() for key in keys]
+
+    def invalidate(self, *namespaces):
+        """提升命名空间版本号，使其下所有缓存失效"""
+        for namespace in namespaces:
+            key = self._version_key(namespace)
+            # 版本号不过期，不存在时先初始化
+            self.cache.add(key, self._initial_version(), timeout=None)
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.set(key, self._initial_version(), timeout=None)
+
+    def build_key(self, request, namespaces):
+        """按命名空间版本、主机、路径、排序后的查询参数和语言生成缓存键"""
+        versions = self.get_versions(namespaces)
+        query = sorted(
+            (name, value)
+            for name in request.query_params
+            for value in request.query_params.getlist(name)
+        )
+        raw = '|'.join([
+            request.get_host(),
+            request.path,
+            repr(query),
+            request.query_params.get('lang', ''),
+        ])
+        digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        version = '.'.join(f'{namespace}{v}' for namespace,
+                           v in zip(namespaces, versions))
+        return f'{KEY_PREFIX}:{version}:{digest}'
+
+    def get(self, key, namespace):
+        data = self.cache.get(key)
+        with self._lock:
+            counter = self._misses if data is None else self._hits
+            counter[namespace] = counter.get(namespace, 0) + 1
+        RESPONSE_CACHE_LOOKUPS.inc(
+            namespace=namespace, result='miss' if data is None else 'hit')
+        return data
+
+    def set(self, key, data):
+        self.cache.set(key, data, timeout=self.timeout)
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits.clear()
+            self._misses.clear()
+
+    def stats(self):
+        """按命名空间统计本进程的命中率"""
+        with self._lock:
+            namespaces = sorted(set(self._hits) | set(self._misses))
+            result = {}
+            for namespace in namespaces:
+                hits = self._hits.get(namespace, 0)
+                misses = self._misses.get(namespace, 0)
+                result[namespace] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_ratio': hits / (hits + misses),
+                }
+            return result
+
+
+response_cache = ResponseCache()
+
+
+class CachedResponseMixin:
+    """
+    为只读 GET 接口添加响应缓存
+
+    视图声明 cache_namespaces，第一个命名空间用于命中率统计。
+    只缓存 200 响应，响应头 X-Cache 标明 HIT / MISS。
+    """
+    cache_namespaces = ()
+
+    def get(self, request, *args, **kwargs):
+        if not response_cache.enabled or not self.cache_namespaces:
+            return super().get(request, *args, **kwargs)
+
+        key = response_cache.build_key(request, self.cache_namespaces)
+        data = response_cache.get(key, self.cache_namespaces[0])
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            try:
+                response_cache.set(key, response.data)
+            except Exception as e:
+                logger.warning(f"Response cache set failed: {str(e)}")
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+M2M_ACTIONS = {'post_add', 'post_remove', 'post_clear'}
+
+
+def make_invalidator(namespaces, m2m=False):
+    def invalidate(sender, **kwargs):
+        if m2m and kwargs.get('action') not in M2M_ACTIONS:
+            return
+        response_cache.invalidate(*namespaces)
+        # 事务提交后再失效一次，避免提交前的并发请求把旧数据写回缓存
+        transaction.on_commit(lambda: response_cache.invalidate(*namespaces))
+    return invalidate
+
+
+def connect_cache_invalidation():
+    """注册模型信号，在 ApiConfig.ready 中调用"""
+    from api.blog.models import Category, Post, PostTranslation
+    from api.gallery.models import Gallery
+    from api.projects.models import Project, ProjectSkill, ProjectTranslation
+
+    # 模型 -> 变更时需要失效的命名空间
+    model_namespaces = [
+        (Post, ('posts', 'categories')),
+        (PostTranslation, ('posts',)),
+        (Category, ('categories', 'posts')),
+        (Project, ('projects',)),
+        (ProjectTranslation, ('projects',)),
+        (ProjectSkill, ('skills', 'projects')),
+        (Gallery, ('gallery',)),
+    ]
+    for model, namespaces in model_namespaces:
+        invalidate = make_invalidator(namespaces)
+        uid = f'response-cache:{model._meta.label}'
+        post_save.connect(invalidate, sender=model,
+                          weak=False, dispatch_uid=uid)
+        post_delete.connect(invalidate, sender=model,
+                            weak=False, dispatch_uid=uid)
+
+    # 多对多关系 -> 变更时需要失效的命名空间
+    m2m_namespaces = [
+        (Post.likes.through, ('posts',)),
+        (Project.skills.through, ('projects', 'skills')),
+    ]
+    for through, namespaces in m2m_namespaces:
+        m2m_changed.connect(
+            make_invalidator(namespaces, m2m=True), sender=through,
+            weak=False, dispatch_uid=f'response-cache:{through._meta.label}')
@@ -0,0 +1,154 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.db.models.signals import m2m_changed, post_delete, pre_delete
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def aggregate_last_modified(queryset, *fields):
+    """
+    一次聚合查询取多个时间字段的最大值和记录数
+
+    Args:
+        queryset: 列表或详情对应的查询集
+        fields: 时间字段，可跨关联，如 'translations__updated_at'
+
+    Returns:
+        (最后修改时间, 记录数)，没有记录时最后修改时间为 None
+    """
+    aggregates = {f'modified_{i}': Max(field) for i, field in enumerate(fields)}
+    state = queryset.order_by().aggregate(
+        count=Count('pk', distinct=True), **aggregates)
+
+    timestamps = [state[name] for name in aggregates if state[name]]
+    return (max(timestamps) if timestamps else None), state['count']
+
+
+class ConditionalGetMixin:
+    """
+    为 GET 接口提供 ETag / Last-Modified
+
+    视图实现 get_conditional_state()，返回 aggregate_last_modified 的结果。
+    校验值只由聚合查询得到，If-None-Match / If-Modified-Since 命中时在
+    序列化之前直接返回 304。返回 None 时按普通请求处理（例如交给视图返回 404）。
+    """
+
+    def get_conditional_state(self):
+        raise NotImplementedError
+
+    def get_etag(self, request, last_modified, count):
+        # 响应中的链接包含主机名，路径和查询参数决定分页、语言和字段
+        raw = '|'.join([
+            request.get_host(),
+            request.get_full_path(),
+            last_modified.isoformat(),
+            str(count),
+        ])
+        return f'"{hashlib.sha1(raw.encode("utf-8")).hexdigest()}"'
+
+    def get(self, request, *args, **kwargs):
+        state = self.get_conditional_state()
+        if state is None or state[0] is None:
+            return super().get(request, *args, **kwargs)
+
+        last_modified, count = state
+        etag = self.get_etag(request, last_modified, count)
+        timestamp = int(last_modified.timestamp())
+
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            not_modified['Last-Modified'] = http_date(timestamp)
+            return not_modified
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+
+def touch_post_on_likes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """点赞变化时更新文章的 updated_at，使 ETag / Last-Modified 随之变化"""
+    from api.blog.models import Post
+
+    if action == 'pre_clear':
+        if reverse:
+            # user.liked_posts.clear() 的 post_clear 没有 pk_set，先记下受影响的文章
+            instance._cleared_liked_post_ids = list(
+                instance.likes_user.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        post_ids = [instance.pk]
+    elif action == 'post_clear':
+        post_ids = getattr(instance, '_cleared_liked_post_ids', [])
+    else:
+        # 从用户一侧修改时 instance 为用户，pk_set 为文章
+        post_ids = pk_set or []
+    if post_ids:
+        Post.objects.filter(pk__in=post_ids).update(updated_at=timezone.now())
+
+
+def touch_project_on_skills_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """技能关联变化时更新项目的 updated_at，使 ETag / Last-Modified 随之变化"""
+    from api.projects.models import Project
+
+    if action == 'pre_clear':
+        if reverse:
+            # skill.projects.clear() 的 post_clear 没有 pk_set，先记下受影响的项目
+            instance._cleared_project_ids = list(
+                instance.projects.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        project_ids = [instance.pk]
+    elif action == 'post_clear':
+        project_ids = getattr(instance, '_cleared_project_ids', [])
+    else:
+        # 从技能一侧修改时 instance 为技能，pk_set 为项目
+        project_ids = pk_set or []
+    if project_ids:
+        Project.objects.filter(pk__in=project_ids).update(updated_at=timezone.now())
+
+
+def touch_post_on_translation_deleted(sender, instance, **kwargs):
+    # 删除译文不改变 Max(updated_at) 和文章数，需要更新文章本身
+    from api.blog.models import Post
+
+    Post.objects.filter(pk=instance.post_id).update(updated_at=timezone.now())
+
+
+def touch_project_on_translation_deleted(sender, instance, **kwargs):
+    from api.projects.models import Project
+
+    Project.objects.filter(pk=instance.project_id).update(updated_at=timezone.now())
+
+
+def touch_projects_on_skill_deleting(sender, instance, **kwargs):
+    # 级联删除关联行时不发送 m2m_changed，删除前更新用到该技能的项目
+    instance.projects.update(updated_at=timezone.now())
+
+
+def connect_conditional_touch():
+    """注册点赞、技能关联变化和子对象删除的处理，在 ApiConfig.ready 中调用"""
+    from api.blog.models import Post, PostTranslation
+    from api.projects.models import Project, ProjectSkill, ProjectTranslation
+
+    m2m_changed.connect(touch_post_on_likes_changed, sender=Post.likes.through,
+                        dispatch_uid='conditional:likes')
+    m2m_changed.connect(touch_project_on_skills_changed, sender=Project.skills.through,
+                        dispatch_uid='conditional:skills')
+    post_delete.connect(touch_post_on_translation_deleted, sender=PostTranslation,
+                        dispatch_uid='conditional:post-translation-deleted')
+    post_delete.connect(touch_project_on_translation_deleted, sender=ProjectTranslation,
+                        dispatch_uid='conditional:project-translation-deleted')
+    pre_delete.connect(touch_projects_on_skill_deleting, sender=ProjectSkill,
+                       dispatch_uid='conditional:skill-deleting')
@@ -0,0 +1,398 @@
+import atexit
+import glob
+import hmac
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+HOSTNAME = socket.gethostname()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # 进程存在但属于其他用户
+        return True
+    return True
+
+
+def format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {json.dumps(key): value for key, value in self._values.items()}
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+    def render(self, samples):
+        for key, value in sorted(samples.items()):
+            labels = format_labels(self.labelnames, json.loads(key))
+            yield f'{self.name}{labels} {format_value(value)}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            # [各桶计数（非累计）..., +Inf 桶, 总和]
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """记录一段代码的耗时（秒），可用作装饰器或 with 语句"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            return {json.dumps(key): list(state) for key, state in self._values.items()}
+
+    @staticmethod
+    def merge(total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def render(self, samples):
+        for key, state in sorted(samples.items()):
+            values = json.loads(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state[:-1]):
+                cumulative += count
+                labels = format_labels(
+                    self.labelnames, values, [('le', format_value(bound))])
+                yield f'{self.name}_bucket{labels} {format_value(cumulative)}'
+            labels = format_labels(self.labelnames, values)
+            yield f'{self.name}_sum{labels} {format_value(state[-1])}'
+            yield f'{self.name}_count{labels} {format_value(cumulative)}'
+
+
+class MetricsRegistry:
+    """
+    进程内指标注册表，输出 Prometheus 文本格式
+
+    多进程部署（gunicorn 多个 worker、任务 worker）时设置 METRICS_MULTIPROC_DIR：
+    每个进程定期把自己的计数写到该目录下的 metrics-<主机名>-<pid>.json，/metrics
+    汇总目录下所有文件。抓取时删除本机上已退出进程的文件（worker 重启后目录不会
+    无限增长，汇总值随之下降，Prometheus 按计数器重置处理）；其他主机（容器）的
+    pid 在本机无法判断，其文件由各自的进程清理。未设置时只输出当前进程的计数。
+
+    队列长度等反映全局状态的指标在抓取时由 collector 计算，不写入文件。
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """
+        注册抓取时调用的函数，返回 [(指标名, 说明, 类型, [(标签字典, 值)])]
+        """
+        self.collectors.append(collector)
+        return collector
+
+    @property
+    def multiproc_dir(self):
+        return getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+
+    def snapshot(self):
+        return {metric.name: metric.snapshot() for metric in self.metrics}
+
+    def flush(self):
+        """把当前进程的计数写入共享目录，先写临时文件再改名，读取方不会看到半个文件"""
+        directory = self.multiproc_dir
+        if not directory:
+            return
+        with self._flush_lock:
+            self._last_flush = time.monotonic()
+            path = os.path.join(directory, f'metrics-{HOSTNAME}-{os.getpid()}.json')
+            try:
+                os.makedirs(directory, exist_ok=True)
+                with open(f'{path}.tmp', 'w') as f:
+                    json.dump(self.snapshot(), f)
+                os.replace(f'{path}.tmp', path)
+            except OSError as e:
+                logger.warning(f"Metrics flush failed: {str(e)}")
+
+    def maybe_flush(self):
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+        if self.multiproc_dir and time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def prune_if_dead(self, path):
+        """本机进程已退出时删除其计数文件，返回是否已删除"""
+        host, _, pid = os.path.basename(path)[len('metrics-'):-len('.json')].rpartition('-')
+        if host != HOSTNAME or not pid.isdigit() or pid_alive(int(pid)):
+            return False
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to prune metrics file {path}: {str(e)}")
+            return False
+        return True
+
+    def collect_samples(self):
+        """汇总各进程的计数，{指标名: {标签: 值}}"""
+        directory = self.multiproc_dir
+        if not directory:
+            return self.snapshot()
+
+        self.flush()
+        by_name = {metric.name: metric for metric in self.metrics}
+        merged = {name: {} for name in by_name}
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            if self.prune_if_dead(path):
+                continue
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping metrics file {path}: {str(e)}")
+                continue
+            for name, samples in data.items():
+                metric = by_name.get(name)
+                if metric is None:
+                    continue
+                for key, value in samples.items():
+                    merged[name][key] = metric.merge(merged[name].get(key), value)
+        return merged
+
+    def render(self):
+        lines = []
+        samples = self.collect_samples()
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render(samples.get(metric.name, {})))
+
+        for collector in self.collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector {collector.__name__} failed: {str(e)}")
+                continue
+            for name, documentation, kind, values in families:
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in values:
+                    lines.append(
+                        f'{name}{format_labels(labels, labels.values())} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+atexit.register(registry.flush)
+
+REQUEST_LATENCY = registry.histogram(
+    'http_request_duration_seconds', '请求耗时', ['view', 'method'])
+REQUEST_DB_QUERIES = registry.histogram(
+    'http_request_db_queries', '每个请求的 SQL 数量', ['view', 'method'], buckets=QUERY_BUCKETS)
+REQUESTS = registry.counter(
+    'http_requests_total', '请求数', ['view', 'method', 'status'])
+
+DEEPSEEK_LATENCY = registry.histogram(
+    'deepseek_request_duration_seconds', 'DeepSeek 接口调用耗时', ['operation'],
+    buckets=SLOW_BUCKETS)
+DEEPSEEK_TOKENS = registry.counter(
+    'deepseek_tokens_total', 'DeepSeek 接口消耗的 token 数', ['type'])
+DEEPSEEK_ERRORS = registry.counter(
+    'deepseek_errors_total', 'DeepSeek 接口调用失败次数', ['operation'])
+
+TRANSLATION_MEMORY_LOOKUPS = registry.counter(
+    'translation_memory_lookups_total', '翻译记忆查询次数，result 为 hit / db_hit / miss',
+    ['result'])
+RESPONSE_CACHE_LOOKUPS = registry.counter(
+    'response_cache_lookups_total', '响应缓存查询次数', ['namespace', 'result'])
+
+OSS_LATENCY = registry.histogram(
+    'oss_operation_duration_seconds', 'OSS 操作耗时', ['operation'])
+THUMBNAIL_LATENCY = registry.histogram(
+    'thumbnail_generation_duration_seconds', '缩略图生成耗时')
+
+
+def record_token_usage(usage):
+    """
+    记录一次 DeepSeek 调用的 token 用量
+
+    Args:
+        usage: OpenAI SDK 的 response.usage 对象或 HTTP 接口返回的 usage 字典
+    """
+    if not usage:
+        return
+    for field in ('prompt_tokens', 'completion_tokens'):
+        if isinstance(usage, dict):
+            value = usage.get(field)
+        else:
+            value = getattr(usage, field, None)
+        if isinstance(value, int) and value > 0:
+            DEEPSEEK_TOKENS.inc(value, type=field.replace('_tokens', ''))
+
+
+@registry.register_collector
+def job_queue_collector():
+    """后台任务队列长度，按任务类型和状态，直接查询 Job 表，多进程下无需汇总"""
+    from django.db.models import Count
+
+    from api.jobs.models import Job
+
+    counts = {
+        (kind, status): count
+        for kind, status, count in Job.objects.filter(
+            status__in=[Job.STATUS_PENDING, Job.STATUS_RUNNING],
+        ).values_list('kind', 'status').annotate(count=Count('id')).values_list(
+            'kind', 'status', 'count')
+    }
+    return [(
+        'jobs_queued', '待执行和执行中的后台任务数', 'gauge',
+        [({'kind': kind, 'status': status}, counts.get((kind, status), 0))
+         for kind, _ in Job.KIND_CHOICES
+         for status in (Job.STATUS_PENDING, Job.STATUS_RUNNING)],
+    )]
+
+
+class QueryCounter:
+    """connection.execute_wrapper 的回调，只计数不计时"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """记录每个视图的请求耗时、状态码和 SQL 数量，METRICS_ENABLED=false 时关闭"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        view = self.get_view_name(request)
+        REQUEST_LATENCY.observe(duration, view=view, method=request.method)
+        REQUEST_DB_QUERIES.observe(queries.count, view=view, method=request.method)
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        registry.maybe_flush()
+        return response
+
+    def get_view_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        # 未匹配路由的请求（扫描器等）合并为一类，避免标签数量无限增长
+        if match is None:
+            return 'unmatched'
+        view_class = getattr(match.func, 'view_class', None)
+        return view_class.__name__ if view_class else (match.view_name or 'unknown')
+
+
+def metrics_view(request):
+    """
+    Prometheus 抓取接口
+
+    要求请求头 Authorization: Bearer <METRICS_TOKEN>；未配置 METRICS_TOKEN 时
+    只在 DEBUG 下开放，生产环境一律 403，不会因漏配而公开。
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token and not settings.DEBUG:
+        return HttpResponseForbidden()
+    if token and not hmac.compare_digest(
+            request.headers.get('Authorization', '').encode('utf-8'),
+            f'Bearer {token}'.encode('utf-8')):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
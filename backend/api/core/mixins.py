@@ -0,0 +1,56 @@
+SUPPORTED_LANGUAGES = ['zh', 'en', 'ja']
+
+
+class TranslationProjectionMixin:
+    """
+    根据查询参数裁剪返回的翻译内容
+
+    - lang: 只加载指定语言的翻译，如 ?lang=en
+    - fields: 逗号分隔的翻译字段，如 ?fields=title,description
+
+    列表接口未指定 fields 时不返回序列化器中声明的大字段（正文等）。
+    序列化器需要声明 translation_fields 和 translation_heavy_fields。
+    """
+    translation_list_view = False
+
+    def is_translation_list_view(self):
+        return self.translation_list_view or getattr(self, 'action', None) == 'list'
+
+    def get_translation_language(self):
+        lang = self.request.query_params.get('lang')
+        return lang if lang in SUPPORTED_LANGUAGES else None
+
+    def get_translation_fields(self):
+        serializer_class = self.get_serializer_class()
+        available = serializer_class.translation_fields
+
+        requested = self.request.query_params.get('fields')
+        if requested:
+            names = [name.strip() for name in requested.split(',')]
+            fields = [field for field in available if field in names]
+            if fields:
+                return fields
+
+        if self.is_translation_list_view():
+            heavy = serializer_class.translation_heavy_fields
+            return [field for field in available if field not in heavy]
+
+        return list(available)
+
+    def get_translation_queryset(self):
+        """只查询需要的语言和字段，避免从数据库读取整篇正文"""
+        model = self.get_serializer_class().Meta.model
+        relation = model._meta.get_field('translations')
+
+        queryset = relation.related_model.objects.all()
+        lang = self.get_translation_language()
+        if lang:
+            queryset = queryset.filter(language=lang)
+
+        return queryset.only(
+            'id', relation.field.name, 'language', *self.get_translation_fields())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['translation_fields'] = self.get_translation_fields()
+        return context
@@ -179,3 +179,23 @@ def save_user_profile(sender, instance, **kwargs):
 
 post_save.connect(create_user_profile, sender=User)
 post_save.connect(save_user_profile, sender=User)
+
+
+class TranslationMemory(models.Model):
+    """
+    翻译记忆：按 (源语言, 目标语言, 原文哈希, 提示词版本) 缓存翻译结果
+    """
+    source_lang = models.CharField(max_length=2)
+    target_lang = models.CharField(max_length=2)
+    text_hash = models.CharField(max_length=64)
+    prompt_version = models.CharField(max_length=20)
+    translated_text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'api_translation_memory'
+        unique_together = (
+            'source_lang', 'target_lang', 'text_hash', 'prompt_version')
+
+    def __str__(self):
+        return f"{self.source_lang}->{self.target_lang} {self.text_hash[:12]}"
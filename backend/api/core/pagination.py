@@ -1,14 +1,224 @@
+import base64
+import json
+import math
+import operator
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
 
+def estimate_count(queryset):
+    """
+    估算查询集的记录数，不执行 COUNT(*)
+
+    无过滤条件时读取 pg_class.reltuples，否则取 EXPLAIN 的预计行数。
+    非 PostgreSQL 或表尚未 ANALYZE 时返回 None。
+    """
+    if connection.vendor != 'postgresql':
+        return None
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            estimate = row[0] if row else -1
+        else:
+            sql, params = queryset.order_by().values(
+                'pk').query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = plan[0]['Plan']['Plan Rows']
+
+    return int(estimate) if estimate >= 0 else None
+
+
 class CustomPageNumberPagination(PageNumberPagination):
+    """
+    页码分页，另支持游标（keyset）分页
+
+    传 pagination=cursor 或 cursor=<游标> 时切换为游标模式：按查询集的排序字段
+    加主键做 WHERE 比较，不使用 OFFSET，翻到多深都只扫描一页数据。
+    响应结构不变，另外返回 nextCursor；count 由 count 参数控制：
+    exact 精确计数，estimate（默认）按查询计划估算、较小时再精确计数，none 不计数。
+    """
     page_size = 10
     page_size_query_param = 'pageSize'
     page_query_param = 'page'
     max_page_size = 100
 
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    # 估算值低于此数时直接精确计数
+    exact_count_threshold = 10000
+
+    mode = 'page'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        use_cursor = (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+        if use_cursor:
+            keys = self.get_cursor_keys(queryset)
+            if keys is not None:
+                self.mode = 'cursor'
+                return self.paginate_cursor_queryset(queryset, request, keys)
+        self.mode = 'page'
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_cursor_keys(self, queryset):
+        """
+        排序字段加主键，作为游标的比较键 [(字段, 是否降序, 可否为空)]
+
+        排序中含表达式或跨关联字段时返回 None，退回页码分页。
+        """
+        opts = queryset.model._meta
+        ordering = list(queryset.query.order_by or opts.ordering)
+
+        keys = []
+        for item in ordering:
+            if not isinstance(item, str) or item == '?':
+                return None
+            descending = item.startswith('-')
+            name = item.lstrip('-+')
+            if name == 'pk':
+                name = opts.pk.name
+            if '__' in name:
+                return None
+            try:
+                field = opts.get_field(name)
+            except Exception:
+                return None
+            keys.append((field.attname, descending, field.null))
+
+        if opts.pk.attname not in [key[0] for key in keys]:
+            keys.append((opts.pk.attname, False, False))
+        return keys
+
+    def encode_cursor(self, values, page):
+        # 时间保留完整微秒，DjangoJSONEncoder 会截断到毫秒
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value
+                  for value in values]
+        raw = json.dumps({'v': values, 'p': page})
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, token, keys, model):
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+            values, page = data['v'], int(data['p'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound('Invalid cursor')
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise NotFound('Invalid cursor')
+
+        # 游标来自客户端，格式正确但值的类型或范围不对时同样按无效游标处理，
+        # 不能带进查询里变成 500
+        cleaned = []
+        for (name, _, nullable), value in zip(keys, values):
+            if value is None:
+                if not nullable:
+                    raise NotFound('Invalid cursor')
+                cleaned.append(None)
+                continue
+            field = model._meta.get_field(name)
+            try:
+                value = field.to_python(value)
+                field.run_validators(value)
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound('Invalid cursor')
+            cleaned.append(value)
+        return cleaned, page
+
+    def build_cursor_filter(self, keys, values):
+        """
+        取排在游标之后的记录：(k1, k2, ...) 按各自方向大于游标值
+
+        与 PostgreSQL 默认一致，NULL 视为最大值，降序时排最前，升序时排最后。
+        """
+        conditions = []
+        equal = Q()
+        for (name, descending, nullable), value in zip(keys, values):
+            if value is None:
+                after = Q(**{f'{name}__isnull': False}) if descending else None
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                after = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+                if nullable and not descending:
+                    after |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            if after is not None:
+                conditions.append(equal & after)
+            equal &= same
+
+        # 最后一个键是主键，conditions 至少有一项
+        return reduce(operator.or_, conditions)
+
+    def get_count(self, queryset, request):
+        """返回 (记录数, 是否为估算值)，不计数时记录数为 None"""
+        count_mode = request.query_params.get(
+            self.count_query_param, 'estimate')
+        if count_mode == 'none':
+            return None, False
+        if count_mode == 'estimate':
+            estimate = estimate_count(queryset)
+            if estimate is not None and estimate >= self.exact_count_threshold:
+                return estimate, True
+        return queryset.count(), False
+
+    def paginate_cursor_queryset(self, queryset, request, keys):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        if not self.page_size_value:
+            return None
+
+        self.count, self.count_estimated = self.get_count(queryset, request)
+
+        token = request.query_params.get(self.cursor_query_param)
+        self.page_number = 1
+        if token:
+            values, page = self.decode_cursor(token, keys, queryset.model)
+            queryset = queryset.filter(self.build_cursor_filter(keys, values))
+            self.page_number = page + 1
+
+        ordering = [f'-{name}' if descending else name
+                    for name, descending, _ in keys]
+        # 多取一条判断是否还有下一页
+        results = list(queryset.order_by(*ordering)
+                       [:self.page_size_value + 1])
+
+        self.next_cursor = None
+        if len(results) > self.page_size_value:
+            results = results[:self.page_size_value]
+            last = results[-1]
+            self.next_cursor = self.encode_cursor(
+                [getattr(last, name) for name, _, _ in keys], self.page_number)
+        return results
+
     def get_paginated_response(self, data):
+        if self.mode == 'cursor':
+            return Response({
+                'count': self.count,
+                'countEstimated': self.count_estimated,
+                'page': self.page_number,
+                'pageSize': self.page_size_value,
+                'totalPages': (
+                    max(1, math.ceil(self.count / self.page_size_value))
+                    if self.count is not None else None
+                ),
+                'nextCursor': self.next_cursor,
+                'results': data
+            })
+
         return Response({
             'count': self.page.paginator.count,
             'page': self.page.number,
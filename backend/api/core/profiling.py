@@ -0,0 +1,165 @@
+import cProfile
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_current_profile = ContextVar('request_profile', default=None)
+_active_spans = ContextVar('request_profile_spans', default=frozenset())
+
+
+class RequestProfile:
+    """一次请求的耗时记录：数据库查询和各类外部调用"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.spans = {}
+        self._lock = threading.Lock()
+
+    def add_query(self, duration_ms):
+        with self._lock:
+            self.db_queries += 1
+            self.db_ms += duration_ms
+
+    def add_span(self, name, duration_ms):
+        with self._lock:
+            count, total = self.spans.get(name, (0, 0.0))
+            self.spans[name] = (count + 1, total + duration_ms)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper 的回调，统计每条 SQL 的耗时"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add_query((time.perf_counter() - started) * 1000)
+
+
+@contextmanager
+def timed(name):
+    """
+    把一段代码的耗时记入当前请求，可用作装饰器或 with 语句
+
+    同名计时嵌套时只记录最外层，例如 call_openai_translate 内部
+    再调用 translate_segments 不会重复计算。没有开启分析的请求不做任何记录。
+
+        @timed('deepseek')
+        def call_openai_translate(...): ...
+
+        with timed('smtp'):
+            email_message.send()
+    """
+    profile = _current_profile.get()
+    active = _active_spans.get()
+    if profile is None or name in active:
+        yield
+        return
+
+    token = _active_spans.set(active | {name})
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _active_spans.reset(token)
+        profile.add_span(name, (time.perf_counter() - started) * 1000)
+
+
+def format_server_timing(profile, total_ms):
+    """生成 Server-Timing 响应头"""
+    entries = [f'db;dur={profile.db_ms:.1f};desc="{profile.db_queries} queries"']
+    for name, (count, duration) in sorted(profile.spans.items()):
+        entries.append(f'{name};dur={duration:.1f};desc="{count} calls"')
+    entries.append(f'total;dur={total_ms:.1f}')
+    return ', '.join(entries)
+
+
+class ProfilingMiddleware:
+    """
+    请求级性能分析，PROFILING_ENABLED=true 时生效
+
+    - 通过 connection.execute_wrapper 统计 SQL 数量和耗时
+    - timed() 记录 DeepSeek、OSS、SMTP 等外部调用耗时
+    - 响应头 Server-Timing，并输出一行 JSON 日志
+    - 按 PROFILING_SAMPLE_RATE 抽样用 cProfile 运行，耗时超过
+      PROFILING_SLOW_MS 的请求把统计结果写到 PROFILING_DUMP_DIR
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+
+        sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        profiler = cProfile.Profile() if sample_rate and random.random() < sample_rate else None
+
+        try:
+            with connection.execute_wrapper(profile):
+                if profiler is not None:
+                    response = profiler.runcall(self.get_response, request)
+                else:
+                    response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+
+        total_ms = profile.elapsed_ms()
+        response['Server-Timing'] = format_server_timing(profile, total_ms)
+
+        view = self.get_view_name(request)
+        dump_path = None
+        if profiler is not None and total_ms >= getattr(settings, 'PROFILING_SLOW_MS', 500):
+            dump_path = self.dump_profile(profiler, view, total_ms)
+
+        logger.info(json.dumps({
+            'event': 'request_profile',
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 1),
+            'db_queries': profile.db_queries,
+            'db_ms': round(profile.db_ms, 1),
+            'spans': {
+                name: {'calls': count, 'ms': round(duration, 1)}
+                for name, (count, duration) in profile.spans.items()
+            },
+            'profile_dump': dump_path,
+        }, ensure_ascii=False))
+        return response
+
+    def get_view_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return None
+        view_class = getattr(match.func, 'view_class', None)
+        return view_class.__name__ if view_class else match.view_name
+
+    def dump_profile(self, profiler, view, total_ms):
+        directory = getattr(settings, 'PROFILING_DUMP_DIR', 'profiles')
+        try:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(
+                directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{view or "unknown"}-{int(total_ms)}ms.prof')
+            profiler.dump_stats(path)
+            return path
+        except OSError as e:
+            logger.warning(f"Profile dump failed: {str(e)}")
+            return None
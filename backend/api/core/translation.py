@@ -1,8 +1,51 @@
 import os
 import re
+import threading
 import requests
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from api.core.metrics import DEEPSEEK_ERRORS, DEEPSEEK_LATENCY, record_token_usage
+from api.core.profiling import timed
+from api.core.translation_memory import hash_text, translation_memory
+
+
+DEFAULT_API_URL = "https://api.deepseek.com/chat/completions"
+DEFAULT_MAX_WORKERS = 6
+# 修改 translate_chunk 的提示词时需要提升版本号，使旧的翻译记忆失效
+CHUNK_PROMPT_VERSION = 'chunk-v1'
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_max_workers() -> int:
+    """翻译并发上限，可通过环境变量 TRANSLATION_MAX_WORKERS 配置"""
+    try:
+        return max(1, int(os.getenv('TRANSLATION_MAX_WORKERS', DEFAULT_MAX_WORKERS)))
+    except ValueError:
+        return DEFAULT_MAX_WORKERS
+
+
+def get_session() -> requests.Session:
+    """
+    获取进程内共享的 HTTP 会话，复用 TCP/TLS 连接
+
+    连接池大小与翻译并发上限一致。
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = get_max_workers()
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
 
 
 def clean_html_content(html_content: str) -> str:
@@ -76,9 +119,10 @@ def split_content_into_chunks(content: str, max_chunk_size: int = 3000) -> List[
     return chunks
 
 
+@timed('deepseek')
 def translate_chunk(chunk: str, source_lang: str, target_lang: str) -> str:
     """
-    翻译单个文本块
+    翻译单个文本块，优先使用翻译记忆
 
     Args:
         chunk: 要翻译的文本块
@@ -86,11 +130,32 @@ def translate_chunk(chunk: str, source_lang: str, target_lang: str) -> str:
         target_lang: 目标语言 ('zh', 'en', 'ja')
 
     Returns:
-        翻译后的文本
+        翻译后的文本，失败时返回原文
     """
     if not chunk or source_lang == target_lang:
         return chunk
 
+    cached = translation_memory.get(
+        chunk, source_lang, target_lang, CHUNK_PROMPT_VERSION)
+    if cached is not None:
+        return cached
+
+    translated_text = request_chunk_translation(chunk, source_lang, target_lang)
+    if translated_text is None:
+        return chunk
+
+    translation_memory.set(
+        chunk, source_lang, target_lang, CHUNK_PROMPT_VERSION, translated_text)
+    return translated_text
+
+
+def request_chunk_translation(chunk: str, source_lang: str, target_lang: str) -> Optional[str]:
+    """
+    调用 DeepSeek 接口翻译单个文本块
+
+    Returns:
+        翻译后的文本，失败返回 None
+    """
     # 语言映射
     lang_map = {
         'zh': 'Chinese',
@@ -104,9 +169,9 @@ def translate_chunk(chunk: str, source_lang: str, target_lang: str) -> str:
     api_key = os.getenv('DEEPSEEK_API_KEY')
     if not api_key:
         print("[WARNING] DEEPSEEK_API_KEY not found, returning original text")
-        return chunk
+        return None
 
-    api_url = "https://api.deepseek.com/chat/completions"
+    api_url = os.getenv('DEEPSEEK_API_URL', DEFAULT_API_URL)
 
     headers = {
         "Content-Type": "application/json",
@@ -150,11 +215,13 @@ Text to translate:
     }
 
     try:
-        response = requests.post(
-            api_url, headers=headers, json=payload, timeout=60)
+        with DEEPSEEK_LATENCY.time(operation='chunk'):
+            response = get_session().post(
+                api_url, headers=headers, json=payload, timeout=60)
         response.raise_for_status()
 
         result = response.json()
+        record_token_usage(result.get('usage'))
         translated_text = result['choices'][0]['message']['content'].strip()
 
         # 移除可能的 markdown 代码块标记
@@ -166,11 +233,13 @@ Text to translate:
         return translated_text
 
     except requests.exceptions.RequestException as e:
+        DEEPSEEK_ERRORS.inc(operation='chunk')
         print(f"[ERROR] Translation failed: {str(e)}")
-        return chunk
+        return None
     except (KeyError, IndexError) as e:
+        DEEPSEEK_ERRORS.inc(operation='chunk')
         print(f"[ERROR] Failed to parse translation response: {str(e)}")
-        return chunk
+        return None
 
 
 def translate_text(text: str, source_lang: str, target_lang: str, is_html: bool = False, max_chunk_size: int = 3000) -> str:
@@ -190,33 +259,95 @@ def translate_text(text: str, source_lang: str, target_lang: str, is_html: bool
     if not text or source_lang == target_lang:
         return text
 
-    # 清理 HTML（如果是 HTML 内容）
+    return translate_many(
+        [(text, source_lang, target_lang)],
+        is_html=is_html,
+        max_chunk_size=max_chunk_size
+    )[0]
+
+
+def _prepare_chunks(text: str, is_html: bool, max_chunk_size: int) -> List[str]:
+    """清理并分块，短文本作为单个块"""
     if is_html:
         text = clean_html_content(text)
 
-    # 检查是否需要分块
     if len(text) <= max_chunk_size:
-        return translate_chunk(text, source_lang, target_lang)
+        return [text]
 
-    # 分块翻译
-    print(
-        f"[INFO] Text length {len(text)} exceeds limit, splitting into chunks...")
     chunks = split_content_into_chunks(text, max_chunk_size)
-    print(f"[INFO] Split into {len(chunks)} chunks")
+    print(
+        f"[INFO] Text length {len(text)} exceeds limit, split into {len(chunks)} chunks")
+    return chunks
 
-    translated_chunks = []
-    for i, chunk in enumerate(chunks, 1):
-        print(f"[INFO] Translating chunk {i}/{len(chunks)}...")
-        translated_chunk = translate_chunk(chunk, source_lang, target_lang)
-        translated_chunks.append(translated_chunk)
 
-    # 合并翻译结果
-    if is_html:
-        # HTML 内容直接连接
-        return ''.join(translated_chunks)
-    else:
-        # 普通文本用双换行连接
-        return '\n\n'.join(translated_chunks)
+def translate_many(
+    items: Sequence[Tuple[str, str, str]],
+    is_html: bool = False,
+    max_chunk_size: int = 3000,
+    max_workers: Optional[int] = None
+) -> List[str]:
+    """
+    并发翻译多段文本，结果顺序与输入一致
+
+    所有文本先分块，再把全部块放入同一个线程池并发请求，
+    最后按原顺序拼回每段文本。
+
+    Args:
+        items: (文本, 源语言, 目标语言) 列表
+        is_html: 是否为 HTML 内容
+        max_chunk_size: 每个块的最大字符数
+        max_workers: 最大并发数，默认读取 TRANSLATION_MAX_WORKERS
+
+    Returns:
+        翻译后的文本列表
+    """
+    results = [text for text, _, _ in items]
+
+    jobs = []
+    for index, (text, source_lang, target_lang) in enumerate(items):
+        if not text or source_lang == target_lang:
+            continue
+        for chunk in _prepare_chunks(text, is_html, max_chunk_size):
+            jobs.append((index, chunk, source_lang, target_lang))
+
+    if not jobs:
+        return results
+
+    # 先查翻译记忆，只把未命中的块发给接口
+    translated = translation_memory.get_many(
+        [(chunk, source_lang, target_lang)
+         for _, chunk, source_lang, target_lang in jobs],
+        CHUNK_PROMPT_VERSION
+    )
+    pending = [i for i, value in enumerate(translated) if value is None]
+
+    if pending:
+        workers = min(max_workers or get_max_workers(), len(pending))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            responses = list(executor.map(
+                lambda i: request_chunk_translation(*jobs[i][1:]), pending))
+
+        translation_memory.set_many(
+            [
+                (*jobs[i][1:], response)
+                for i, response in zip(pending, responses) if response is not None
+            ],
+            CHUNK_PROMPT_VERSION
+        )
+        for i, response in zip(pending, responses):
+            # 失败时保留原文
+            translated[i] = response if response is not None else jobs[i][1]
+
+    chunks_by_item: Dict[int, List[str]] = {}
+    for (index, _, _, _), chunk in zip(jobs, translated):
+        chunks_by_item.setdefault(index, []).append(chunk)
+
+    # HTML 内容直接连接，普通文本用双换行连接
+    separator = '' if is_html else '\n\n'
+    for index, chunks in chunks_by_item.items():
+        results[index] = separator.join(chunks)
+
+    return results
 
 
 def translate_dict(data: Dict, source_lang: str, target_lang: str, keys_to_translate: list) -> Dict:
@@ -290,10 +421,213 @@ def batch_translate_texts(texts: List[str], source_lang: str, target_lang: str)
     if not texts or source_lang == target_lang:
         return texts
 
-    translated_texts = []
-    for i, text in enumerate(texts, 1):
-        print(f"[INFO] Translating text {i}/{len(texts)}...")
-        translated_text = translate_text(text, source_lang, target_lang)
-        translated_texts.append(translated_text)
+    return translate_many([(text, source_lang, target_lang) for text in texts])
+
+
+PROJECT_TEXT_FIELDS = [
+    'title', 'description', 'summary', 'tech_summary', 'introduction', 'solutions'
+]
+
+
+def source_hash(text: str) -> str:
+    return hash_text(text or '')[:16]
+
+
+def _get_path(data, path: str):
+    """按 'what_i_did.0.title' 形式的路径取值，不存在时返回 None"""
+    value = data
+    for part in path.split('.'):
+        if isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        elif isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return None
+    return value if isinstance(value, str) else None
+
+
+def _path_group(path: str) -> str:
+    """去掉路径中的列表下标，同组的列表项可以按原文哈希互相复用"""
+    return '.'.join(part for part in path.split('.') if not part.isdigit())
+
+
+def reuse_previous_translations(slots: List[Tuple], previous: Optional[Dict]) -> Tuple[List[int], Dict, Dict]:
+    """
+    复用已有译文，找出真正需要翻译的位置
+
+    previous 为目标语言已有的数据，其中 source_hashes 记录每个位置翻译时的原文哈希，
+    translated_hashes 记录写入时的译文哈希。对每个位置：
+
+    - 原文哈希未变：保留现有译文
+    - 同一列表中有相同原文的项（插入、调整顺序）：复用该项的译文
+    - 现有译文与写入时不同（被人工修改过）：保留人工译文
+    - 其余位置需要重新翻译
+
+    Args:
+        slots: (容器, 键, 路径) 列表，容器中当前为原文
+        previous: 目标语言已有数据，None 表示尚未翻译
+
+    Returns:
+        (待翻译的 slot 下标列表, 新的 source_hashes, 新的 translated_hashes)
+    """
+    source_hashes = {}
+    translated_hashes = {}
+    pending = []
+
+    if previous:
+        old_sources = previous.get('source_hashes') or {}
+        old_translated = previous.get('translated_hashes') or {}
+    else:
+        old_sources, old_translated = {}, {}
+
+    by_source = {}
+    for path, old_hash in old_sources.items():
+        if _get_path(previous, path) is not None:
+            by_source.setdefault((_path_group(path), old_hash), path)
 
-    return translated_texts
+    for index, (container, key, path) in enumerate(slots):
+        text = container[key]
+        if not text or not text.strip():
+            continue
+
+        new_hash = source_hash(text)
+        current = _get_path(previous, path) if previous else None
+
+        if current is not None and old_sources.get(path) == new_hash:
+            reuse_path = path
+        else:
+            reuse_path = by_source.get((_path_group(path), new_hash))
+
+        if reuse_path is not None:
+            container[key] = _get_path(previous, reuse_path)
+            source_hashes[path] = new_hash
+            if reuse_path in old_translated:
+                translated_hashes[path] = old_translated[reuse_path]
+            continue
+
+        if current is not None and path in old_translated and source_hash(current) != old_translated[path]:
+            # 人工修改过的译文不覆盖，保留旧的原文哈希
+            container[key] = current
+            source_hashes[path] = old_sources.get(path, '')
+            translated_hashes[path] = old_translated[path]
+            continue
+
+        pending.append(index)
+
+    return pending, source_hashes, translated_hashes
+
+
+def record_translations(slots: List[Tuple], pending: List[int], translated: List[str],
+                        source_hashes: Dict, translated_hashes: Dict):
+    """
+    写入新译文并记录哈希
+
+    译文与原文相同时视为翻译失败，不记录哈希，下次更新时会重新翻译。
+    """
+    for index, value in zip(pending, translated):
+        container, key, path = slots[index]
+        text = container[key]
+        container[key] = value
+        if value and value != text:
+            source_hashes[path] = source_hash(text)
+            translated_hashes[path] = source_hash(value)
+
+
+def _project_slots(source: Dict) -> Tuple[Dict, List[Tuple]]:
+    """按源数据构建结果骨架，返回 (结果, [(容器, 键, 路径)])"""
+    result = {field: '' for field in PROJECT_TEXT_FIELDS}
+    result['title'] = source.get('title', '')
+    for field in PROJECT_TEXT_FIELDS[1:]:
+        if source.get(field):
+            result[field] = source[field]
+
+    result['info'] = [item for item in source.get('info', []) if item]
+    result['challenges'] = [
+        item for item in source.get('challenges', []) if item]
+    # icon 不翻译
+    result['what_i_did'] = [
+        {
+            'title': item.get('title', ''),
+            'description': item.get('description', ''),
+            'icon': item.get('icon', ''),
+        }
+        for item in source.get('what_i_did', [])
+        if item and isinstance(item, dict)
+    ]
+    result['subtitle'] = {}
+    if source.get('subtitle'):
+        result['subtitle'] = {
+            'start': source['subtitle'].get('start', ''),
+            'end': source['subtitle'].get('end', ''),
+        }
+    result['extra_info'] = source.get('extra_info', {})
+
+    slots = [(result, field, field) for field in PROJECT_TEXT_FIELDS]
+    for field in ['info', 'challenges']:
+        slots.extend((result[field], i, f'{field}.{i}')
+                     for i in range(len(result[field])))
+    for i, item in enumerate(result['what_i_did']):
+        slots.extend([(item, 'title', f'what_i_did.{i}.title'),
+                      (item, 'description', f'what_i_did.{i}.description')])
+    for key in result['subtitle']:
+        slots.append((result['subtitle'], key, f'subtitle.{key}'))
+
+    return result, slots
+
+
+def translate_project_translations(
+    source: Dict,
+    source_lang: str,
+    target_langs: List[str],
+    previous: Optional[Dict[str, Dict]] = None
+) -> Dict[str, Dict]:
+    """
+    一次性翻译项目的全部字段到多个目标语言
+
+    所有字段、列表项及其分块合并为一批并发请求。提供 previous 时只翻译
+    原文有变化的位置，结果中附带 source_hashes / translated_hashes。
+
+    Args:
+        source: 源语言的项目翻译数据
+        source_lang: 源语言
+        target_langs: 目标语言列表
+        previous: {目标语言: 已有翻译数据}，用于增量翻译
+
+    Returns:
+        {目标语言: 翻译后的字段字典}
+    """
+    previous = previous or {}
+    results = {}
+    # (容器, 键, 路径)，先填入原文，翻译完成后按位置覆盖
+    pending_slots = []
+    total = 0
+
+    for target_lang in target_langs:
+        result, slots = _project_slots(source)
+        pending, source_hashes, translated_hashes = reuse_previous_translations(
+            slots, previous.get(target_lang))
+        result['source_hashes'] = source_hashes
+        result['translated_hashes'] = translated_hashes
+
+        pending_slots.append((target_lang, slots, pending))
+        total += len(slots)
+        results[target_lang] = result
+
+    requested = [
+        (slots[i][0][slots[i][1]], source_lang, target_lang)
+        for target_lang, slots, pending in pending_slots
+        for i in pending
+    ]
+    print(
+        f"[INFO] Project translation: {len(requested)} of {total} fields need translation")
+    translated = translate_many(requested)
+
+    offset = 0
+    for target_lang, slots, pending in pending_slots:
+        result = results[target_lang]
+        record_translations(
+            slots, pending, translated[offset:offset + len(pending)],
+            result['source_hashes'], result['translated_hashes'])
+        offset += len(pending)
+
+    return results
@@ -0,0 +1,181 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from django.db import DatabaseError
+
+from api.core.metrics import TRANSLATION_MEMORY_LOOKUPS
+from api.core.models import TranslationMemory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_SIZE = 2048
+
+
+def normalize_text(text: str) -> str:
+    """统一换行并去掉首尾和行尾空白，使等价原文得到相同哈希"""
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    text = re.sub(r'[ \t]+\n', '\n', text)
+    return text.strip()
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class TranslationMemoryStore:
+    """
+    翻译记忆：进程内 LRU + 数据库持久化
+
+    键为 (源语言, 目标语言, 原文哈希, 提示词版本)。修改提示词时提升版本号，
+    旧结果自然失效。数据库不可用时只使用进程内缓存，不影响翻译。
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        if max_size is None:
+            try:
+                max_size = int(os.getenv(
+                    'TRANSLATION_MEMORY_SIZE', DEFAULT_MEMORY_SIZE))
+            except ValueError:
+                max_size = DEFAULT_MEMORY_SIZE
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _key(self, text, source_lang, target_lang, prompt_version):
+        return (source_lang, target_lang, hash_text(text), prompt_version)
+
+    def _remember(self, key, translated_text):
+        with self._lock:
+            self._cache[key] = translated_text
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def get(self, text: str, source_lang: str, target_lang: str, prompt_version: str) -> Optional[str]:
+        return self.get_many([(text, source_lang, target_lang)], prompt_version)[0]
+
+    def get_many(self, items: Sequence[Tuple[str, str, str]], prompt_version: str) -> List[Optional[str]]:
+        """
+        批量查询翻译记忆，进程内未命中的条目合并为一次数据库查询
+
+        Args:
+            items: (原文, 源语言, 目标语言) 列表
+            prompt_version: 提示词版本
+
+        Returns:
+            与 items 等长的列表，未命中为 None
+        """
+        keys = [self._key(text, source_lang, target_lang, prompt_version)
+                for text, source_lang, target_lang in items]
+        results: List[Optional[str]] = [None] * len(keys)
+        missing = {}
+
+        with self._lock:
+            for index, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[index] = self._cache[key]
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, []).append(index)
+
+        memory_hits = len(keys) - sum(len(indexes) for indexes in missing.values())
+        db_hits = 0
+        if missing:
+            try:
+                rows = TranslationMemory.objects.filter(
+                    text_hash__in={key[2] for key in missing},
+                    prompt_version=prompt_version,
+                ).values_list('source_lang', 'target_lang', 'text_hash', 'translated_text')
+                for source_lang, target_lang, text_hash, translated_text in rows:
+                    key = (source_lang, target_lang, text_hash, prompt_version)
+                    if key not in missing:
+                        continue
+                    self._remember(key, translated_text)
+                    for index in missing.pop(key):
+                        results[index] = translated_text
+                        db_hits += 1
+                        with self._lock:
+                            self.db_hits += 1
+            except DatabaseError as e:
+                logger.warning(f"Translation memory lookup failed: {str(e)}")
+
+        misses = sum(len(indexes) for indexes in missing.values())
+        with self._lock:
+            self.misses += misses
+        for result, count in (('hit', memory_hits), ('db_hit', db_hits), ('miss', misses)):
+            if count:
+                TRANSLATION_MEMORY_LOOKUPS.inc(count, result=result)
+
+        return results
+
+    def set(self, text: str, source_lang: str, target_lang: str, prompt_version: str, translated_text: str):
+        self.set_many(
+            [(text, source_lang, target_lang, translated_text)], prompt_version)
+
+    def set_many(self, items: Sequence[Tuple[str, str, str, str]], prompt_version: str):
+        """
+        保存翻译结果
+
+        Args:
+            items: (原文, 源语言, 目标语言, 译文) 列表
+            prompt_version: 提示词版本
+        """
+        entries = {}
+        for text, source_lang, target_lang, translated_text in items:
+            if not text or not translated_text:
+                continue
+            key = self._key(text, source_lang, target_lang, prompt_version)
+            self._remember(key, translated_text)
+            entries[key] = translated_text
+
+        if not entries:
+            return
+
+        try:
+            TranslationMemory.objects.bulk_create(
+                [
+                    TranslationMemory(
+                        source_lang=source_lang,
+                        target_lang=target_lang,
+                        text_hash=text_hash,
+                        prompt_version=version,
+                        translated_text=translated_text,
+                    )
+                    for (source_lang, target_lang, text_hash, version), translated_text in entries.items()
+                ],
+                ignore_conflicts=True,
+            )
+        except DatabaseError as e:
+            logger.warning(f"Translation memory save failed: {str(e)}")
+
+    def clear(self):
+        """清空进程内缓存和计数（不删除数据库记录）"""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.db_hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.hits + self.db_hits
+            total = hits + self.misses
+            return {
+                'hits': self.hits,
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+                'size': len(self._cache),
+                'hit_ratio': hits / total if total else 0.0,
+            }
+
+
+translation_memory = TranslationMemoryStore()
@@ -10,4 +10,7 @@ urlpatterns = [
     
     # 用户
     path('user/profile/<user_id>/', views.ProfileView.as_view(), name='user_profile'),
+
+    # 缓存
+    path('cache/stats/', views.ResponseCacheStatsView.as_view(), name='response_cache_stats'),
 ]
\ No newline at end of file
@@ -0,0 +1,328 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'view-count'
+DIRTY_POP_BATCH = 1000
+
+
+def counts_shared():
+    """
+    缓冲区是否所有进程共享
+
+    只有 Redis 的 INCR / SADD 跨进程原子；文件缓存的 incr 是读改写，
+    多进程同时浏览会丢计数，与 locmem 一样只适合单进程部署。
+    """
+    return isinstance(cache, RedisCache)
+
+
+def redis_location():
+    """默认缓存的 Redis 地址；LOCATION 可以是列表或逗号分隔的多个地址，第一个为主节点"""
+    location = settings.CACHES['default']['LOCATION']
+    if isinstance(location, str):
+        location = location.split(',')
+    return location[0]
+
+
+class LocalCountBuffer:
+    """
+    进程内的计数缓冲，用于非 Redis 后端
+
+    计数不放在 locmem / 文件缓存中：这两种后端超过 MAX_ENTRIES 时会淘汰键，
+    未写回的浏览会被悄悄丢掉。进程内字典不会被淘汰，由本进程的后台线程写回。
+    """
+
+    def __init__(self):
+        self._counts = defaultdict(int)
+        self._dirty = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def safe(self):
+        return True
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            self._counts[key] += amount
+
+    def decr(self, key, amount):
+        self.incr(key, -amount)
+
+    def get_many(self, keys):
+        with self._lock:
+            return {key: self._counts[key] for key in keys if self._counts.get(key)}
+
+    def add(self, key, *members):
+        with self._lock:
+            self._dirty[key].update(members)
+
+    def pop_all(self, key):
+        with self._lock:
+            return self._dirty.pop(key, set())
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+            self._dirty.clear()
+
+
+class RedisCountBuffer:
+    """
+    Redis 中的计数缓冲，各进程和 worker 共享
+
+    用 redis-py 的公开接口单独连接默认缓存所在的 Redis，INCRBY / SADD / SPOP
+    都是原子操作，计数键不设过期时间。键能否保留取决于 maxmemory-policy：
+    allkeys-* 会淘汰没有过期时间的键，此时 safe() 为 False，浏览量改为直接写库。
+    无法读取配置（如云 Redis 禁用了 CONFIG）时同样按不安全处理，确认不会淘汰时
+    可设置 VIEW_COUNT_BUFFER=on 强制缓冲。
+    """
+
+    def __init__(self):
+        self._client = None
+        self._safe = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        if self._client is None:
+            import redis
+
+            with self._lock:
+                if self._client is None:
+                    self._client = redis.Redis.from_url(redis_location())
+        return self._client
+
+    def safe(self):
+        mode = getattr(settings, 'VIEW_COUNT_BUFFER', 'auto')
+        if mode != 'auto':
+            return mode == 'on'
+        if self._safe is None:
+            try:
+                policy = self.client().config_get('maxmemory-policy').get('maxmemory-policy')
+            except Exception as e:
+                policy = None
+                logger.warning(f"Cannot read Redis maxmemory-policy: {str(e)}")
+            self._safe = policy == 'noeviction' or (policy or '').startswith('volatile-')
+            if not self._safe:
+                logger.warning(
+                    f"Redis maxmemory-policy {policy!r} may evict view counts, writing views through")
+        return self._safe
+
+    def incr(self, key, amount=1):
+        self.client().incrby(cache.make_key(key), amount)
+
+    def decr(self, key, amount):
+        self.client().decrby(cache.make_key(key), amount)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        values = self.client().mget([cache.make_key(key) for key in keys])
+        return {key: int(value) for key, value in zip(keys, values) if value and int(value)}
+
+    def add(self, key, *members):
+        self.client().sadd(cache.make_key(key), *members)
+
+    def pop_all(self, key):
+        members = set()
+        while True:
+            # SPOP 逐批原子取出，取出后新增的成员留到下次写回
+            batch = self.client().spop(cache.make_key(key), DIRTY_POP_BATCH)
+            if not batch:
+                return members
+            members.update(member.decode('utf-8') for member in batch)
+
+
+local_buffer = LocalCountBuffer()
+redis_buffer = RedisCountBuffer()
+
+
+def count_buffer():
+    return redis_buffer if counts_shared() else local_buffer
+
+
+class ViewCounter:
+    """
+    缓冲浏览量：每次浏览只在缓存中自增，定期用一条 UPDATE ... F() 批量写回
+
+    计数键为 view-count:<名称>:<查找值>，有计数的查找值同时登记在脏集合中，
+    写回只处理登记过的对象。写回时先读取计数再按读到的值 decr，写回期间新增的
+    浏览不会丢失。缓冲区见 count_buffer：Redis 下共享，其他后端在进程内。
+
+    写回不在请求中进行：Redis 下由任务 worker 或 flush_view_counts 命令定期执行，
+    其他后端缓冲区只在本进程内，由本进程的后台线程写回，见 start_background_flush。
+    Redis 可能淘汰计数键时不缓冲，每次浏览直接写库。
+
+    on_flushed 为可选的函数路径，以 {查找值: 次数} 调用，与写回在同一事务中，
+    用于把浏览量同步计入汇总表。
+    """
+
+    def __init__(self, name, model_path, lookup_field, count_field, on_flushed=None):
+        self.name = name
+        self.model_path = model_path
+        self.lookup_field = lookup_field
+        self.count_field = count_field
+        self.on_flushed = on_flushed
+
+    @property
+    def model(self):
+        return import_string(self.model_path)
+
+    def _key(self, lookup):
+        return f'{KEY_PREFIX}:{self.name}:{lookup}'
+
+    @property
+    def dirty_key(self):
+        return f'{KEY_PREFIX}:dirty:{self.name}'
+
+    def _visitor(self, request):
+        if request.user and request.user.is_authenticated:
+            identity = f'user:{request.user.pk}'
+        else:
+            forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+            ip = forwarded.split(',')[0].strip() or request.META.get(
+                'REMOTE_ADDR', '')
+            identity = f"{ip}|{request.META.get('HTTP_USER_AGENT', '')}"
+        return hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]
+
+    def record(self, request, lookup):
+        """
+        记录一次浏览，只写缓冲；缓冲可能丢失计数时直接写库
+
+        Returns:
+            bool: 是否计数（去重窗口内的重复浏览返回 False）
+        """
+        window = getattr(settings, 'VIEW_COUNT_DEDUP_WINDOW', 0)
+        if window:
+            seen_key = f'{KEY_PREFIX}:seen:{self.name}:{lookup}:{self._visitor(request)}'
+            if not cache.add(seen_key, 1, timeout=window):
+                return False
+
+        buffer = count_buffer()
+        if not buffer.safe():
+            self.apply({lookup: 1})
+            return True
+
+        # 先计数再登记：写回在读取计数前取出集合，晚于取出的登记留到下次写回
+        buffer.incr(self._key(lookup))
+        buffer.add(self.dirty_key, lookup)
+        start_background_flush()
+        return True
+
+    def pending(self, lookups):
+        """读取尚未写回的计数 {查找值: 次数}"""
+        keys = {self._key(lookup): lookup for lookup in lookups}
+        values = count_buffer().get_many(keys)
+        return {keys[key]: value for key, value in values.items()}
+
+    def apply(self, counts):
+        """把 {查找值: 次数} 加到数据库计数上，与 on_flushed 在同一事务中"""
+        with transaction.atomic():
+            self.model.objects.filter(**{f'{self.lookup_field}__in': list(counts)}).update(**{
+                self.count_field: F(self.count_field) + Case(
+                    *[When(**{self.lookup_field: lookup}, then=Value(count))
+                      for lookup, count in counts.items()],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+            })
+            if self.on_flushed:
+                import_string(self.on_flushed)(counts)
+
+    def flush(self):
+        """
+        把缓冲的计数写回数据库
+
+        Returns:
+            int: 写回的浏览次数
+        """
+        buffer = count_buffer()
+        counts = self.pending(buffer.pop_all(self.dirty_key))
+        if not counts:
+            return 0
+
+        # 先扣减缓冲中的计数，再写数据库；写回失败时把计数加回去
+        for lookup, count in counts.items():
+            buffer.decr(self._key(lookup), count)
+
+        try:
+            self.apply(counts)
+        except Exception:
+            for lookup, count in counts.items():
+                buffer.incr(self._key(lookup), count)
+            buffer.add(self.dirty_key, *counts)
+            raise
+
+        total = sum(counts.values())
+        logger.info(f"Flushed {total} {self.name} views for {len(counts)} objects")
+        return total
+
+
+post_views = ViewCounter(
+    'post', 'api.blog.models.Post', 'slug', 'views',
+    on_flushed='api.blog.stats.on_post_views_flushed')
+gallery_views = ViewCounter(
+    'gallery', 'api.gallery.models.Gallery', 'slug', 'view_count')
+
+VIEW_COUNTERS = [post_views, gallery_views]
+
+
+def flush_all():
+    """写回所有计数器，返回 {名称: 写回次数}"""
+    return {counter.name: counter.flush() for counter in VIEW_COUNTERS}
+
+
+def flush_interval():
+    """写回间隔（秒），0 表示只通过 flush_view_counts 命令写回"""
+    return getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 60)
+
+
+def flush_safely():
+    try:
+        return flush_all()
+    except Exception as e:
+        logger.error(f"View count flush failed: {str(e)}")
+        return {}
+
+
+_flush_thread = None
+_flush_thread_lock = threading.Lock()
+
+
+def start_background_flush():
+    """
+    缓冲区不共享时，在本进程启动一个后台线程定期写回
+
+    Redis 下由任务 worker 写回，这里什么也不做。fork 后子进程没有父进程的线程，
+    按 pid 判断是否需要重新启动。
+    """
+    global _flush_thread
+    interval = flush_interval()
+    if not interval or counts_shared():
+        return
+    if _flush_thread is not None and _flush_thread[0] == os.getpid():
+        return
+
+    with _flush_thread_lock:
+        if _flush_thread is not None and _flush_thread[0] == os.getpid():
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                close_old_connections()
+                flush_safely()
+                connection.close()
+
+        thread = threading.Thread(target=run, name='view-count-flush', daemon=True)
+        thread.start()
+        _flush_thread = (os.getpid(), thread)
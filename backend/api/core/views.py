@@ -1,6 +1,7 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticatedOrReadOnly
+from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.shortcuts import get_object_or_404
 from drf_yasg.utils import swagger_auto_schema
@@ -11,6 +12,7 @@ from api.core.serializers import (
     RegisterSerializer,
     ProfileSerializer
 )
+from api.core.cache import response_cache
 from api.core.permissions import IsOwnerOrReadOnly
 
 
@@ -74,3 +76,15 @@ class ProfileView(generics.RetrieveUpdateAPIView):
             serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ResponseCacheStatsView(APIView):
+    """本进程的响应缓存命中率"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'enabled': response_cache.enabled,
+            'backend': response_cache.cache.__class__.__name__,
+            'namespaces': response_cache.stats(),
+        })
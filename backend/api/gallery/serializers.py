@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from api.gallery.models import Gallery
 
+GALLERY_ORIGINAL_DIRECTORY = 'uploads/gallery/original'
+
 
 class GallerySerializer(serializers.ModelSerializer):
     exif_summary = serializers.SerializerMethodField()
@@ -38,3 +40,30 @@ class GalleryCreateSerializer(serializers.Serializer):
         allow_empty=True
     )
     is_featured = serializers.BooleanField(default=False)
+
+
+class GalleryUploadInitSerializer(serializers.Serializer):
+    file_name = serializers.CharField(max_length=200)
+    content_type = serializers.RegexField(
+        r'^image/[\w.+-]+$', required=False, allow_blank=True)
+
+
+class GalleryUploadFinalizeSerializer(serializers.Serializer):
+    object_key = serializers.CharField(max_length=1024)
+    title = serializers.CharField(
+        max_length=200, required=False, allow_blank=True)
+    description = serializers.CharField(required=False, allow_blank=True)
+    category = serializers.CharField(
+        max_length=50, required=False, allow_blank=True)
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        required=False,
+        allow_empty=True
+    )
+    is_featured = serializers.BooleanField(default=False)
+
+    def validate_object_key(self, value):
+        # 只接受直传目录下的对象，防止把任意文件登记为照片
+        if not value.startswith(GALLERY_ORIGINAL_DIRECTORY + '/') or '..' in value:
+            raise serializers.ValidationError('Invalid object key')
+        return value
@@ -4,6 +4,10 @@ from api.gallery import views
 urlpatterns = [
     path('gallery/list/', views.GalleryListView.as_view(), name='gallery-list'),
     path('gallery/create/', views.GalleryCreateView.as_view(), name='gallery-create'),
+    path('gallery/upload/init/', views.GalleryUploadInitView.as_view(),
+         name='gallery-upload-init'),
+    path('gallery/upload/finalize/', views.GalleryUploadFinalizeView.as_view(),
+         name='gallery-upload-finalize'),
     path('gallery/detail/<slug:slug>/', views.GalleryDetailView.as_view(),
          name='gallery-detail'),
     path('gallery/timeline/', views.GalleryTimelineView.as_view()),
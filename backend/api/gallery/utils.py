@@ -6,6 +6,11 @@ import os
 import exifread
 from django.utils import timezone
 
+from api.core.metrics import THUMBNAIL_LATENCY
+from api.oss.utils import download_file_from_oss, upload_file_to_oss
+
+GALLERY_THUMBNAIL_DIRECTORY = 'uploads/gallery/thumbnails'
+
 
 def make_aware_datetime(dt):
     """Convert naive datetime to aware datetime"""
@@ -253,6 +258,7 @@ def extract_exif_data(image_file):
         }
 
 
+@THUMBNAIL_LATENCY.time()
 def create_thumbnail(image_file, max_size=(800, 800)):
     """Create thumbnail"""
     try:
@@ -276,3 +282,48 @@ def create_thumbnail(image_file, max_size=(800, 800)):
 
     except Exception:
         return None
+
+
+def exif_fields(exif_data):
+    """extract_exif_data 的结果转换为 Gallery 字段"""
+    return {
+        'taken_at': exif_data.get('taken_at'),
+        'camera_make': exif_data.get('camera_make', ''),
+        'camera_model': exif_data.get('camera_model', ''),
+        'lens_model': exif_data.get('lens_model', ''),
+        'shooting_params': exif_data.get('shooting_params', {}),
+        'photo_properties': exif_data.get('photo_properties', {}),
+        'location_info': exif_data.get('location_info', {}),
+    }
+
+
+def process_uploaded_photo(gallery, object_key, publish=True):
+    """
+    处理浏览器直传到 OSS 的原图：流式下载后提取 EXIF、生成并上传缩略图
+
+    由 gallery 类型的后台任务调用，完成后按 publish 发布照片。
+
+    - 缩略图的对象键只取决于照片 id，任务重试时覆盖同一对象，不留下孤立的缩略图
+    - 只保存处理产生的字段，任务执行期间管理员对标题、标签等的修改不会被覆盖
+    """
+    image_file = download_file_from_oss(object_key)
+    try:
+        exif_data = extract_exif_data(image_file)
+        image_file.seek(0)
+        thumbnail = create_thumbnail(image_file)
+    finally:
+        image_file.close()
+
+    thumbnail_url = gallery.image_url
+    if thumbnail:
+        thumbnail_url = upload_file_to_oss(
+            thumbnail, object_key=f'{GALLERY_THUMBNAIL_DIRECTORY}/gallery-{gallery.id}.jpg')['url']
+
+    fields = exif_fields(exif_data)
+    for field, value in fields.items():
+        setattr(gallery, field, value)
+    gallery.thumbnail_url = thumbnail_url
+    gallery.is_published = publish
+    gallery.save(update_fields=[
+        *fields, 'thumbnail_url', 'is_published', 'updated_at'])
+    return gallery
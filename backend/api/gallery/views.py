@@ -4,24 +4,54 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.views import APIView
 from api.gallery.models import Gallery
-from api.gallery.serializers import GallerySerializer, GalleryCreateSerializer
-from api.gallery.utils import extract_exif_data, create_thumbnail
+from api.gallery.serializers import (
+    GALLERY_ORIGINAL_DIRECTORY,
+    GallerySerializer,
+    GalleryCreateSerializer,
+    GalleryUploadFinalizeSerializer,
+    GalleryUploadInitSerializer,
+)
+from api.core.cache import CachedResponseMixin
+from api.core.conditional import ConditionalGetMixin, aggregate_last_modified
 from api.core.permissions import IsAdminOrReadOnly
+from api.core.view_counter import gallery_views
 from api.core.pagination import CustomPageNumberPagination
-from api.oss.utils import upload_file_to_oss, delete_file_from_oss
-from django.db.models.functions import ExtractYear
-from django.db.models import Count, Q
+from api.jobs.models import Job
+from api.oss.catalog import record_object
+from api.oss.utils import (
+    build_object_key,
+    delete_file_from_oss,
+    get_object_url,
+    head_object_from_oss,
+    presign_upload,
+    upload_file_to_oss,
+)
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import ExtractMonth, ExtractYear, RowNumber
+from django.db.models import Count, F, Window
+from django.utils import timezone
 from collections import OrderedDict
-import shortuuid
+import os
 
 
-class GalleryListView(generics.ListAPIView):
+class PublishedGalleryConditionalMixin(ConditionalGetMixin):
+    """图库各只读接口共用校验值：按全部已发布照片计算，筛选条件由 ETag 中的查询参数区分"""
+
+    def get_conditional_state(self):
+        return aggregate_last_modified(
+            Gallery.objects.filter(is_published=True), 'updated_at')
+
+
+class GalleryListView(PublishedGalleryConditionalMixin, CachedResponseMixin, generics.ListAPIView):
     serializer_class = GallerySerializer
     permission_classes = [AllowAny]
+    cache_namespaces = ('gallery',)
     pagination_class = CustomPageNumberPagination
 
     def get_queryset(self):
-        queryset = Gallery.objects.filter(is_published=True)
+        queryset = Gallery.objects.filter(
+            is_published=True).select_related('uploaded_by')
 
         category = self.request.query_params.get('category')
         if category:
@@ -43,93 +73,189 @@ class GalleryListView(generics.ListAPIView):
         return queryset
 
 
-class GalleryTimelineView(APIView):
-    permission_classes = [AllowAny]
+def get_positive_int(query_params, name):
+    """读取正整数查询参数，非法值返回 None"""
+    try:
+        value = int(query_params.get(name, ''))
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
 
-    def get(self, request):
-        category = request.query_params.get('category')
-        featured = request.query_params.get('featured')
 
-        queryset = Gallery.objects.filter(
-            is_published=True,
-            taken_at__isnull=False
-        )
+def filter_published_photos(request, **filters):
+    queryset = Gallery.objects.filter(
+        is_published=True, **filters
+    ).select_related('uploaded_by')
 
-        if category:
-            queryset = queryset.filter(category=category)
-        if featured == 'true':
-            queryset = queryset.filter(is_featured=True)
+    category = request.query_params.get('category')
+    featured = request.query_params.get('featured')
 
-        years_data = queryset.annotate(
-            year=ExtractYear('taken_at')
-        ).values('year').annotate(
-            count=Count('id')
-        ).order_by('-year')
+    if category:
+        queryset = queryset.filter(category=category)
+    if featured == 'true':
+        queryset = queryset.filter(is_featured=True)
 
-        timeline = OrderedDict()
+    return queryset
+
+
+def group_photos(photos, key):
+    """
+    按 key 对已排序的照片分组，整体只序列化一次
+
+    Returns:
+        OrderedDict: {分组值: [序列化后的照片]}
+    """
+    groups = OrderedDict()
+    serialized = GallerySerializer(photos, many=True).data
+    for photo, data in zip(photos, serialized):
+        groups.setdefault(key(photo), []).append(data)
+    return groups
+
+
+class GalleryTimelineView(PublishedGalleryConditionalMixin, CachedResponseMixin, APIView):
+    """
+    按年份分组的时间线
+
+    可选参数 per_year 限制每年返回的照片数量（按拍摄时间倒序取前 N 张），
+    count 始终为该年份的照片总数。
+    """
+    permission_classes = [AllowAny]
+    cache_namespaces = ('gallery',)
+
+    def get(self, request):
+        queryset = filter_published_photos(request, taken_at__isnull=False)
+
+        year_counts = OrderedDict(
+            (item['year'], item['count'])
+            for item in queryset.annotate(
+                year=ExtractYear('taken_at')
+            ).values('year').annotate(
+                count=Count('id')
+            ).order_by('-year')
+        )
 
-        for year_info in years_data:
-            year = year_info['year']
+        photos = queryset.order_by('-taken_at', '-created_at')
 
-            photos = queryset.filter(
-                taken_at__year=year
-            ).order_by('-taken_at', '-created_at')
+        per_year = get_positive_int(request.query_params, 'per_year')
+        if per_year:
+            photos = photos.annotate(
+                year_rank=Window(
+                    expression=RowNumber(),
+                    partition_by=[ExtractYear('taken_at')],
+                    order_by=[F('taken_at').desc(), F('created_at').desc()],
+                )
+            ).filter(year_rank__lte=per_year)
 
-            serializer = GallerySerializer(photos, many=True)
+        photos_by_year = group_photos(
+            list(photos), lambda photo: timezone.localtime(photo.taken_at).year)
 
+        timeline = OrderedDict()
+        for year, count in year_counts.items():
+            year_photos = photos_by_year.get(year, [])
             timeline[str(year)] = {
                 'year': year,
-                'count': year_info['count'],
-                'photos': serializer.data
+                'count': count,
+                'photos': year_photos,
+                'has_more': len(year_photos) < count,
             }
 
         return Response({
             'timeline': timeline,
             'total_years': len(timeline),
-            'total_photos': queryset.count()
+            'total_photos': sum(year_counts.values())
         })
 
 
-class GalleryYearView(APIView):
+class GalleryYearView(PublishedGalleryConditionalMixin, CachedResponseMixin, APIView):
+    """
+    按月份分组的单年照片
+
+    可选参数 page / pageSize 对该年照片分页，月份的 count 始终为当月总数。
+    """
     permission_classes = [AllowAny]
+    cache_namespaces = ('gallery',)
 
     def get(self, request, year):
-        category = request.query_params.get('category')
-        featured = request.query_params.get('featured')
-
-        queryset = Gallery.objects.filter(
-            is_published=True,
-            taken_at__year=year
-        )
-
-        if category:
-            queryset = queryset.filter(category=category)
-        if featured == 'true':
-            queryset = queryset.filter(is_featured=True)
+        queryset = filter_published_photos(request, taken_at__year=year)
+
+        month_counts = {
+            item['month']: item['count']
+            for item in queryset.annotate(
+                month=ExtractMonth('taken_at')
+            ).values('month').annotate(
+                count=Count('id')
+            ).order_by()
+        }
+        total_photos = sum(month_counts.values())
+
+        photos = queryset.order_by('-taken_at', '-created_at')
+
+        pagination = {}
+        page_size = get_positive_int(request.query_params, 'pageSize')
+        if page_size:
+            page = get_positive_int(request.query_params, 'page') or 1
+            start = (page - 1) * page_size
+            photos = photos[start:start + page_size]
+            pagination = {
+                'page': page,
+                'pageSize': page_size,
+                'totalPages': (total_photos + page_size - 1) // page_size,
+            }
 
         photos_by_month = OrderedDict()
-
-        for month in range(12, 0, -1):
-            month_photos = queryset.filter(
-                taken_at__month=month
-            ).order_by('-taken_at')
-
-            if month_photos.exists():
-                serializer = GallerySerializer(month_photos, many=True)
-                photos_by_month[f'{year}-{month:02d}'] = {
-                    'month': month,
-                    'count': month_photos.count(),
-                    'photos': serializer.data
-                }
+        for month, month_photos in group_photos(
+                list(photos), lambda photo: timezone.localtime(photo.taken_at).month).items():
+            photos_by_month[f'{year}-{month:02d}'] = {
+                'month': month,
+                'count': month_counts.get(month, len(month_photos)),
+                'photos': month_photos
+            }
 
         return Response({
             'year': year,
             'months': photos_by_month,
-            'total_photos': queryset.count()
+            'total_photos': total_photos,
+            **pagination
         })
 
 
+def create_pending_photo(user, data, object_key):
+    """
+    为已在 OSS 中的原图创建未发布的照片，并排队 gallery 任务处理
+
+    缩略图暂用原图地址；任务提取 EXIF、生成缩略图后发布照片。解码图片的内存
+    开销因此落在任务 worker，而不是 web 进程。
+
+    Returns:
+        (Gallery, Job)
+    """
+    image_url = get_object_url(object_key)
+    with transaction.atomic():
+        gallery = Gallery.objects.create(
+            title=data.get('title', ''),
+            description=data.get('description', ''),
+            category=data.get('category', ''),
+            tags=data.get('tags', []),
+            is_featured=data.get('is_featured', False),
+            is_published=False,
+            image_url=image_url,
+            thumbnail_url=image_url,
+            uploaded_by=user,
+        )
+        job = Job.objects.enqueue(
+            Job.KIND_GALLERY, gallery.id, '', '',
+            {'object_key': object_key, 'publish': True})
+    return gallery, job
+
+
 class GalleryCreateView(generics.CreateAPIView):
+    """
+    表单上传照片：原图流式上传到 OSS，EXIF 和缩略图交给 gallery 任务
+
+    请求中不解码图片：PNG、WebP 等格式生成缩略图需要解码整张位图，常驻内存随
+    GALLERY_MAX_UPLOAD_SIZE 增长。与直传一样返回 202 和任务 id，可通过
+    jobs/<id>/ 查询进度。
+    """
     serializer_class = GalleryCreateSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     parser_classes = [MultiPartParser, FormParser]
@@ -141,46 +267,11 @@ class GalleryCreateView(generics.CreateAPIView):
         image_file = serializer.validated_data['file']
 
         try:
-            exif_data = extract_exif_data(image_file)
-
             image_file.seek(0)
+            # 原图流式上传，允许比普通上传更大的文件
             original_result = upload_file_to_oss(
-                image_file, directory='uploads/gallery/original')
-            image_url = original_result['url']
-
-            thumbnail_url = image_url
-            image_file.seek(0)
-            thumbnail = create_thumbnail(image_file)
-            if thumbnail:
-                thumbnail_result = upload_file_to_oss(
-                    thumbnail, directory='uploads/gallery/thumbnails')
-                thumbnail_url = thumbnail_result['url']
-
-            slug = f"photo-{shortuuid.uuid()[:8]}"
-
-            gallery = Gallery.objects.create(
-                slug=slug,
-                title=serializer.validated_data.get('title', ''),
-                description=serializer.validated_data.get('description', ''),
-                category=serializer.validated_data.get('category', ''),
-                tags=serializer.validated_data.get('tags', []),
-                is_featured=serializer.validated_data.get(
-                    'is_featured', False),
-                image_url=image_url,
-                thumbnail_url=thumbnail_url,
-                uploaded_by=request.user,
-                taken_at=exif_data.get('taken_at'),
-                camera_make=exif_data.get('camera_make', ''),
-                camera_model=exif_data.get('camera_model', ''),
-                lens_model=exif_data.get('lens_model', ''),
-                shooting_params=exif_data.get('shooting_params', {}),
-                photo_properties=exif_data.get('photo_properties', {}),
-                location_info=exif_data.get('location_info', {}),
-            )
-
-            response_serializer = GallerySerializer(gallery)
-            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
-
+                image_file, directory=GALLERY_ORIGINAL_DIRECTORY,
+                max_size=settings.GALLERY_MAX_UPLOAD_SIZE)
         except ValueError as e:
             return Response(
                 {'error': str(e)},
@@ -192,6 +283,100 @@ class GalleryCreateView(generics.CreateAPIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        gallery, job = create_pending_photo(
+            request.user, serializer.validated_data, original_result['object_key'])
+        return Response({
+            **GallerySerializer(gallery).data,
+            'job_id': job.id,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class GalleryUploadInitView(APIView):
+    """
+    浏览器直传第一步：分配对象键并返回 PostObject 签名表单
+
+    浏览器把返回的 fields 和文件以 multipart/form-data 提交到 url，
+    policy 限制了对象键和 GALLERY_MAX_UPLOAD_SIZE，超限的文件由 OSS 拒绝；
+    上传后调用 GalleryUploadFinalizeView 登记照片。
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
+
+    def post(self, request):
+        serializer = GalleryUploadInitSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            object_key = build_object_key(
+                os.path.basename(serializer.validated_data['file_name']),
+                GALLERY_ORIGINAL_DIRECTORY)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        upload = presign_upload(
+            object_key, serializer.validated_data.get('content_type', ''),
+            max_size=settings.GALLERY_MAX_UPLOAD_SIZE)
+        return Response({
+            'object_key': object_key,
+            'max_size': settings.GALLERY_MAX_UPLOAD_SIZE,
+            **upload,
+        })
+
+
+class GalleryUploadFinalizeView(APIView):
+    """
+    浏览器直传第二步：确认对象已上传，创建照片并排队后台处理
+
+    照片先以未发布状态创建，缩略图暂用原图地址；gallery 类型的后台任务
+    从 OSS 流式读回原图，提取 EXIF、生成缩略图后再发布。返回 202 和任务 id，
+    可通过 jobs/<id>/ 查询进度。同一对象已登记过时返回 409。
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
+
+    def post(self, request):
+        serializer = GalleryUploadFinalizeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        object_key = data['object_key']
+
+        try:
+            head = head_object_from_oss(object_key)
+        except Exception as e:
+            return Response(
+                {'error': 'OSS lookup failed', 'detail': str(e)},
+                status=status.HTTP_502_BAD_GATEWAY
+            )
+        if head is None:
+            return Response(
+                {'error': 'Object has not been uploaded', 'object_key': object_key},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if head.content_length and head.content_length > settings.GALLERY_MAX_UPLOAD_SIZE:
+            # policy 已限制大小，这里兜底删除绕过表单写入的超限对象
+            delete_file_from_oss(object_key)
+            return Response(
+                {'error': f'File too large. Maximum size: '
+                          f'{settings.GALLERY_MAX_UPLOAD_SIZE / 1024 / 1024}MB'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        image_url = get_object_url(object_key)
+        existing = Gallery.objects.filter(image_url=image_url).values_list('id', flat=True).first()
+        if existing is not None:
+            # 重复提交同一对象不再创建照片
+            return Response(
+                {'error': 'Object is already registered', 'object_key': object_key,
+                 'id': existing},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        record_object(object_key, head.content_length, head.etag, head.last_modified)
+
+        gallery, job = create_pending_photo(request.user, data, object_key)
+        return Response({
+            **GallerySerializer(gallery).data,
+            'job_id': job.id,
+        }, status=status.HTTP_202_ACCEPTED)
+
 
 class GalleryDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = GallerySerializer
@@ -205,8 +390,8 @@ class GalleryDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        instance.view_count += 1
-        instance.save(update_fields=['view_count'])
+        # 浏览量先记在缓存中，定期批量写回
+        gallery_views.record(request, instance.slug)
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
@@ -0,0 +1,98 @@
+import logging
+
+from api.blog.models import Post
+from api.blog.translation import translate_post
+from api.core.translation import translate_project_translations
+from api.gallery.models import Gallery
+from api.gallery.utils import process_uploaded_photo
+from api.jobs.models import Job
+from api.projects.models import Project, ProjectTranslation
+
+logger = logging.getLogger(__name__)
+
+PROJECT_TRANSLATION_FIELDS = [
+    'title', 'subtitle', 'description', 'info', 'summary', 'tech_summary',
+    'introduction', 'challenges', 'solutions', 'what_i_did', 'extra_info',
+]
+
+
+class PermanentJobError(Exception):
+    """不可重试的任务错误，例如目标对象已被删除"""
+
+
+def run_post_job(job):
+    try:
+        translate_post(job.object_id, job.language,
+                       job.source_lang, job.payload)
+    except Post.DoesNotExist as e:
+        raise PermanentJobError(f"Post {job.object_id} does not exist") from e
+
+
+def run_project_job(job):
+    try:
+        project = Project.objects.get(id=job.object_id)
+    except Project.DoesNotExist as e:
+        raise PermanentJobError(
+            f"Project {job.object_id} does not exist") from e
+
+    # 已有译文时只翻译原文有变化的字段和列表项
+    previous = ProjectTranslation.objects.filter(
+        project=project, language=job.language
+    ).values(*PROJECT_TRANSLATION_FIELDS, 'source_hashes', 'translated_hashes').first()
+
+    translated = translate_project_translations(
+        job.payload, job.source_lang, [job.language],
+        previous={job.language: previous} if previous else None)
+
+    ProjectTranslation.objects.update_or_create(
+        project=project,
+        language=job.language,
+        defaults=translated[job.language]
+    )
+
+
+def run_gallery_job(job):
+    try:
+        gallery = Gallery.objects.get(id=job.object_id)
+    except Gallery.DoesNotExist as e:
+        raise PermanentJobError(f"Gallery {job.object_id} does not exist") from e
+
+    process_uploaded_photo(
+        gallery, job.payload['object_key'], publish=job.payload.get('publish', True))
+
+
+HANDLERS = {
+    Job.KIND_POST: run_post_job,
+    Job.KIND_PROJECT: run_project_job,
+    Job.KIND_GALLERY: run_gallery_job,
+}
+
+
+def run_job(job):
+    """
+    执行任务并记录结果
+
+    Returns:
+        bool: 是否成功
+    """
+    handler = HANDLERS.get(job.kind)
+    if handler is None:
+        job.mark_failed(f"Unknown job kind: {job.kind}", retry=False)
+        return False
+
+    try:
+        handler(job)
+    except PermanentJobError as e:
+        logger.error(f"Job {job.id} failed permanently: {str(e)}")
+        job.mark_failed(e, retry=False)
+        return False
+    except Exception as e:
+        logger.exception(
+            f"Job {job.id} failed (attempt {job.attempts}/{job.max_attempts})")
+        job.mark_failed(e)
+        return False
+
+    job.mark_succeeded()
+    logger.info(
+        f"Job {job.id} succeeded: {job.kind}:{job.object_id} {job.language}".rstrip())
+    return True
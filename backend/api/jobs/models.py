@@ -0,0 +1,203 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+class JobQuerySet(models.QuerySet):
+    def enqueue(self, kind, object_id, language, source_lang, payload):
+        """
+        创建任务，同一对象同一语言只保留一个待执行任务
+
+        已有待执行任务时更新其参数，保证执行时使用最新内容。两个请求同时创建时
+        后提交的一方违反 unique_pending_job，改为更新先创建的任务。
+        非翻译任务的 language / source_lang 传空字符串。
+
+        Returns:
+            Job
+        """
+        with transaction.atomic():
+            job = self.select_for_update().filter(
+                kind=kind,
+                object_id=object_id,
+                language=language,
+                status=Job.STATUS_PENDING,
+            ).first()
+
+            if job is None:
+                try:
+                    with transaction.atomic():
+                        return self.create(
+                            kind=kind,
+                            object_id=object_id,
+                            language=language,
+                            source_lang=source_lang,
+                            payload=payload,
+                        )
+                except IntegrityError:
+                    job = self.select_for_update().get(
+                        kind=kind,
+                        object_id=object_id,
+                        language=language,
+                        status=Job.STATUS_PENDING,
+                    )
+
+            job.source_lang = source_lang
+            job.payload = payload
+            job.run_after = timezone.now()
+            job.save(update_fields=[
+                'source_lang', 'payload', 'run_after', 'updated_at'])
+            return job
+
+    def claim_next(self, worker_id, lock_timeout):
+        """
+        领取一个可执行的任务，超时未完成的运行中任务视为 worker 已退出
+
+        超时任务仍有重试次数时重新领取，次数用完的直接标记失败，避免一个
+        卡死或拖垮 worker 的任务被无限领取。使用 SKIP LOCKED，多个 worker
+        并发领取互不阻塞。
+        """
+        now = timezone.now()
+        stale = Q(status=Job.STATUS_RUNNING, locked_at__lt=now - lock_timeout)
+        with transaction.atomic():
+            self.filter(stale, attempts__gte=F('max_attempts')).update(
+                status=Job.STATUS_FAILED,
+                finished_at=now,
+                updated_at=now,
+                last_error='Timed out after the last attempt',
+            )
+            job = self.select_for_update(skip_locked=True).filter(
+                Q(status=Job.STATUS_PENDING, run_after__lte=now) |
+                (stale & Q(attempts__lt=F('max_attempts')))
+            ).order_by('run_after', 'id').first()
+
+            if job is None:
+                return None
+
+            job.status = Job.STATUS_RUNNING
+            job.locked_at = now
+            job.locked_by = worker_id
+            job.attempts += 1
+            job.save(update_fields=[
+                'status', 'locked_at', 'locked_by', 'attempts', 'updated_at'])
+            return job
+
+    def active_for(self, kind, object_id):
+        return self.filter(
+            kind=kind,
+            object_id=object_id,
+            status__in=[Job.STATUS_PENDING,
+                        Job.STATUS_RUNNING],
+        )
+
+
+class Job(models.Model):
+    """
+    后台任务队列，由 run_worker 命令领取执行
+
+    kind 决定执行的处理函数（见 api/jobs/handlers.py）：文章、项目翻译，
+    以及直传照片的处理。
+    """
+    KIND_POST = 'post'
+    KIND_PROJECT = 'project'
+    KIND_GALLERY = 'gallery'
+    KIND_CHOICES = (
+        (KIND_POST, 'Post translation'),
+        (KIND_PROJECT, 'Project translation'),
+        (KIND_GALLERY, 'Gallery photo processing'),
+    )
+    TRANSLATION_KINDS = (KIND_POST, KIND_PROJECT)
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    # 翻译任务的目标语言和原文语言，其他任务为空
+    language = models.CharField(max_length=2, blank=True)
+    source_lang = models.CharField(max_length=2, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'api_job'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['kind', 'object_id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id', 'language'],
+                condition=Q(status='pending'),
+                name='unique_pending_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} -> {self.language} ({self.status})"
+
+    def get_backoff(self, base_seconds=30, max_seconds=3600):
+        """指数退避：30s、60s、120s……最长 1 小时"""
+        seconds = min(base_seconds * 2 ** max(self.attempts - 1, 0), max_seconds)
+        return timedelta(seconds=seconds)
+
+    def mark_succeeded(self):
+        self.status = self.STATUS_SUCCEEDED
+        self.finished_at = timezone.now()
+        self.last_error = ''
+        self.save(update_fields=[
+            'status', 'finished_at', 'last_error', 'updated_at'])
+
+    def mark_failed(self, error, retry=True):
+        """
+        记录失败；仍有重试次数时按退避时间重新排队
+
+        若执行期间已有同一对象同一语言的新任务排队，则不再重试，由新任务处理最新内容。
+        检查之后才排队的新任务会让重新排队违反 unique_pending_job，同样按被取代处理。
+        """
+        fields = ['status', 'run_after', 'finished_at', 'last_error', 'updated_at']
+        self.last_error = str(error)
+        superseded = Job.objects.filter(
+            kind=self.kind,
+            object_id=self.object_id,
+            language=self.language,
+            status=self.STATUS_PENDING,
+        ).exclude(id=self.id).exists()
+
+        if retry and not superseded and self.attempts < self.max_attempts:
+            self.status = self.STATUS_PENDING
+            self.run_after = timezone.now() + self.get_backoff()
+            try:
+                with transaction.atomic():
+                    self.save(update_fields=fields)
+                return
+            except IntegrityError:
+                pass
+
+        self.status = self.STATUS_FAILED
+        self.finished_at = timezone.now()
+        self.save(update_fields=fields)
@@ -0,0 +1,13 @@
+from rest_framework import serializers
+from api.jobs.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'object_id', 'language', 'source_lang', 'status',
+            'attempts', 'max_attempts', 'run_after', 'last_error',
+            'created_at', 'updated_at', 'finished_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,11 @@
+from django.urls import path
+from api.jobs import views
+
+urlpatterns = [
+    path('jobs/', views.JobListView.as_view(), name='job-list'),
+    path('jobs/<int:job_id>/', views.JobDetailView.as_view(), name='job-detail'),
+    path('translation/jobs/', views.TranslationJobListView.as_view(),
+         name='translation-job-list'),
+    path('translation/jobs/<int:job_id>/', views.TranslationJobDetailView.as_view(),
+         name='translation-job-detail'),
+]
@@ -0,0 +1,58 @@
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+
+from api.core.pagination import CustomPageNumberPagination
+from api.jobs.models import Job
+from api.jobs.serializers import JobSerializer
+
+
+def jobs_of_kinds(kinds=None):
+    """kinds 为 None 时返回全部任务"""
+    queryset = Job.objects.all()
+    if kinds is not None:
+        queryset = queryset.filter(kind__in=kinds)
+    return queryset
+
+
+class JobListView(generics.ListAPIView):
+    """
+    后台任务状态列表，可按 kind / object_id / status / language 过滤
+    """
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CustomPageNumberPagination
+    # 限定任务类型，None 表示全部
+    kinds = None
+
+    def get_queryset(self):
+        queryset = jobs_of_kinds(self.kinds)
+
+        for param in ['kind', 'status', 'language']:
+            value = self.request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{param: value})
+
+        object_id = self.request.query_params.get('object_id')
+        if object_id and object_id.isdigit():
+            queryset = queryset.filter(object_id=int(object_id))
+
+        return queryset
+
+
+class JobDetailView(generics.RetrieveAPIView):
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_url_kwarg = 'job_id'
+    kinds = None
+
+    def get_queryset(self):
+        return jobs_of_kinds(self.kinds)
+
+
+class TranslationJobListView(JobListView):
+    """只列出翻译任务，兼容原有的 translation/jobs/ 接口"""
+    kinds = Job.TRANSLATION_KINDS
+
+
+class TranslationJobDetailView(JobDetailView):
+    kinds = Job.TRANSLATION_KINDS
@@ -0,0 +1,118 @@
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import close_old_connections, connection
+
+from api.core.metrics import registry
+from api.core.view_counter import counts_shared, flush_interval, flush_safely
+from api.jobs.handlers import run_job
+from api.jobs.models import Job
+from api.oss.catalog import reconcile_if_due, reconcile_interval
+from api.oss.utils import get_oss_client
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    """
+    从 Job 表领取并执行后台任务
+
+    每个线程独立循环领取任务，任务之间互不阻塞。领取或记录结果时的
+    异常（如数据库重启）只记录日志，等待 error_backoff 秒后继续，
+    线程只会因为 stop() 退出。
+    """
+
+    def __init__(self, workers=2, poll_interval=2.0, lock_timeout=timedelta(minutes=15),
+                 error_backoff=10.0):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lock_timeout = lock_timeout
+        self.error_backoff = error_backoff
+        self.stop_event = threading.Event()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run_pending(self):
+        """执行当前所有可执行的任务后返回，返回处理的任务数"""
+        processed = 0
+        while not self.stop_event.is_set():
+            job = Job.objects.claim_next(
+                self.worker_id, self.lock_timeout)
+            if job is None:
+                break
+            run_job(job)
+            processed += 1
+            # worker 不经过中间件，任务完成后写出指标
+            registry.maybe_flush()
+        return processed
+
+    def _loop(self, index, once):
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                try:
+                    processed = self.run_pending()
+                except Exception:
+                    logger.exception(f"Job worker thread {index} failed, retrying")
+                    # 丢弃可能已断开的连接，下一轮重新建立
+                    connection.close()
+                    if once:
+                        break
+                    self.stop_event.wait(self.error_backoff)
+                    continue
+                if once:
+                    break
+                if not processed:
+                    self.stop_event.wait(self.poll_interval)
+        finally:
+            connection.close()
+
+    def _every(self, interval, task):
+        """每 interval 秒执行一次 task，直到 stop()；task 自行处理异常"""
+        try:
+            while not self.stop_event.wait(interval):
+                close_old_connections()
+                task()
+        finally:
+            connection.close()
+
+    def _reconcile_catalog(self):
+        reconcile_if_due(get_oss_client(), os.getenv('OSS_BUCKET'))
+
+    def periodic_tasks(self):
+        """
+        与任务线程并行的定期任务 [(间隔秒数, 函数)]
+
+        - Redis 缓冲的浏览量由 worker 定期写回，不占用 web 请求
+        - OSS 目录定期与 bucket 对账，补上 STS 直传等绕过接口的上传
+        """
+        tasks = []
+        if flush_interval() and counts_shared():
+            tasks.append((flush_interval(), flush_safely))
+        if reconcile_interval():
+            # 间隔内多次检查，是否到期由 reconcile_if_due 按上次对账时间判断
+            tasks.append((min(reconcile_interval(), 60), self._reconcile_catalog))
+        return tasks
+
+    def run(self, once=False):
+        logger.info(
+            f"Job worker {self.worker_id} started with {self.workers} thread(s)")
+        periodic = [] if once else self.periodic_tasks()
+        with ThreadPoolExecutor(max_workers=self.workers + len(periodic)) as executor:
+            futures = [
+                executor.submit(self._loop, index, once)
+                for index in range(self.workers)
+            ]
+            futures += [
+                executor.submit(self._every, interval, task)
+                for interval, task in periodic
+            ]
+            for future in futures:
+                future.result()
+        logger.info(f"Job worker {self.worker_id} stopped")
@@ -0,0 +1,326 @@
+import io
+import multiprocessing
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import alibabacloud_oss_v2 as oss
+from alibabacloud_oss_v2.models import PutObjectRequest
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management.base import BaseCommand
+
+from api.gallery.utils import create_thumbnail, extract_exif_data
+from api.oss import utils
+from api.oss.client import OSSClientManager
+
+
+class StubOSSHandler(BaseHTTPRequestHandler):
+    """
+    本地 OSS 兼容桩，支持 keep-alive
+
+    PUT（含分片）读完请求体后返回 200，DELETE 返回 204，
+    POST 支持初始化和完成分片上传。请求体分块读取后丢弃，不占用内存。
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        # 模拟到远端的 TCP + TLS 握手耗时，连接复用时不会再付出
+        time.sleep(self.server.handshake_delay)
+
+    def respond(self, status, body=b''):
+        self.send_response(status)
+        self.send_header('x-oss-request-id', 'stub')
+        self.send_header('ETag', '"stub"')
+        self.send_header('Content-Length', str(len(body)))
+        if body:
+            self.send_header('Content-Type', 'application/xml')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def drain_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                self.drain(size)
+                self.rfile.readline()
+                if size == 0:
+                    return
+        self.drain(int(self.headers.get('Content-Length', 0)))
+
+    def drain(self, remaining):
+        while remaining > 0:
+            remaining -= len(self.rfile.read(min(remaining, 64 * 1024)))
+
+    def do_PUT(self):
+        self.drain_body()
+        self.respond(200)
+
+    def do_POST(self):
+        self.drain_body()
+        query = parse_qs(urlparse(self.path).query, keep_blank_values=True)
+        if 'uploads' in query:
+            body = ('<InitiateMultipartUploadResult><Bucket>bench</Bucket><Key>key</Key>'
+                    '<UploadId>stub-upload</UploadId></InitiateMultipartUploadResult>')
+        else:
+            body = ('<CompleteMultipartUploadResult><Bucket>bench</Bucket><Key>key</Key>'
+                    '<ETag>"stub"</ETag></CompleteMultipartUploadResult>')
+        self.respond(200, body.encode())
+
+    def do_DELETE(self):
+        self.respond(204)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server(handshake_delay):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubOSSHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.handshake_delay = handshake_delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def legacy_client_factory():
+    """旧实现：每次调用都新建配置、凭证和客户端"""
+    def get_oss_client():
+        cfg = oss.config.load_default()
+        cfg.credentials_provider = oss.credentials.EnvironmentVariableCredentialsProvider()
+        cfg.region = 'cn-shanghai'
+        cfg.endpoint = os.getenv('OSS_ENDPOINT')
+        cfg.use_path_style = True
+        return oss.Client(cfg)
+    return get_oss_client
+
+
+def pooled_client_factory():
+    manager = OSSClientManager(use_path_style=True)
+    return manager.get_client
+
+
+def legacy_upload(client, file):
+    """旧实现：整个文件读入内存后一次 PUT"""
+    client.put_object(PutObjectRequest(
+        bucket=os.getenv('OSS_BUCKET'), key='bench/legacy.jpg', body=file.read()))
+
+
+def build_temporary_file(size_mb):
+    """生成与 Django 大文件上传相同的 TemporaryUploadedFile"""
+    file = TemporaryUploadedFile('original.jpg', 'image/jpeg', 0, None)
+    block = os.urandom(1024 * 1024)
+    for _ in range(size_mb):
+        file.write(block)
+    file.size = size_mb * 1024 * 1024
+    return file
+
+
+def build_png_file(megapixels):
+    """生成约 megapixels 百万像素、内容随机（几乎不可压缩）的 PNG 临时文件"""
+    from PIL import Image
+
+    width = 4000
+    height = max(megapixels * 1000 * 1000 // width, 1)
+    file = TemporaryUploadedFile('large.png', 'image/png', 0, None)
+    Image.frombytes('RGB', (width, height), os.urandom(width * height * 3)).save(
+        file, format='PNG', compress_level=1)
+    file.size = file.tell()
+    file.seek(0)
+    return file
+
+
+def current_rss():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize()
+
+
+def measure_rss(func):
+    """
+    在 fork 出的子进程中执行 func，返回执行期间常驻内存（RSS）的最大增量（字节）
+
+    tracemalloc 只统计 Python 分配，PIL 解码位图的内存不在其中，这里看进程 RSS。
+    """
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+
+    def child():
+        baseline = current_rss()
+        with redirect_stdout(io.StringIO()):
+            func()
+        # Linux 上 ru_maxrss 单位为 KB
+        sender.send(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 - baseline)
+
+    process = context.Process(target=child)
+    process.start()
+    growth = receiver.recv()
+    process.join()
+    return max(growth, 0)
+
+
+class Command(BaseCommand):
+    help = '在本地 OSS 兼容桩上对比每次新建客户端和共享客户端的上传、删除吞吐量，以及大文件上传的峰值内存'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='上传和删除各执行的次数，默认 200'
+        )
+        parser.add_argument(
+            '--size-kb',
+            type=int,
+            default=64,
+            help='上传文件大小（KB），默认 64'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='并发线程数，默认 4'
+        )
+        parser.add_argument(
+            '--upload-mb',
+            type=int,
+            default=0,
+            help='额外对比上传一个指定大小（MB）临时文件时的峰值内存，默认不执行'
+        )
+        parser.add_argument(
+            '--png-megapixels',
+            type=int,
+            default=0,
+            help='额外对比表单上传一张指定像素数（百万）的 PNG 时请求内处理与只流式上传的 RSS，默认不执行'
+        )
+        parser.add_argument(
+            '--handshake-ms',
+            type=float,
+            default=30,
+            help='每个新连接模拟的握手耗时（毫秒），默认 30'
+        )
+
+    def run_operation(self, func, count, concurrency):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(func, range(count)))
+        return time.perf_counter() - started
+
+    def run(self, name, factory, server, options):
+        payload = b'x' * options['size_kb'] * 1024
+        count = options['requests']
+        keys = []
+
+        def upload(index):
+            result = utils.upload_file_to_oss(
+                SimpleUploadedFile(f'bench-{index}.jpg', payload), directory='bench')
+            keys.append(result['object_key'])
+
+        def delete(index):
+            utils.delete_file_from_oss(keys[index])
+
+        server.connections = 0
+        # 上传、删除函数每次调用都会打印日志，测量时不输出
+        with mock.patch.object(utils, 'get_oss_client', factory()), \
+                redirect_stdout(io.StringIO()):
+            upload_time = self.run_operation(upload, count, options['concurrency'])
+            delete_time = self.run_operation(delete, count, options['concurrency'])
+
+        self.stdout.write(
+            f'{name:<8} 上传 {count / upload_time:8.1f} 次/秒  '
+            f'删除 {count / delete_time:8.1f} 次/秒  新建连接 {server.connections}')
+        return upload_time, delete_time
+
+    def measure_upload_memory(self, name, upload, size_mb):
+        file = build_temporary_file(size_mb)
+        try:
+            file.seek(0)
+            tracemalloc.start()
+            started = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                upload(file)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            file.close()
+
+        self.stdout.write(
+            f'{name:<8} 上传 {size_mb} MB  耗时 {elapsed:.2f}s  峰值内存 {peak / 1024 / 1024:.1f} MB')
+        return peak
+
+    def run_memory(self, size_mb):
+        client = pooled_client_factory()()
+        with mock.patch.object(utils, 'get_oss_client', return_value=client):
+            legacy = self.measure_upload_memory(
+                'legacy', lambda file: legacy_upload(client, file), size_mb)
+            streamed = self.measure_upload_memory(
+                'stream', lambda file: utils.upload_file_to_oss(
+                    file, directory='bench', max_size=file.size), size_mb)
+        return legacy, streamed
+
+    def run_png_rss(self, megapixels):
+        """旧的请求内处理（EXIF + 缩略图 + 上传）与现在请求内只流式上传的 RSS 增量"""
+        file = build_png_file(megapixels)
+        client = pooled_client_factory()()
+
+        def upload():
+            file.seek(0)
+            utils.upload_file_to_oss(file, directory='bench', max_size=file.size)
+
+        def process_in_request():
+            extract_exif_data(file)
+            file.seek(0)
+            create_thumbnail(file)
+            upload()
+
+        try:
+            with mock.patch.object(utils, 'get_oss_client', return_value=client):
+                results = (measure_rss(process_in_request), measure_rss(upload))
+        finally:
+            file.close()
+        for name, growth in zip(('inline', 'stream'), results):
+            self.stdout.write(
+                f'{name:<8} PNG {megapixels} MP  RSS 增长 {growth / 1024 / 1024:.1f} MB')
+        return results
+
+    def handle(self, *args, **options):
+        server = start_stub_server(options['handshake_ms'] / 1000)
+        env = {
+            'OSS_ENDPOINT': f'http://127.0.0.1:{server.server_port}',
+            'OSS_REGION': 'oss-cn-shanghai',
+            'OSS_BUCKET': 'bench',
+            'OSS_ACCESS_KEY_ID': 'bench',
+            'OSS_ACCESS_KEY_SECRET': 'bench',
+        }
+        try:
+            with mock.patch.dict(os.environ, env):
+                legacy = self.run('legacy', legacy_client_factory, server, options)
+                pooled = self.run('pooled', pooled_client_factory, server, options)
+                if options['upload_mb']:
+                    memory = self.run_memory(options['upload_mb'])
+                if options['png_megapixels']:
+                    png_rss = self.run_png_rss(options['png_megapixels'])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ 上传提速 {legacy[0] / pooled[0]:.1f}x，删除提速 {legacy[1] / pooled[1]:.1f}x'))
+        if options['upload_mb']:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ 流式上传峰值内存 {memory[1] / 1024 / 1024:.1f} MB，'
+                f'整体读取 {memory[0] / 1024 / 1024:.1f} MB'))
+        if options['png_megapixels']:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ 请求内只流式上传 RSS 增长 {png_rss[1] / 1024 / 1024:.1f} MB，'
+                f'请求内生成缩略图 {png_rss[0] / 1024 / 1024:.1f} MB'))
@@ -0,0 +1,130 @@
+import copy
+import json
+import time
+import tracemalloc
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+
+from api.blog import translation
+
+
+def legacy_translate_tiptap_json(json_data, target_lang, source_lang="zh"):
+    """旧实现：递归提取全部文本，一次翻译后再递归替换，用于对比"""
+    texts = []
+
+    def extract_texts(node):
+        if isinstance(node, dict):
+            if node.get("type") == "text":
+                text = node.get("text", "").strip()
+                if text:
+                    texts.append(text)
+
+            if "content" in node:
+                for child in node["content"]:
+                    extract_texts(child)
+        elif isinstance(node, list):
+            for item in node:
+                extract_texts(item)
+
+    extract_texts(json_data)
+
+    translated_texts = translation.translate_segments(
+        texts, target_lang, source_lang)
+
+    text_index = 0
+
+    def replace_texts(node):
+        nonlocal text_index
+        if isinstance(node, dict):
+            if node.get("type") == "text" and node.get("text", "").strip():
+                if translated_texts[text_index] is not None:
+                    node["text"] = translated_texts[text_index]
+                text_index += 1
+
+            if "content" in node:
+                for child in node["content"]:
+                    replace_texts(child)
+        elif isinstance(node, list):
+            for item in node:
+                replace_texts(item)
+
+    replace_texts(json_data)
+
+    return json.dumps(json_data, ensure_ascii=False)
+
+
+def build_document(size_bytes):
+    """生成指定大小左右的 TipTap 文档，包含嵌套列表、代码块和行内代码"""
+    paragraph = {
+        "type": "paragraph",
+        "content": [
+            {"type": "text", "text": "这是一段用于性能测试的正文内容，"},
+            {"type": "text", "text": "加粗文字", "marks": [{"type": "bold"}]},
+            {"type": "text", "text": "print()", "marks": [{"type": "code"}]},
+        ],
+    }
+    bullet_list = {
+        "type": "bulletList",
+        "content": [
+            {"type": "listItem", "content": [copy.deepcopy(paragraph)]}
+            for _ in range(3)
+        ],
+    }
+    code_block = {
+        "type": "codeBlock",
+        "attrs": {"language": "python"},
+        "content": [{"type": "text", "text": "def main():\n    pass"}],
+    }
+    blocks = [paragraph, bullet_list, code_block]
+    block_size = sum(len(json.dumps(block, ensure_ascii=False).encode())
+                     for block in blocks)
+
+    content = []
+    for _ in range(max(1, size_bytes // block_size)):
+        content.extend(copy.deepcopy(block) for block in blocks)
+    return {"type": "doc", "content": content}
+
+
+def fake_translate_segments(segments, target_lang, source_lang="zh"):
+    return [f"[{target_lang}] {segment}" for segment in segments]
+
+
+class Command(BaseCommand):
+    help = '对比 TipTap JSON 翻译新旧实现的耗时和峰值内存（不调用翻译接口）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size-mb',
+            type=float,
+            default=5,
+            help='生成文档的大小（MB），默认 5'
+        )
+
+    def measure(self, func, document):
+        """耗时和峰值内存分两次测量，避免 tracemalloc 拖慢计时"""
+        timed, traced = copy.deepcopy(document), copy.deepcopy(document)
+
+        started = time.perf_counter()
+        func(timed, 'en', 'zh')
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        func(traced, 'en', 'zh')
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak
+
+    def handle(self, *args, **options):
+        document = build_document(int(options['size_mb'] * 1024 * 1024))
+        size = len(json.dumps(document, ensure_ascii=False).encode())
+        self.stdout.write(f'文档大小: {size / 1024 / 1024:.2f} MB')
+
+        with mock.patch.object(translation, 'translate_segments', side_effect=fake_translate_segments):
+            for name, func in [
+                ('legacy', legacy_translate_tiptap_json),
+                ('iterative', translation.translate_tiptap_json),
+            ]:
+                elapsed, peak = self.measure(func, document)
+                self.stdout.write(
+                    f'{name:<10} 耗时 {elapsed:.3f}s  峰值内存 {peak / 1024 / 1024:.1f} MB')
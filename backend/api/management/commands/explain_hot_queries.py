@@ -0,0 +1,185 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Value
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.blog.models import Bookmark, Category, Comment, Notification, Post
+from api.blog.views import (
+    DashboardCommentLists, DashboardNotificationsList, DashboardPostLists,
+    PostCategoryListApiView, PostListAPIView)
+from api.core.models import User
+from api.core.pagination import CustomPageNumberPagination
+from api.gallery.models import Gallery
+from api.gallery.views import GalleryListView
+from api.projects.models import Project
+from api.projects.views import ProjectListApiView
+
+# 这些表上出现 Seq Scan 视为索引没有生效
+WATCHED_TABLES = [
+    'api_post', 'api_comment', 'api_bookmark', 'api_notification',
+    'api_project', 'api_gallery',
+]
+# 小表顺序扫描本来就比走索引快，不算回退
+MIN_TABLE_ROWS = 1000
+
+
+def view_queryset(view_class, query=None, **kwargs):
+    """按 GET 请求实例化视图，返回其 get_queryset()，与接口实际执行的查询一致"""
+    request = Request(APIRequestFactory().get('/', query or {}))
+    view = view_class(request=request, args=(), kwargs=kwargs, format_kwarg=None)
+    return view.get_queryset()
+
+
+def cursor_ordered(queryset):
+    """按游标分页的比较键排序"""
+    keys = CustomPageNumberPagination().get_cursor_keys(queryset)
+    return queryset.order_by(*[f'-{name}' if descending else name
+                               for name, descending, _ in keys])
+
+
+def hot_queries(user, category, post):
+    """各接口的热点查询，取自对应视图的 get_queryset()，只取第一页"""
+    page = CustomPageNumberPagination.page_size
+    post_list = view_queryset(PostListAPIView)
+    return [
+        ('post list', post_list[:page]),
+        ('post list (cursor)', cursor_ordered(post_list)[:page]),
+        ('category posts', view_queryset(
+            PostCategoryListApiView, category_slug=category.slug)[:page]),
+        ('dashboard posts', view_queryset(
+            DashboardPostLists, user_id=user.id)[:page]),
+        ('dashboard comments', view_queryset(
+            DashboardCommentLists, user_id=user.id)[:page]),
+        ('unseen notifications', view_queryset(
+            DashboardNotificationsList, user_id=user.id)[:page]),
+        # BookmarkPostAPIView 不是列表视图，查询与其中一致
+        ('bookmark toggle', Bookmark.objects.filter(
+            user=user, post=post)[:1]),
+        ('projects by priority', view_queryset(
+            ProjectListApiView, {'ordering': '-priority'})[:page]),
+        ('gallery list', view_queryset(GalleryListView)[:page]),
+    ]
+
+
+class Command(BaseCommand):
+    help = '对各接口的热点查询执行 EXPLAIN ANALYZE，检查索引是否生效'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='先生成指定数量的测试文章（及评论、通知、收藏），结束后回滚'
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='输出完整执行计划，默认只输出首行和扫描方式'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            targets = self.seed(options['seed']) if options['seed'] else None
+            with connection.cursor() as cursor:
+                # 更新统计信息，否则规划器按空表估算
+                for table in WATCHED_TABLES:
+                    cursor.execute(f'ANALYZE {table}')
+                cursor.execute(
+                    'SELECT relname FROM pg_class WHERE relname = ANY(%s) AND reltuples >= %s',
+                    [WATCHED_TABLES, MIN_TABLE_ROWS])
+                large_tables = [row[0] for row in cursor.fetchall()]
+
+            regressions = self.explain_all(
+                targets, large_tables, options['verbose_plans'])
+            # 生成的数据只用于本次分析
+            transaction.set_rollback(True)
+
+        if regressions is None:
+            self.stdout.write(self.style.WARNING('没有数据，请使用 --seed'))
+        elif regressions:
+            self.stdout.write(self.style.WARNING(
+                f"⚠ 以下查询出现顺序扫描: {', '.join(regressions)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ 所有热点查询均使用索引'))
+
+    def explain_all(self, targets, large_tables, verbose):
+        if targets is None:
+            # 使用现有数据时，以文章最多的作者为查询对象
+            post = Post.objects.filter(user=User.objects.annotate(
+                post_count=Count('post')).order_by('-post_count').first()).first()
+            if post is None:
+                return None
+            targets = (post.user, post.category, post)
+
+        regressions = []
+        for name, queryset in hot_queries(*targets):
+            plan = queryset.explain(analyze=True)
+            scans = [line.strip() for line in plan.splitlines()
+                     if 'Scan' in line]
+            seq_scans = [line for line in scans if 'Seq Scan' in line and any(
+                f' on {table} ' in f'{line} ' for table in large_tables)]
+            if seq_scans:
+                regressions.append(name)
+
+            self.stdout.write(f'\n== {name}')
+            if verbose:
+                self.stdout.write(plan)
+            else:
+                self.stdout.write(plan.splitlines()[0])
+                for line in scans:
+                    self.stdout.write(f'  {line}')
+        return regressions
+
+    def seed(self, count):
+        user = User.objects.create(
+            email='explain-seed@example.com', username='explain-seed')
+        other = User.objects.create(
+            email='explain-other@example.com', username='explain-other')
+        categories = Category.objects.bulk_create([
+            Category(title=f'Seed {i}', slug=f'explain-seed-{i}')
+            for i in range(10)
+        ])
+
+        statuses = ['Active'] * 7 + ['Draft'] * 2 + ['Disabled']
+        posts = Post.objects.bulk_create([
+            Post(user=user if i % 5 == 0 else other,
+                 category=categories[i % len(categories)],
+                 status=statuses[i % len(statuses)])
+            for i in range(count)
+        ])
+        # bulk_create 时 date 都是当前时间，按 id 错开
+        Post.objects.filter(pk__in=[p.pk for p in posts]).update(
+            date=F('date') - ExpressionWrapper(
+                F('id') * Value(timedelta(minutes=7)), output_field=DurationField()))
+
+        Comment.objects.bulk_create([
+            Comment(post=posts[i % count], name='seed', email='seed@example.com')
+            for i in range(count * 2)
+        ])
+        # 绝大多数通知已读
+        Notification.objects.bulk_create([
+            Notification(user=user if i % 5 == 0 else other,
+                         post=posts[i % count], type='Like', seen=i % 20 != 0)
+            for i in range(count * 2)
+        ])
+        Bookmark.objects.bulk_create([
+            Bookmark(user=other, post=posts[i]) for i in range(count)
+        ])
+        Project.objects.bulk_create([
+            Project(created_by=user, priority=i % 10) for i in range(count // 10 + 1)
+        ])
+        Gallery.objects.bulk_create([
+            Gallery(slug=f'explain-seed-{i}', image_url='https://example.com/p.jpg',
+                    thumbnail_url='https://example.com/t.jpg', uploaded_by=user,
+                    is_published=i % 10 != 0)
+            for i in range(count)
+        ])
+        Gallery.objects.filter(slug__startswith='explain-seed-').update(
+            taken_at=F('created_at') - ExpressionWrapper(
+                F('id') * Value(timedelta(hours=3)), output_field=DurationField()))
+        self.stdout.write(f'已生成 {count} 篇文章及相关数据')
+        return user, categories[0], posts[0]
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.core.view_counter import flush_all
+
+
+class Command(BaseCommand):
+    help = '把缓存中缓冲的浏览量写回数据库（需要 Redis，其他缓存后端的缓冲区不跨进程）'
+
+    def handle(self, *args, **options):
+        results = flush_all()
+
+        for name, total in results.items():
+            self.stdout.write(f'{name}: {total} 次浏览')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ 共写回 {sum(results.values())} 次浏览'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api.blog.stats import rebuild_author_stats
+
+
+class Command(BaseCommand):
+    help = '从文章、点赞、收藏、评论重建作者每日及分类汇总表，并校正文章点赞数'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='只重建指定用户 ID，可重复指定'
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild_author_stats(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f'✓ 已重建 {rows} 条每日汇总'))
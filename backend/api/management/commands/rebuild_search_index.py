@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.search.index import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = '重建文章和项目译文的全文搜索索引'
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f'✓ 已索引 {count} 个文档'))
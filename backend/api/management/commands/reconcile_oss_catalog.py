@@ -0,0 +1,23 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from api.oss.catalog import reconcile_catalog
+from api.oss.utils import get_oss_client
+
+
+class Command(BaseCommand):
+    help = '与 OSS bucket 对账，更新本地对象目录（任务 worker 按 OSS_CATALOG_RECONCILE_INTERVAL 定期执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prefix',
+            default='',
+            help='只对账指定前缀下的对象，默认整个 bucket'
+        )
+
+    def handle(self, *args, **options):
+        result = reconcile_catalog(
+            get_oss_client(), os.getenv('OSS_BUCKET'), prefix=options['prefix'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ 共 {result['seen']} 个对象，新增 {result['added']}，删除 {result['removed']}"))
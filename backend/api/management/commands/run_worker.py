@@ -0,0 +1,55 @@
+import os
+import signal
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.jobs.worker import JobWorker
+
+
+class Command(BaseCommand):
+    help = '运行后台任务队列 worker（文章、项目翻译，照片处理）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=int(os.getenv('JOB_WORKERS') or os.getenv('TRANSLATION_WORKERS') or 2),
+            help='并发执行任务的线程数（默认读取 JOB_WORKERS，兼容 TRANSLATION_WORKERS，否则为 2）'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='队列为空时的轮询间隔（秒）'
+        )
+        parser.add_argument(
+            '--lock-timeout',
+            type=int,
+            default=900,
+            help='运行中任务超过该秒数未完成则允许重新领取'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='处理完当前可执行的任务后退出'
+        )
+
+    def handle(self, *args, **options):
+        worker = JobWorker(
+            workers=max(1, options['workers']),
+            poll_interval=options['poll_interval'],
+            lock_timeout=timedelta(seconds=options['lock_timeout']),
+        )
+
+        def shutdown(signum, frame):
+            self.stdout.write(self.style.WARNING('正在停止 worker……'))
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ 任务 worker 已启动（{worker.workers} 个线程）'))
+        worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS('✓ 任务 worker 已停止'))
@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-17 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_project_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationMemory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_lang', models.CharField(max_length=2)),
+                ('target_lang', models.CharField(max_length=2)),
+                ('text_hash', models.CharField(max_length=64)),
+                ('prompt_version', models.CharField(max_length=20)),
+                ('translated_text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'api_translation_memory',
+                'unique_together': {('source_lang', 'target_lang', 'text_hash', 'prompt_version')},
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-17 11:44
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_translationmemory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Post'), ('project', 'Project')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('language', models.CharField(max_length=2)),
+                ('source_lang', models.CharField(max_length=2)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'api_translation_job',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='translationjob',
+            index=models.Index(fields=['status', 'run_after'], name='api_transla_status_e7105a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='translationjob',
+            index=models.Index(fields=['kind', 'object_id'], name='api_transla_kind_61ffeb_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='translationjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('kind', 'object_id', 'language'), name='unique_pending_translation_job'),
+        ),
+    ]
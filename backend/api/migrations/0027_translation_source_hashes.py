@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-17 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_translationjob_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posttranslation',
+            name='source_hashes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='posttranslation',
+            name='translated_hashes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='projecttranslation',
+            name='source_hashes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='projecttranslation',
+            name='translated_hashes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-17 11:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_translation_source_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='posttranslation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2 on 2026-10-17 12:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import defaultdict
+from django.db.models import Count
+from django.utils import timezone
+
+
+def backfill_author_stats(apps, schema_editor):
+    """按现有文章、收藏、评论生成汇总；历史点赞没有时间，计入文章发布当天"""
+    Post = apps.get_model('api', 'Post')
+    Bookmark = apps.get_model('api', 'Bookmark')
+    Comment = apps.get_model('api', 'Comment')
+    AuthorDailyStats = apps.get_model('api', 'AuthorDailyStats')
+
+    rows = defaultdict(lambda: defaultdict(int))
+    for user_id, date, likes in Post.objects.annotate(
+            like_count=Count('likes', distinct=True)).values_list('user_id', 'date', 'like_count'):
+        day = timezone.localdate(date)
+        rows[(user_id, day)]['posts'] += 1
+        rows[(user_id, day)]['likes'] += likes
+
+    for model, field in [(Bookmark, 'bookmarks'), (Comment, 'comments')]:
+        for user_id, date in model.objects.values_list('post__user_id', 'date'):
+            rows[(user_id, timezone.localdate(date))][field] += 1
+
+    AuthorDailyStats.objects.bulk_create([
+        AuthorDailyStats(user_id=user_id, day=day, **counts)
+        for (user_id, day), counts in rows.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('posts', models.IntegerField(default=0)),
+                ('likes', models.IntegerField(default=0)),
+                ('bookmarks', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Author daily stats',
+                'db_table': 'api_author_daily_stats',
+                'unique_together': {('user', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_author_stats, migrations.RunPython.noop),
+    ]
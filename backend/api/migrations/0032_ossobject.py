@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-17 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0031_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OSSObject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=1024, unique=True)),
+                ('directory', models.CharField(blank=True, max_length=1024)),
+                ('size', models.BigIntegerField(default=0)),
+                ('etag', models.CharField(blank=True, max_length=100)),
+                ('last_modified', models.DateTimeField()),
+                ('is_image', models.BooleanField(default=False)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'api_oss_object',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ossobject',
+            index=models.Index(fields=['key'], name='oss_object_key_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='ossobject',
+            index=models.Index(condition=models.Q(('is_image', True)), fields=['-last_modified', 'key'], name='oss_object_image_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-17 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0032_ossobject'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='translationjob',
+            name='kind',
+            field=models.CharField(choices=[('post', 'Post'), ('project', 'Project'), ('gallery', 'Gallery photo processing')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 4.2 on 2026-10-17 13:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import defaultdict
+from django.db.models import Count
+from django.utils import timezone
+
+
+def backfill_popularity(apps, schema_editor):
+    """回填文章点赞数、作者分类汇总和按发布当天计的历史浏览量"""
+    Post = apps.get_model('api', 'Post')
+    AuthorDailyStats = apps.get_model('api', 'AuthorDailyStats')
+    AuthorCategoryStats = apps.get_model('api', 'AuthorCategoryStats')
+
+    views = defaultdict(int)
+    categories = defaultdict(lambda: defaultdict(int))
+    for pk, user_id, category_id, date, post_views, likes in Post.objects.annotate(
+            liked=Count('likes', distinct=True)).values_list(
+                'pk', 'user_id', 'category_id', 'date', 'views', 'liked'):
+        if likes:
+            Post.objects.filter(pk=pk).update(like_count=likes)
+        views[(user_id, timezone.localdate(date))] += post_views
+        if category_id is not None:
+            categories[(user_id, category_id)]['posts'] += 1
+            categories[(user_id, category_id)]['likes'] += likes
+
+    for (user_id, day), count in views.items():
+        if count:
+            AuthorDailyStats.objects.filter(user_id=user_id, day=day).update(views=count)
+
+    AuthorCategoryStats.objects.bulk_create([
+        AuthorCategoryStats(user_id=user_id, category_id=category_id, **counts)
+        for (user_id, category_id), counts in categories.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0033_translationjob_gallery_kind'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorCategoryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts', models.IntegerField(default=0)),
+                ('likes', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Author category stats',
+                'db_table': 'api_author_category_stats',
+            },
+        ),
+        migrations.AddField(
+            model_name='authordailystats',
+            name='views',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', '-like_count', '-date'], name='post_user_popular_idx'),
+        ),
+        migrations.AddField(
+            model_name='authorcategorystats',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='author_stats', to='api.category'),
+        ),
+        migrations.AddField(
+            model_name='authorcategorystats',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='authorcategorystats',
+            unique_together={('user', 'category')},
+        ),
+        migrations.RunPython(backfill_popularity, migrations.RunPython.noop),
+    ]
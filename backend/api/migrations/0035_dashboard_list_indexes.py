@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-17 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0034_author_category_stats'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_post_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_user_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', '-id'], name='post_user_id_idx'),
+        ),
+    ]
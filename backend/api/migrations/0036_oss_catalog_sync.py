@@ -0,0 +1,44 @@
+# Generated by Django 4.2 on 2026-10-17 13:20
+
+from django.db import migrations, models
+from django.db.models import F, Func, Value
+from django.db.models.functions import Lower
+
+
+def backfill_names(apps, schema_editor):
+    """文件名取 key 最后一个 / 之后的部分，转小写"""
+    OSSObject = apps.get_model('api', 'OSSObject')
+    OSSObject.objects.update(name=Lower(Func(
+        F('key'), Value('^.*/'), Value(''), function='regexp_replace')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0035_dashboard_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OSSCatalogSync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=1024, unique=True)),
+                ('objects_count', models.IntegerField(default=0)),
+                ('completed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'api_oss_catalog_sync',
+            },
+        ),
+        migrations.AddField(
+            model_name='ossobject',
+            name='name',
+            field=models.CharField(blank=True, max_length=1024),
+        ),
+        migrations.AddIndex(
+            model_name='ossobject',
+            index=models.Index(fields=['name'], name='oss_object_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(backfill_names, migrations.RunPython.noop),
+    ]
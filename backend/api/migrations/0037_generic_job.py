@@ -0,0 +1,55 @@
+# Generated by Django 4.2 on 2026-10-17 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """TranslationJob 改为通用的 Job，保留已有任务"""
+
+    dependencies = [
+        ('api', '0036_oss_catalog_sync'),
+    ]
+
+    operations = [
+        migrations.RenameModel(
+            old_name='TranslationJob',
+            new_name='Job',
+        ),
+        migrations.AlterModelTable(
+            name='job',
+            table='api_job',
+        ),
+        migrations.RenameIndex(
+            model_name='job',
+            new_name='api_job_status_84fd39_idx',
+            old_name='api_transla_status_e7105a_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='job',
+            new_name='api_job_kind_075c5d_idx',
+            old_name='api_transla_kind_61ffeb_idx',
+        ),
+        migrations.RemoveConstraint(
+            model_name='job',
+            name='unique_pending_translation_job',
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('kind', 'object_id', 'language'), name='unique_pending_job'),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('post', 'Post translation'), ('project', 'Project translation'), ('gallery', 'Gallery photo processing')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='language',
+            field=models.CharField(blank=True, max_length=2),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='source_lang',
+            field=models.CharField(blank=True, max_length=2),
+        ),
+    ]
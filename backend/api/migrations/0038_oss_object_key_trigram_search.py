@@ -0,0 +1,55 @@
+# Generated by Django 4.2 on 2026-10-17 13:48
+
+import django.contrib.postgres.indexes
+from django.db import DatabaseError, migrations, transaction
+import django.db.models.functions.text
+
+TRIGRAM_INDEX = django.contrib.postgres.indexes.GinIndex(
+    django.contrib.postgres.indexes.OpClass(
+        django.db.models.functions.text.Upper('key'), name='gin_trgm_ops'),
+    name='oss_object_key_trgm_idx',
+)
+
+
+def add_trigram_index(apps, schema_editor):
+    """pg_trgm 不可用（未安装或无权限）时跳过索引，key__icontains 搜索顺序扫描"""
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError as e:
+        print(f"\n[WARNING] pg_trgm unavailable, OSS search stays unindexed: {str(e).splitlines()[0]}")
+        return
+    schema_editor.add_index(apps.get_model('api', 'OSSObject'), TRIGRAM_INDEX)
+
+
+def remove_trigram_index(apps, schema_editor):
+    schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX.name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0037_generic_job'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ossobject',
+            name='oss_object_name_prefix_idx',
+        ),
+        migrations.RemoveField(
+            model_name='ossobject',
+            name='name',
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_trigram_index, remove_trigram_index),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='ossobject',
+                    index=TRIGRAM_INDEX,
+                ),
+            ],
+        ),
+    ]
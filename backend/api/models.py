@@ -1,30 +1,42 @@
-from api.core.models import User, Profile, Role
+from api.core.models import User, Profile, Role, TranslationMemory
 from api.blog.models import (
     Category,
     Post,
     PostTranslation,
     Comment,
     Bookmark,
-    Notification
+    Notification,
+    AuthorDailyStats,
+    AuthorCategoryStats
 )
 from api.projects.models import (
     Project,
     ProjectTranslation,
     ProjectSkill
 )
+from api.jobs.models import Job
+from api.search.models import SearchDocument
+from api.oss.models import OSSCatalogSync, OSSObject
 
 # 导出所有模型
 __all__ = [
     'User',
     'Role',
     'Profile',
+    'TranslationMemory',
     'Category',
     'Post',
     'PostTranslation',
     'Comment',
     'Bookmark',
     'Notification',
+    'AuthorDailyStats',
+    'AuthorCategoryStats',
     'Project',
     'ProjectTranslation',
-    'ProjectSkill'
+    'ProjectSkill',
+    'Job',
+    'SearchDocument',
+    'OSSObject',
+    'OSSCatalogSync'
 ]
@@ -0,0 +1,193 @@
+import os
+from datetime import timedelta
+
+from alibabacloud_oss_v2.models import ListObjectsV2Request
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from api.oss.models import OSSCatalogSync, OSSObject
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp', '.ico')
+
+CATALOG_FIELDS = ['directory', 'size', 'etag', 'last_modified', 'is_image', 'synced_at']
+
+
+def is_image_key(key):
+    return key.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def build_catalog_object(key, size, etag, last_modified):
+    return OSSObject(
+        key=key,
+        directory=key.rsplit('/', 1)[0] if '/' in key else '',
+        size=size or 0,
+        etag=etag or '',
+        last_modified=last_modified or timezone.now(),
+        is_image=is_image_key(key),
+        synced_at=timezone.now(),
+    )
+
+
+def build_file_entry(key, size, last_modified, etag, prefix):
+    """图片列表接口返回的单个文件，directory 为相对 prefix 的目录"""
+    bucket_name = os.getenv('OSS_BUCKET')
+    region = os.getenv('OSS_REGION')
+
+    path_parts = key.split('/')
+    prefix_parts = prefix.rstrip('/').split('/') if prefix else []
+    relative_parts = path_parts[len(
+        prefix_parts):-1] if len(prefix_parts) > 0 else path_parts[:-1]
+
+    if relative_parts:
+        directory_path = '/'.join(relative_parts)
+        directory_name = relative_parts[-1]
+    else:
+        directory_path = ''
+        directory_name = prefix.rstrip('/').split('/')[-1] if prefix else 'root'
+
+    return {
+        'name': key,
+        'url': f"https://{bucket_name}.{region}.aliyuncs.com/{key}",
+        'size': size,
+        'lastModified': last_modified.isoformat() if last_modified else None,
+        'etag': etag,
+        'directory': directory_path,
+        'directoryName': directory_name,
+        'fileName': path_parts[-1],
+        'fullPath': key,
+    }
+
+
+def record_object(key, size, etag, last_modified=None):
+    """上传成功后写入目录，失败只记录日志，不影响上传结果"""
+    try:
+        OSSObject.objects.bulk_create(
+            [build_catalog_object(key, size, etag, last_modified)],
+            update_conflicts=True,
+            unique_fields=['key'],
+            update_fields=CATALOG_FIELDS,
+        )
+    except DatabaseError as e:
+        print(f"[WARNING] OSS catalog update failed for {key}: {str(e)}")
+
+
+def forget_objects(keys):
+    """删除成功后从目录移除"""
+    if not keys:
+        return
+    try:
+        OSSObject.objects.filter(key__in=keys).delete()
+    except DatabaseError as e:
+        print(f"[WARNING] OSS catalog delete failed: {str(e)}")
+
+
+def catalog_ready(prefix=''):
+    """
+    覆盖 prefix 的对账是否在 OSS_CATALOG_MAX_AGE 秒内完成过
+
+    只看对账记录，不看目录是否有数据：首次对账前上传写入的记录不完整。
+    用 STS 凭证直传的文件不经过 record_object，只有对账能补上，
+    对账过期后回退到从 bucket 列举，避免这些文件一直查不到。
+    """
+    syncs = OSSCatalogSync.objects.all()
+    max_age = getattr(settings, 'OSS_CATALOG_MAX_AGE', 0)
+    if max_age:
+        syncs = syncs.filter(completed_at__gte=timezone.now() - timedelta(seconds=max_age))
+    return any(
+        prefix.startswith(synced)
+        for synced in syncs.values_list('prefix', flat=True)
+    )
+
+
+def reconcile_interval():
+    """任务 worker 对账整个 bucket 的间隔（秒），0 表示只通过 reconcile_oss_catalog 命令对账"""
+    return getattr(settings, 'OSS_CATALOG_RECONCILE_INTERVAL', 3600)
+
+
+def reconcile_if_due(client, bucket_name):
+    """
+    距上次整个 bucket 的对账超过 reconcile_interval 时对账一次
+
+    多个 worker 进程各自检查，刚有其他进程完成对账时跳过。失败只记录日志。
+
+    Returns:
+        reconcile_catalog 的结果，未到时间或失败时为 None
+    """
+    due = timezone.now() - timedelta(seconds=reconcile_interval())
+    if OSSCatalogSync.objects.filter(prefix='', completed_at__gte=due).exists():
+        return None
+    try:
+        return reconcile_catalog(client, bucket_name)
+    except Exception as e:
+        print(f"[WARNING] OSS catalog reconcile failed: {str(e)}")
+        return None
+
+
+def list_catalog_files(prefix='uploads/', search='', page=1, page_size=50, image_only=True):
+    """
+    从目录分页查询，返回结构与 list_files_from_oss 相同
+
+    前缀走 varchar_pattern_ops 索引；搜索与 bucket 列举一致，匹配整个 key 的
+    子串（不区分大小写），安装了 pg_trgm 时走三元组 GIN 索引，否则顺序扫描。
+    图片按 (-last_modified, key) 部分索引排序，每次只读取一页。
+    """
+    queryset = OSSObject.objects.filter(key__startswith=prefix)
+    if image_only:
+        queryset = queryset.filter(is_image=True)
+    if search:
+        queryset = queryset.filter(key__icontains=search)
+
+    total_count = queryset.count()
+    start_index = (page - 1) * page_size
+    rows = queryset.order_by('-last_modified', 'key').values_list(
+        'key', 'size', 'last_modified', 'etag')[start_index:start_index + page_size]
+
+    return {
+        'count': total_count,
+        'page': page,
+        'pageSize': page_size,
+        'totalPages': (total_count + page_size - 1) // page_size,
+        'results': [build_file_entry(*row, prefix) for row in rows],
+        'prefix': prefix,
+    }
+
+
+def reconcile_catalog(client, bucket_name, prefix='', batch_size=1000):
+    """
+    以 bucket 为准对账：列举 prefix 下全部对象写入目录，删除本次未出现的记录
+
+    本次开始后写入的记录（对账期间的上传）synced_at 更晚，不会被删除。
+    完成后记录对账，此后该前缀下的列表和搜索才查询目录。
+
+    Returns:
+        {'seen': 列举到的对象数, 'added': 新增数, 'removed': 删除数}
+    """
+    started = timezone.now()
+    before = OSSObject.objects.filter(key__startswith=prefix).count()
+
+    seen = 0
+    paginator = client.list_objects_v2_paginator()
+    request = ListObjectsV2Request(
+        bucket=bucket_name, prefix=prefix, max_keys=batch_size)
+    for page_result in paginator.iter_page(request):
+        objects = [
+            build_catalog_object(obj.key, obj.size, obj.etag, obj.last_modified)
+            for obj in page_result.contents or []
+            if not obj.key.endswith('/')
+        ]
+        if objects:
+            OSSObject.objects.bulk_create(
+                objects,
+                update_conflicts=True,
+                unique_fields=['key'],
+                update_fields=CATALOG_FIELDS,
+            )
+        seen += len(objects)
+
+    removed, _ = OSSObject.objects.filter(
+        key__startswith=prefix, synced_at__lt=started).delete()
+    after = OSSObject.objects.filter(key__startswith=prefix).count()
+    OSSCatalogSync.objects.update_or_create(
+        prefix=prefix, defaults={'objects_count': seen, 'completed_at': timezone.now()})
+    return {'seen': seen, 'added': after - before + removed, 'removed': removed}
@@ -0,0 +1,127 @@
+import os
+import threading
+
+import alibabacloud_oss_v2 as oss
+from alibabacloud_credentials.client import Client as CredentialsClient
+
+DEFAULT_MAX_CONNECTIONS = 20
+
+
+def env_number(name, default, cast=int):
+    try:
+        return cast(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class OSSClientManager:
+    """
+    进程级共享的 OSS 客户端
+
+    之前每次上传、删除、列举都会重新创建配置、凭证和 oss.Client，每个客户端
+    带一个新的 requests 会话，无法复用 TLS 连接。这里第一次使用时创建客户端，
+    之后所有调用共用同一个连接池（keep-alive）。
+
+    - 连接池大小 OSS_MAX_CONNECTIONS，超时 OSS_CONNECT_TIMEOUT / OSS_READWRITE_TIMEOUT
+    - OSS_ENDPOINT 可替换默认的 https://<region>.aliyuncs.com，如本地兼容服务
+    - 凭证见 build_credentials_provider：固定 AccessKey 读环境变量，
+      临时凭证由 alibabacloud_credentials 的凭证链在过期前自动刷新
+    - gunicorn 预加载后 fork 出的 worker 不继承父进程的连接，首次使用时重新创建
+    """
+
+    def __init__(self, **config_overrides):
+        self.config_overrides = config_overrides
+        self._lock = threading.Lock()
+        self._client = None
+        self._http_client = None
+        self._credentials_provider = None
+
+    @staticmethod
+    def signing_region():
+        """签名使用的地域：OSS_REGION 去掉 oss- 前缀，如 cn-shanghai"""
+        region = os.getenv('OSS_REGION', '')
+        return region.replace('oss-', '') if region.startswith('oss-') else region
+
+    def build_config(self):
+        region = os.getenv('OSS_REGION', '')
+
+        cfg = oss.config.load_default()
+        cfg.region = self.signing_region()
+        cfg.endpoint = os.getenv('OSS_ENDPOINT') or f"https://{region}.aliyuncs.com"
+        cfg.credentials_provider = self.get_credentials_provider()
+        self._http_client = oss.transport.RequestsHttpClient(
+            max_connections=env_number(
+                'OSS_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS),
+            connect_timeout=env_number('OSS_CONNECT_TIMEOUT', 10, float),
+            readwrite_timeout=env_number('OSS_READWRITE_TIMEOUT', 20, float),
+        )
+        cfg.http_client = self._http_client
+        for name, value in self.config_overrides.items():
+            setattr(cfg, name, value)
+        return cfg
+
+    def get_client(self):
+        client = self._client
+        if client is not None:
+            return client
+        with self._lock:
+            if self._client is None:
+                self._client = oss.Client(self.build_config())
+            return self._client
+
+    def get_credentials_provider(self):
+        """与客户端共用的凭证提供者，PostObject 表单签名也从这里取凭证"""
+        provider = self._credentials_provider
+        if provider is None:
+            provider = self._credentials_provider = self.build_credentials_provider()
+        return provider
+
+    def get_credentials(self):
+        return self.get_credentials_provider().get_credentials()
+
+    def build_credentials_provider(self):
+        """
+        OSS 请求签名使用的凭证
+
+        配置了 OSS_ACCESS_KEY_ID / OSS_ACCESS_KEY_SECRET 时使用这对固定 AccessKey，
+        轮换后需要重启进程。未配置时交给 alibabacloud_credentials 的默认凭证链
+        （ALIBABA_CLOUD_* 环境变量、RRSA/OIDC、~/.alibabacloud/credentials、
+        ECS RAM 角色、ALIBABA_CLOUD_CREDENTIALS_URI），其中的 STS 临时凭证
+        由凭证链缓存并在过期前刷新。
+        """
+        if os.getenv('OSS_ACCESS_KEY_ID'):
+            return oss.credentials.EnvironmentVariableCredentialsProvider()
+
+        chain = CredentialsClient()
+
+        def get_credentials():
+            credential = chain.get_credential()
+            return oss.credentials.Credentials(
+                access_key_id=credential.access_key_id,
+                access_key_secret=credential.access_key_secret,
+                security_token=credential.security_token,
+            )
+
+        return oss.credentials.CredentialsProviderFunc(get_credentials)
+
+    def reset(self):
+        """关闭连接池，下次使用时重新创建客户端和凭证"""
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._client = None
+            self._http_client = None
+            self._credentials_provider = None
+
+    def _after_fork(self):
+        # 子进程不能复用父进程的套接字，也不能等待父进程持有的锁
+        self._lock = threading.Lock()
+        self._client = None
+        self._http_client = None
+        self._credentials_provider = None
+
+
+oss_clients = OSSClientManager()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=oss_clients._after_fork)
@@ -0,0 +1,57 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Upper
+
+
+class OSSObject(models.Model):
+    """
+    OSS 对象目录，图片列表、搜索和分页直接查询本表，不再逐页列举整个 bucket
+
+    上传、删除时由 api/oss/utils.py 同步更新，任务 worker 每
+    OSS_CATALOG_RECONCILE_INTERVAL 秒（或 reconcile_oss_catalog 命令）与 bucket
+    对账，补上绕过接口（如前端直传、控制台操作）产生的差异。
+    """
+    key = models.CharField(max_length=1024, unique=True)
+    directory = models.CharField(max_length=1024, blank=True)
+    size = models.BigIntegerField(default=0)
+    etag = models.CharField(max_length=100, blank=True)
+    last_modified = models.DateTimeField()
+    is_image = models.BooleanField(default=False)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'api_oss_object'
+        indexes = [
+            # key LIKE 'uploads/%' 前缀查询
+            models.Index(fields=['key'], name='oss_object_key_prefix_idx',
+                         opclasses=['varchar_pattern_ops']),
+            # key__icontains 搜索（UPPER(key) LIKE '%CAT%'），需要 pg_trgm，
+            # 见迁移 0038：扩展不可用时不建此索引，搜索退回顺序扫描
+            GinIndex(OpClass(Upper('key'), name='gin_trgm_ops'),
+                     name='oss_object_key_trgm_idx'),
+            # 图片列表按修改时间倒序分页
+            models.Index(fields=['-last_modified', 'key'], name='oss_object_image_recent_idx',
+                         condition=Q(is_image=True)),
+        ]
+
+    def __str__(self):
+        return self.key
+
+
+class OSSCatalogSync(models.Model):
+    """
+    对象目录的对账记录，reconcile_oss_catalog 完整执行后写入
+
+    目录只有在覆盖请求前缀的对账完成后才用于查询；上传时写入的零星记录
+    不代表目录完整，此时仍从 bucket 列举。
+    """
+    prefix = models.CharField(max_length=1024, unique=True)
+    objects_count = models.IntegerField(default=0)
+    completed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'api_oss_catalog_sync'
+
+    def __str__(self):
+        return self.prefix or '(bucket)'
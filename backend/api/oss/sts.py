@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import time
+
+from aliyunsdkcore.client import AcsClient
+from aliyunsdkcore.profile import region_provider
+from aliyunsdksts.request.v20150401 import AssumeRoleRequest
+
+from api.core.metrics import OSS_LATENCY
+from api.core.profiling import timed
+from api.oss.client import env_number
+
+region_provider.modify_point('Sts', 'cn-hangzhou', 'sts.aliyuncs.com')
+
+DEFAULT_DURATION = 900
+DEFAULT_REFRESH_BEFORE = 300
+MIN_REMAINING = 60
+
+
+class STSCredentialsCache:
+    """
+    进程级共享的 STS 临时凭证
+
+    之前每次请求 oss/credentials/ 都新建 AcsClient 并同步调用 AssumeRole，
+    而返回的凭证有效期有 OSS_STS_DURATION 秒（默认 900）。这里缓存凭证：
+
+    - 剩余有效期大于 OSS_STS_REFRESH_BEFORE 秒（默认 300）时直接返回
+    - 进入提前刷新窗口后由一个请求负责刷新，其他请求继续拿旧凭证，不排队
+    - 没有可用凭证（首次或剩余不足 60 秒）时所有请求等待同一次调用
+    - 刷新失败但旧凭证仍可用时返回旧凭证
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._acs_client = None
+        self._credentials = None
+        self._expires_at = 0.0
+
+    @property
+    def duration(self):
+        return env_number('OSS_STS_DURATION', DEFAULT_DURATION)
+
+    def get_acs_client(self):
+        if self._acs_client is None:
+            self._acs_client = AcsClient(
+                os.getenv('ALIYUN_OSS_ACCESS_KEY_ID'),
+                os.getenv('ALIYUN_OSS_ACCESS_KEY_SECRET'),
+                'cn-shanghai',
+                timeout=20
+            )
+        return self._acs_client
+
+    @timed('sts')
+    @OSS_LATENCY.time(operation='assume_role')
+    def fetch(self):
+        """调用 AssumeRole，返回 Credentials 字典（AccessKeyId、Expiration 等）"""
+        bucket_name = os.getenv('OSS_BUCKET')
+
+        request_obj = AssumeRoleRequest.AssumeRoleRequest()
+        request_obj.set_RoleArn(os.getenv('OSS_ROLE_ARN'))
+        request_obj.set_RoleSessionName('django-oss-upload')
+        request_obj.set_DurationSeconds(self.duration)
+
+        policy = {
+            "Statement": [{
+                "Effect": "Allow",
+                "Action": ["oss:PutObject", "oss:GetObject"],
+                "Resource": [f"acs:oss:*:*:{bucket_name}/uploads/*"]
+            }],
+            "Version": "1"
+        }
+        request_obj.set_Policy(json.dumps(policy))
+
+        response = self.get_acs_client().do_action_with_exception(request_obj)
+        return json.loads(response)['Credentials']
+
+    def get(self):
+        credentials = self._credentials
+        remaining = self._expires_at - time.monotonic()
+        refresh_before = env_number('OSS_STS_REFRESH_BEFORE', DEFAULT_REFRESH_BEFORE)
+
+        if credentials is not None and remaining > refresh_before:
+            return credentials
+
+        if credentials is not None and remaining > MIN_REMAINING:
+            # 提前刷新：拿不到锁说明已有请求在刷新，先返回旧凭证
+            if not self._lock.acquire(blocking=False):
+                return credentials
+            try:
+                return self._refresh(credentials)
+            finally:
+                self._lock.release()
+
+        with self._lock:
+            return self._refresh(credentials)
+
+    def _refresh(self, seen):
+        """持有锁时调用；等锁期间其他请求已刷新过则直接返回"""
+        if self._credentials is not seen:
+            return self._credentials
+
+        started = time.monotonic()
+        try:
+            credentials = self.fetch()
+        except Exception as e:
+            if seen is not None and self._expires_at - time.monotonic() > MIN_REMAINING:
+                print(f"[WARNING] STS refresh failed, using cached credentials: {str(e)}")
+                return seen
+            raise
+
+        # 按请求发出时刻计算过期时间，不依赖本机与 STS 的时钟差
+        self._credentials = credentials
+        self._expires_at = started + self.duration
+        return credentials
+
+    def reset(self):
+        with self._lock:
+            self._credentials = None
+            self._expires_at = 0.0
+
+    def _after_fork(self):
+        # 凭证可以继续使用，AcsClient 的连接不能与父进程共享
+        self._lock = threading.Lock()
+        self._acs_client = None
+
+
+sts_credentials = STSCredentialsCache()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=sts_credentials._after_fork)
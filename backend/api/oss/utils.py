@@ -1,81 +1,152 @@
+import base64
+import hashlib
+import hmac
 import os
+import tempfile
 import uuid
 import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from urllib.parse import urlencode
-import alibabacloud_oss_v2 as oss
-from alibabacloud_oss_v2.models import ListObjectsV2Request, DeleteObjectRequest, PutObjectRequest
+from alibabacloud_oss_v2.models import (
+    DeleteMultipleObjectsRequest,
+    DeleteObject,
+    DeleteObjectRequest,
+    GetObjectRequest,
+    HeadObjectRequest,
+    ListObjectsV2Request,
+    PutObjectRequest,
+)
+from django.conf import settings
+from api.core.metrics import OSS_LATENCY
+from api.core.profiling import timed
+from api.oss.catalog import (
+    build_file_entry,
+    catalog_ready,
+    forget_objects,
+    is_image_key,
+    list_catalog_files,
+    record_object,
+)
+from api.oss.client import oss_clients
+
+BATCH_DELETE_CHUNK_SIZE = 1000  # DeleteMultipleObjects 单次最多 1000 个
+DEFAULT_MAX_UPLOAD_SIZE = 20 * 1024 * 1024  # 20MB
+DEFAULT_UPLOAD_PART_SIZE = 6 * 1024 * 1024
+DEFAULT_UPLOAD_PARALLEL = 3
+DEFAULT_PRESIGN_EXPIRES = 900
+
+ALLOWED_EXTENSIONS = ['.jpg', '.jpeg', '.png',
+                      '.gif', '.webp', '.svg', '.bmp', '.ico']
 
 
 def get_oss_client():
-    region = os.getenv('OSS_REGION')
-    endpoint = f"https://{region}.aliyuncs.com"
-    actual_region = region.replace(
-        'oss-', '') if region.startswith('oss-') else region
-
-    credentials_provider = oss.credentials.EnvironmentVariableCredentialsProvider()
-
-    cfg = oss.config.load_default()
-    cfg.credentials_provider = credentials_provider
-    cfg.region = actual_region
-    cfg.endpoint = endpoint
+    """进程内共享的 OSS 客户端，见 OSSClientManager"""
+    return oss_clients.get_client()
 
-    return oss.Client(cfg)
 
-
-def upload_file_to_oss(file, directory='uploads'):
+def get_object_url(object_key):
+    bucket_name = os.getenv('OSS_BUCKET')
+    region = os.getenv('OSS_REGION')
+    return f"https://{bucket_name}.{region}.aliyuncs.com/{object_key}"
+
+
+def build_object_key(file_name, directory):
+    """
+    生成 <directory>/<原文件名>_<6 位随机串><扩展名>
+
+    Raises:
+        ValueError: 扩展名不在 ALLOWED_EXTENSIONS 中
+    """
+    original_name, file_ext = os.path.splitext(file_name)
+    file_ext = file_ext.lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise ValueError(
+            f'Invalid file type. Allowed: {", ".join(ALLOWED_EXTENSIONS)}')
+
+    unique_id = str(uuid.uuid4())[:6]
+    return f"{directory}/{original_name}_{unique_id}{file_ext}"
+
+
+def get_stream_size(file):
+    """文件对象从当前位置到末尾的字节数，不读取内容"""
+    position = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell() - position
+    file.seek(position)
+    return size
+
+
+def stream_to_oss(client, bucket_name, object_key, file):
+    """
+    从文件对象流式上传
+
+    小于分片大小时单次 PUT，否则用分片上传并行发送各分片。每个分片按需从
+    文件对应位置读取，TemporaryUploadedFile 不会整体载入内存。分片大小和并发数
+    由 OSS_UPLOAD_PART_SIZE、OSS_UPLOAD_PARALLEL 配置。
+    """
+    uploader = client.uploader(
+        part_size=int(os.getenv('OSS_UPLOAD_PART_SIZE', DEFAULT_UPLOAD_PART_SIZE)),
+        parallel_num=int(os.getenv('OSS_UPLOAD_PARALLEL', DEFAULT_UPLOAD_PARALLEL)),
+    )
+    return uploader.upload_from(
+        PutObjectRequest(bucket=bucket_name, key=object_key),
+        file,
+    )
+
+
+@timed('oss')
+@OSS_LATENCY.time(operation='upload')
+def upload_file_to_oss(file, directory='uploads', max_size=None, object_key=None):
+    """
+    上传文件，文件对象流式上传，bytes 直接 PUT
+
+    Args:
+        max_size: 大小上限（字节），默认 OSS_MAX_UPLOAD_SIZE，未配置时 20MB
+        object_key: 指定对象键（重试时覆盖同一对象），默认按文件名在 directory 下生成
+    """
     try:
-        allowed_extensions = ['.jpg', '.jpeg', '.png',
-                              '.gif', '.webp', '.svg', '.bmp', '.ico']
+        if object_key is None:
+            if hasattr(file, 'name') and file.name:
+                file_name = file.name
+            else:
+                file_name = 'thumbnail.jpg'
+            object_key = build_object_key(file_name, directory)
 
-        if hasattr(file, 'name') and file.name:
-            file_name = file.name
-            file_ext = os.path.splitext(file_name)[1].lower()
+        if max_size is None:
+            max_size = int(os.getenv('OSS_MAX_UPLOAD_SIZE', DEFAULT_MAX_UPLOAD_SIZE))
+        if hasattr(file, 'read'):
+            file_size = file.size if hasattr(file, 'size') else get_stream_size(file)
         else:
-            file_name = 'thumbnail.jpg'
-            file_ext = '.jpg'
-
-        if file_ext not in allowed_extensions:
-            raise ValueError(
-                f'Invalid file type. Allowed: {", ".join(allowed_extensions)}')
-
-        max_size = 20 * 1024 * 1024  # 20MB
-        if hasattr(file, 'size') and file.size > max_size:
+            file_size = len(file)
+        if file_size > max_size:
             raise ValueError(
                 f'File too large. Maximum size: {max_size / 1024 / 1024}MB')
 
-        unique_id = str(uuid.uuid4())[:6]
-        original_name = os.path.splitext(file_name)[0]
-        new_filename = f"{original_name}_{unique_id}{file_ext}"
-
-        object_key = f"{directory}/{new_filename}"
-
         bucket_name = os.getenv('OSS_BUCKET')
-        region = os.getenv('OSS_REGION')
 
         client = get_oss_client()
 
         if hasattr(file, 'read'):
-            file_content = file.read()
+            result = stream_to_oss(client, bucket_name, object_key, file)
         else:
-            file_content = file
-
-        result = client.put_object(
-            PutObjectRequest(
-                bucket=bucket_name,
-                key=object_key,
-                body=file_content
-            ),
-        )
+            result = client.put_object(
+                PutObjectRequest(
+                    bucket=bucket_name,
+                    key=object_key,
+                    body=file
+                ),
+            )
 
         print(f"[INFO] Successfully uploaded: {object_key}")
 
-        file_url = f"https://{bucket_name}.{region}.aliyuncs.com/{object_key}"
+        record_object(object_key, file_size, result.etag)
 
         return {
-            'url': file_url,
+            'url': get_object_url(object_key),
             'object_key': object_key,
-            'filename': new_filename,
-            'size': file.size if hasattr(file, 'size') else len(file_content),
+            'filename': object_key.rsplit('/', 1)[-1],
+            'size': file_size,
             'content_type': file.content_type if hasattr(file, 'content_type') else 'image/jpeg',
         }
 
@@ -84,6 +155,122 @@ def upload_file_to_oss(file, directory='uploads'):
         raise Exception(f"Upload failed: {str(e)}")
 
 
+def sign_post_policy(policy, access_key_secret, date, region):
+    """PostObject V4 签名：用派生密钥对 base64 编码的 policy 做 HMAC-SHA256"""
+    key = ('aliyun_v4' + access_key_secret).encode()
+    for part in (date, region, 'oss', 'aliyun_v4_request'):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return hmac.new(key, policy.encode(), hashlib.sha256).hexdigest()
+
+
+def presign_upload(object_key, content_type='', max_size=None,
+                   expires=DEFAULT_PRESIGN_EXPIRES):
+    """
+    生成浏览器直传用的 PostObject 表单，文件不经过 Django
+
+    policy 把对象键固定为 object_key，并带 content-length-range 条件，
+    超过 max_size（默认 OSS_MAX_UPLOAD_SIZE）的文件由 OSS 直接拒绝，
+    不会先写入存储桶。指定 content_type 时表单的 Content-Type 必须一致。
+
+    Returns:
+        {'url', 'method', 'fields', 'expiration'}，浏览器以 multipart/form-data
+        提交 fields，file 字段放在最后
+    """
+    if max_size is None:
+        max_size = int(os.getenv('OSS_MAX_UPLOAD_SIZE', DEFAULT_MAX_UPLOAD_SIZE))
+    bucket_name = os.getenv('OSS_BUCKET')
+    region = oss_clients.signing_region()
+    credentials = oss_clients.get_credentials()
+
+    now = datetime.now(timezone.utc)
+    date = now.strftime('%Y%m%d')
+    expiration = now + timedelta(seconds=expires)
+    fields = {
+        'key': object_key,
+        'success_action_status': '204',
+        'x-oss-signature-version': 'OSS4-HMAC-SHA256',
+        'x-oss-credential': f'{credentials.access_key_id}/{date}/{region}/oss/aliyun_v4_request',
+        'x-oss-date': now.strftime('%Y%m%dT%H%M%SZ'),
+    }
+    if credentials.security_token:
+        fields['x-oss-security-token'] = credentials.security_token
+    if content_type:
+        fields['Content-Type'] = content_type
+
+    conditions = [{'bucket': bucket_name}, ['eq', '$key', object_key],
+                  ['content-length-range', 1, max_size]]
+    conditions += [{name: value} for name, value in fields.items() if name != 'key']
+    policy = base64.b64encode(json.dumps({
+        'expiration': expiration.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        'conditions': conditions,
+    }).encode()).decode()
+
+    fields['policy'] = policy
+    fields['x-oss-signature'] = sign_post_policy(
+        policy, credentials.access_key_secret, date, region)
+    return {
+        'url': get_object_url('').rstrip('/'),
+        'method': 'POST',
+        'fields': fields,
+        'expiration': expiration.isoformat(),
+    }
+
+
+def is_missing_object_error(error_msg):
+    return 'NoSuchKey' in error_msg or 'does not exist' in error_msg
+
+
+@timed('oss')
+@OSS_LATENCY.time(operation='head')
+def head_object_from_oss(object_key):
+    """
+    查询对象元数据，对象不存在时返回 None
+
+    Returns:
+        HeadObjectResult | None: content_length、etag、last_modified 等
+    """
+    try:
+        return get_oss_client().head_object(HeadObjectRequest(
+            bucket=os.getenv('OSS_BUCKET'),
+            key=object_key,
+        ))
+    except Exception as e:
+        # HEAD 响应没有错误体，只能根据状态码判断
+        if is_missing_object_error(str(e)) or 'Http Status Code: 404.' in str(e):
+            return None
+        raise
+
+
+@timed('oss')
+@OSS_LATENCY.time(operation='download')
+def download_file_from_oss(object_key, block_size=64 * 1024):
+    """
+    流式下载到临时文件，返回已回到开头的文件对象，调用方负责关闭
+
+    不超过 FILE_UPLOAD_MAX_MEMORY_SIZE 时留在内存，更大的写入磁盘，
+    与 Django 处理上传文件的方式一致。
+    """
+    result = get_oss_client().get_object(GetObjectRequest(
+        bucket=os.getenv('OSS_BUCKET'),
+        key=object_key,
+    ))
+    file = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    try:
+        for chunk in result.body.iter_bytes(block_size=block_size):
+            file.write(chunk)
+    except Exception:
+        file.close()
+        raise
+    finally:
+        result.body.close()
+
+    file.seek(0)
+    return file
+
+
+@timed('oss')
+@OSS_LATENCY.time(operation='delete')
 def delete_file_from_oss(object_key):
     try:
         bucket_name = os.getenv('OSS_BUCKET')
@@ -96,57 +283,111 @@ def delete_file_from_oss(object_key):
 
         result = client.delete_object(delete_request)
         print(f"[INFO] Successfully deleted: {object_key}")
+        forget_objects([object_key])
 
         return True
 
     except Exception as e:
         error_msg = str(e)
-        if 'NoSuchKey' in error_msg or 'does not exist' in error_msg:
+        if is_missing_object_error(error_msg):
             print(
                 f"[INFO] Object already deleted or does not exist: {object_key}")
+            forget_objects([object_key])
             return True
 
         print(f"[ERROR] OSS Delete Failed: {error_msg}")
         return False
 
 
+def delete_single_objects(client, bucket_name, object_keys):
+    """
+    并发逐个删除，用于批量删除接口失败或漏删的对象
+
+    Returns:
+        (已删除的 key 列表, 失败列表 [{'key', 'error'}])
+    """
+    def delete(object_key):
+        try:
+            client.delete_object(DeleteObjectRequest(
+                bucket=bucket_name,
+                key=object_key
+            ))
+            return object_key, None
+        except Exception as e:
+            error_msg = str(e)
+            if is_missing_object_error(error_msg):
+                return object_key, None
+            return object_key, error_msg
+
+    deleted, failed = [], []
+    workers = min(int(os.getenv('OSS_DELETE_CONCURRENCY', 8)), len(object_keys))
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        for object_key, error_msg in executor.map(delete, object_keys):
+            if error_msg is None:
+                deleted.append(object_key)
+            else:
+                failed.append({'key': object_key, 'error': error_msg})
+                print(f"[ERROR] Failed to delete {object_key}: {error_msg}")
+    return deleted, failed
+
+
+def delete_object_chunk(client, bucket_name, object_keys):
+    """
+    用 DeleteMultipleObjects 删除一批对象，接口报错时整批改为逐个删除，
+    未出现在返回结果中的对象单独重试
+
+    Returns:
+        (已删除的 key 列表, 失败列表)
+    """
+    try:
+        result = client.delete_multiple_objects(DeleteMultipleObjectsRequest(
+            bucket=bucket_name,
+            objects=[DeleteObject(key=object_key) for object_key in object_keys],
+            quiet=False,
+        ))
+    except Exception as e:
+        print(f"[WARNING] DeleteMultipleObjects failed, deleting one by one: {str(e)}")
+        return delete_single_objects(client, bucket_name, object_keys)
+
+    # 非 quiet 模式下返回所有删除成功的对象，不存在的对象也视为删除成功
+    returned = {item.key for item in result.deleted_objects or []}
+    deleted = [object_key for object_key in object_keys if object_key in returned]
+    missing = [object_key for object_key in object_keys if object_key not in returned]
+    failed = []
+    if missing:
+        retried, failed = delete_single_objects(client, bucket_name, missing)
+        deleted.extend(retried)
+    return deleted, failed
+
+
+@timed('oss')
+@OSS_LATENCY.time(operation='delete_batch')
 def delete_files_from_oss_batch(object_keys):
+    """
+    批量删除对象，每 1000 个调用一次 DeleteMultipleObjects，不限制总数
+
+    Returns:
+        {'deleted', 'failed', 'total_requested', 'total_deleted', 'total_failed'}
+    """
     if not object_keys or not isinstance(object_keys, list):
         raise ValueError('object_keys must be a non-empty array')
 
-    if len(object_keys) > 1000:
-        raise ValueError('Maximum 1000 objects can be deleted at once')
-
     bucket_name = os.getenv('OSS_BUCKET')
     client = get_oss_client()
 
     deleted_objects = []
     failed_objects = []
 
-    for object_key in object_keys:
-        try:
-            delete_request = DeleteObjectRequest(
-                bucket=bucket_name,
-                key=object_key
-            )
-
-            result = client.delete_object(delete_request)
-            deleted_objects.append(object_key)
-            print(f"[INFO] Successfully deleted: {object_key}")
-
-        except Exception as e:
-            error_msg = str(e)
-
-            if 'NoSuchKey' in error_msg or 'does not exist' in error_msg:
-                deleted_objects.append(object_key)
-                print(
-                    f"[INFO] Object already deleted or does not exist: {object_key}")
-            else:
-                failed_objects.append({
-                    'key': object_key,
-                    'error': error_msg
-                })
-                print(f"[ERROR] Failed to delete {object_key}: {error_msg}")
+    # 重复的 key 只删除一次
+    unique_keys = list(dict.fromkeys(object_keys))
+    for start in range(0, len(unique_keys), BATCH_DELETE_CHUNK_SIZE):
+        chunk = unique_keys[start:start + BATCH_DELETE_CHUNK_SIZE]
+        deleted, failed = delete_object_chunk(client, bucket_name, chunk)
+        deleted_objects.extend(deleted)
+        failed_objects.extend(failed)
+        forget_objects(deleted)
+        print(
+            f"[INFO] Batch deleted {len(deleted)}/{len(chunk)} objects")
 
     return {
         'deleted': deleted_objects,
@@ -157,79 +398,61 @@ def delete_files_from_oss_batch(object_keys):
     }
 
 
+@timed('oss')
+@OSS_LATENCY.time(operation='list')
 def list_files_from_oss(prefix='uploads/', search='', page=1, page_size=50, image_only=True):
+    """分页列举文件，目录已建立时查询数据库，否则从 bucket 列举"""
     try:
-        bucket_name = os.getenv('OSS_BUCKET')
-        region = os.getenv('OSS_REGION')
+        if catalog_ready(prefix):
+            return list_catalog_files(prefix, search, page, page_size, image_only)
+        return list_files_from_bucket(prefix, search, page, page_size, image_only)
 
-        client = get_oss_client()
+    except Exception as e:
+        print(f"[ERROR] OSS List Failed: {str(e)}")
+        raise Exception(f"List files failed: {str(e)}")
 
-        req = ListObjectsV2Request(
-            bucket=bucket_name,
-            prefix=prefix,
-            max_keys=1000,
-        )
 
-        paginator = client.list_objects_v2_paginator()
-
-        all_files = []
-        image_extensions = ['.jpg', '.jpeg', '.png',
-                            '.gif', '.webp', '.svg', '.bmp', '.ico']
-
-        for page_result in paginator.iter_page(req):
-            if page_result.contents:
-                for obj in page_result.contents:
-                    if obj.key.endswith('/'):
-                        continue
-
-                    if image_only and not any(obj.key.lower().endswith(ext) for ext in image_extensions):
-                        continue
-
-                    if search and search.lower() not in obj.key.lower():
-                        continue
-
-                    path_parts = obj.key.split('/')
-                    prefix_parts = prefix.rstrip(
-                        '/').split('/') if prefix else []
-                    relative_parts = path_parts[len(
-                        prefix_parts):-1] if len(prefix_parts) > 0 else path_parts[:-1]
-
-                    if relative_parts:
-                        directory_path = '/'.join(relative_parts)
-                        directory_name = relative_parts[-1]
-                    else:
-                        directory_path = ''
-                        directory_name = prefix.rstrip(
-                            '/').split('/')[-1] if prefix else 'root'
-
-                    all_files.append({
-                        'name': obj.key,
-                        'url': f"https://{bucket_name}.{region}.aliyuncs.com/{obj.key}",
-                        'size': obj.size,
-                        'lastModified': obj.last_modified.isoformat() if obj.last_modified else None,
-                        'etag': obj.etag,
-                        'directory': directory_path,
-                        'directoryName': directory_name,
-                        'fileName': path_parts[-1],
-                        'fullPath': obj.key,
-                    })
-
-        all_files.sort(key=lambda x: x['lastModified'] or '', reverse=True)
-
-        total_count = len(all_files)
-        start_index = (page - 1) * page_size
-        end_index = start_index + page_size
-        paginated_files = all_files[start_index:end_index]
+def list_files_from_bucket(prefix='uploads/', search='', page=1, page_size=50, image_only=True):
+    """列举 prefix 下的全部对象后在内存中排序分页，仅在该前缀尚未对账时使用"""
+    bucket_name = os.getenv('OSS_BUCKET')
+    client = get_oss_client()
 
-        return {
-            'count': total_count,
-            'page': page,
-            'pageSize': page_size,
-            'totalPages': (total_count + page_size - 1) // page_size,
-            'results': paginated_files,
-            'prefix': prefix,
-        }
+    req = ListObjectsV2Request(
+        bucket=bucket_name,
+        prefix=prefix,
+        max_keys=1000,
+    )
 
-    except Exception as e:
-        print(f"[ERROR] OSS List Failed: {str(e)}")
-        raise Exception(f"List files failed: {str(e)}")
+    paginator = client.list_objects_v2_paginator()
+
+    all_files = []
+    for page_result in paginator.iter_page(req):
+        if page_result.contents:
+            for obj in page_result.contents:
+                if obj.key.endswith('/'):
+                    continue
+
+                if image_only and not is_image_key(obj.key):
+                    continue
+
+                if search and search.lower() not in obj.key.lower():
+                    continue
+
+                all_files.append(build_file_entry(
+                    obj.key, obj.size, obj.last_modified, obj.etag, prefix))
+
+    all_files.sort(key=lambda x: x['lastModified'] or '', reverse=True)
+
+    total_count = len(all_files)
+    start_index = (page - 1) * page_size
+    end_index = start_index + page_size
+    paginated_files = all_files[start_index:end_index]
+
+    return {
+        'count': total_count,
+        'page': page,
+        'pageSize': page_size,
+        'totalPages': (total_count + page_size - 1) // page_size,
+        'results': paginated_files,
+        'prefix': prefix,
+    }
@@ -1,4 +1,3 @@
-import json
 import os
 from django.http import JsonResponse
 from rest_framework import generics, status
@@ -7,9 +6,7 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from api.core.permissions import CanDelete, IsAdminOrReadOnly
-from aliyunsdkcore.client import AcsClient
-from aliyunsdksts.request.v20150401 import AssumeRoleRequest
-from aliyunsdkcore.profile import region_provider
+from api.oss.sts import sts_credentials
 from api.oss.utils import (
     upload_file_to_oss,
     delete_file_from_oss,
@@ -17,52 +14,23 @@ from api.oss.utils import (
     list_files_from_oss
 )
 
-region_provider.modify_point('Sts', 'cn-hangzhou', 'sts.aliyuncs.com')
-
 
 class OSSCredentialsView(APIView):
     permission_classes = []
 
     def get(self, request):
-        access_key_id = os.getenv('ALIYUN_OSS_ACCESS_KEY_ID')
-        access_key_secret = os.getenv('ALIYUN_OSS_ACCESS_KEY_SECRET')
-        role_arn = os.getenv('OSS_ROLE_ARN')
-        bucket_name = os.getenv('OSS_BUCKET')
-
         try:
-            client = AcsClient(
-                access_key_id,
-                access_key_secret,
-                'cn-shanghai',
-                timeout=20
-            )
-
-            request_obj = AssumeRoleRequest.AssumeRoleRequest()
-            request_obj.set_RoleArn(role_arn)
-            request_obj.set_RoleSessionName('django-oss-upload')
-            request_obj.set_DurationSeconds(900)
-
-            policy = {
-                "Statement": [{
-                    "Effect": "Allow",
-                    "Action": ["oss:PutObject", "oss:GetObject"],
-                    "Resource": [f"acs:oss:*:*:{bucket_name}/uploads/*"]
-                }],
-                "Version": "1"
-            }
-            request_obj.set_Policy(json.dumps(policy))
-
-            response = client.do_action_with_exception(request_obj)
-            result = json.loads(response)
+            # 进程内缓存，临近过期才调用 AssumeRole，见 STSCredentialsCache
+            credentials = sts_credentials.get()
 
             return Response({
                 'StatusCode': 200,
-                'AccessKeyId': result['Credentials']['AccessKeyId'],
-                'AccessKeySecret': result['Credentials']['AccessKeySecret'],
-                'SecurityToken': result['Credentials']['SecurityToken'],
-                'Expiration': result['Credentials']['Expiration'],
+                'AccessKeyId': credentials['AccessKeyId'],
+                'AccessKeySecret': credentials['AccessKeySecret'],
+                'SecurityToken': credentials['SecurityToken'],
+                'Expiration': credentials['Expiration'],
                 'Region': os.getenv('OSS_REGION'),
-                'Bucket': bucket_name
+                'Bucket': os.getenv('OSS_BUCKET')
             })
 
         except Exception as e:
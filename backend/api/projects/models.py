@@ -56,6 +56,13 @@ class Project(models.Model):
     class Meta:
         db_table = 'api_project'
         ordering = ['-created_at']
+        indexes = [
+            # ordering=priority / -priority 两种排序
+            models.Index(fields=['priority', '-created_at'],
+                         name='project_priority_created_idx'),
+            models.Index(fields=['-priority', '-created_at'],
+                         name='project_priority_desc_idx'),
+        ]
 
     def __str__(self):
         return self.slug
@@ -96,6 +103,9 @@ class ProjectTranslation(models.Model):
         validators=[validate_what_i_did]
     )
     extra_info = models.JSONField(default=dict, blank=True)
+    # AI 翻译时各字段、列表项的原文哈希和译文哈希，用于增量翻译和识别人工修改
+    source_hashes = models.JSONField(default=dict, blank=True)
+    translated_hashes = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
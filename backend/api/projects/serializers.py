@@ -103,6 +103,15 @@ class ProjectSerializer(serializers.ModelSerializer):
     involved_areas = serializers.CharField(required=False, allow_blank=True)
     tools = serializers.CharField(required=False, allow_blank=True)
 
+    translation_fields = [
+        'title', 'subtitle', 'description', 'info', 'summary',
+        'tech_summary', 'introduction', 'challenges', 'solutions',
+        'what_i_did', 'extra_info'
+    ]
+    translation_heavy_fields = [
+        'introduction', 'challenges', 'solutions', 'what_i_did'
+    ]
+
     class Meta:
         model = Project
         fields = [
@@ -115,19 +124,10 @@ class ProjectSerializer(serializers.ModelSerializer):
         read_only_fields = ['slug', 'created_by', 'created_at', 'updated_at']
 
     def get_translations(self, obj):
+        fields = self.context.get('translation_fields', self.translation_fields)
         return {
             t.language: {
-                "title": t.title,
-                "subtitle": t.subtitle,
-                "description": t.description,
-                "info": t.info,
-                "summary": t.summary,
-                "tech_summary": t.tech_summary,
-                "introduction": t.introduction,
-                "challenges": t.challenges,
-                "solutions": t.solutions,
-                "what_i_did": t.what_i_did,
-                "extra_info": t.extra_info,
+                field: getattr(t, field) for field in fields
             } for t in obj.translations.all()
         }
 
@@ -1,3 +1,4 @@
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -5,16 +6,30 @@ from rest_framework.response import Response
 from rest_framework import status
 from api.projects.serializers import ProjectSerializer, ProjectSkillSerializer
 from api.projects.models import Project, ProjectSkill, ProjectTranslation
+from api.core.cache import CachedResponseMixin
+from api.core.conditional import ConditionalGetMixin, aggregate_last_modified
+from api.core.mixins import TranslationProjectionMixin
 from api.core.permissions import IsAdminOrReadOnly
-from api.core.translation import translate_text
+from api.jobs.models import Job
 
 
-class ProjectListApiView(generics.ListAPIView):
+class ProjectListApiView(ConditionalGetMixin, CachedResponseMixin, TranslationProjectionMixin, generics.ListAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [AllowAny]
+    cache_namespaces = ('projects', 'skills')
+    translation_list_view = True
+
+    def get_conditional_state(self):
+        return aggregate_last_modified(
+            Project.objects.all(),
+            'updated_at', 'translations__updated_at', 'skills__updated_at'
+        )
 
     def get_queryset(self):
-        queryset = Project.objects.all()
+        queryset = Project.objects.prefetch_related(
+            'skills',
+            Prefetch('translations', queryset=self.get_translation_queryset()),
+        )
         ordering = self.request.query_params.get('ordering')
 
         if ordering == 'priority':
@@ -76,106 +91,13 @@ class ProjectCreateApiView(generics.CreateAPIView):
                         extra_info=source_translation.get('extra_info', {}),
                     )
                 else:
-                    translated_title = translate_text(
-                        source_translation.get('title', ''),
+                    # 加入翻译任务队列，由 worker 在后台执行
+                    Job.objects.enqueue(
+                        Job.KIND_PROJECT,
+                        project.id,
+                        target_lang,
                         source_lang,
-                        target_lang
-                    )
-
-                    translated_description = ''
-                    if source_translation.get('description'):
-                        translated_description = translate_text(
-                            source_translation['description'],
-                            source_lang,
-                            target_lang
-                        )
-
-                    translated_summary = ''
-                    if source_translation.get('summary'):
-                        translated_summary = translate_text(
-                            source_translation['summary'],
-                            source_lang,
-                            target_lang
-                        )
-
-                    translated_tech_summary = ''
-                    if source_translation.get('tech_summary'):
-                        translated_tech_summary = translate_text(
-                            source_translation['tech_summary'],
-                            source_lang,
-                            target_lang
-                        )
-
-                    translated_introduction = ''
-                    if source_translation.get('introduction'):
-                        translated_introduction = translate_text(
-                            source_translation['introduction'],
-                            source_lang,
-                            target_lang
-                        )
-
-                    translated_solutions = ''
-                    if source_translation.get('solutions'):
-                        translated_solutions = translate_text(
-                            source_translation['solutions'],
-                            source_lang,
-                            target_lang
-                        )
-
-                    translated_info = []
-                    for item in source_translation.get('info', []):
-                        if item:
-                            translated_info.append(
-                                translate_text(item, source_lang, target_lang)
-                            )
-
-                    translated_challenges = []
-                    for item in source_translation.get('challenges', []):
-                        if item:
-                            translated_challenges.append(
-                                translate_text(item, source_lang, target_lang)
-                            )
-
-                    translated_what_i_did = []
-                    for item in source_translation.get('what_i_did', []):
-                        if item and isinstance(item, dict):
-                            translated_item = {
-                                'title': translate_text(
-                                    item.get('title', ''),
-                                    source_lang,
-                                    target_lang
-                                ),
-                                'description': translate_text(
-                                    item.get('description', ''),
-                                    source_lang,
-                                    target_lang
-                                ),
-                                'icon': item.get('icon', '')  # icon 不翻译
-                            }
-                            translated_what_i_did.append(translated_item)
-
-                    translated_subtitle = {}
-                    if source_translation.get('subtitle'):
-                        subtitle = source_translation['subtitle']
-                        translated_subtitle = {
-                            'start': translate_text(subtitle.get('start', ''), source_lang, target_lang),
-                            'end': translate_text(subtitle.get('end', ''), source_lang, target_lang),
-                        }
-
-                    ProjectTranslation.objects.create(
-                        project=project,
-                        language=target_lang,
-                        title=translated_title,
-                        subtitle=translated_subtitle,
-                        description=translated_description,
-                        info=translated_info,
-                        summary=translated_summary,
-                        tech_summary=translated_tech_summary,
-                        introduction=translated_introduction,
-                        challenges=translated_challenges,
-                        solutions=translated_solutions,
-                        what_i_did=translated_what_i_did,
-                        extra_info=source_translation.get('extra_info', {}),
+                        source_translation
                     )
         else:
             for lang, translation_data in translations_data.items():
@@ -200,13 +122,25 @@ class ProjectCreateApiView(generics.CreateAPIView):
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 
-class ProjectDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class ProjectDetailAPIView(ConditionalGetMixin, CachedResponseMixin, TranslationProjectionMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [AllowAny]
-    queryset = Project.objects.prefetch_related('skills', 'translations')
+    cache_namespaces = ('projects', 'skills')
     lookup_field = 'slug'
     lookup_url_kwarg = 'project_slug'
 
+    def get_conditional_state(self):
+        return aggregate_last_modified(
+            Project.objects.filter(slug=self.kwargs['project_slug']),
+            'updated_at', 'translations__updated_at', 'skills__updated_at'
+        )
+
+    def get_queryset(self):
+        return Project.objects.prefetch_related(
+            'skills',
+            Prefetch('translations', queryset=self.get_translation_queryset()),
+        )
+
     def get_permissions(self):
         if self.request.method == 'GET':
             return [AllowAny()]
@@ -298,108 +232,13 @@ class ProjectDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
                         }
                     )
                 else:
-                    translated_title = translate_text(
-                        source_translation.get('title', ''),
+                    # 加入翻译任务队列，由 worker 在后台执行
+                    Job.objects.enqueue(
+                        Job.KIND_PROJECT,
+                        project.id,
+                        target_lang,
                         source_lang,
-                        target_lang
-                    )
-
-                    translated_description = ''
-                    if source_translation.get('description'):
-                        translated_description = translate_text(
-                            source_translation['description'],
-                            source_lang,
-                            target_lang
-                        )
-
-                    translated_summary = ''
-                    if source_translation.get('summary'):
-                        translated_summary = translate_text(
-                            source_translation['summary'],
-                            source_lang,
-                            target_lang
-                        )
-
-                    translated_tech_summary = ''
-                    if source_translation.get('tech_summary'):
-                        translated_tech_summary = translate_text(
-                            source_translation['tech_summary'],
-                            source_lang,
-                            target_lang
-                        )
-
-                    translated_introduction = ''
-                    if source_translation.get('introduction'):
-                        translated_introduction = translate_text(
-                            source_translation['introduction'],
-                            source_lang,
-                            target_lang
-                        )
-
-                    translated_solutions = ''
-                    if source_translation.get('solutions'):
-                        translated_solutions = translate_text(
-                            source_translation['solutions'],
-                            source_lang,
-                            target_lang
-                        )
-
-                    translated_info = []
-                    for item in source_translation.get('info', []):
-                        if item:
-                            translated_info.append(
-                                translate_text(item, source_lang, target_lang)
-                            )
-
-                    translated_challenges = []
-                    for item in source_translation.get('challenges', []):
-                        if item:
-                            translated_challenges.append(
-                                translate_text(item, source_lang, target_lang)
-                            )
-
-                    translated_what_i_did = []
-                    for item in source_translation.get('what_i_did', []):
-                        if item and isinstance(item, dict):
-                            translated_item = {
-                                'title': translate_text(
-                                    item.get('title', ''),
-                                    source_lang,
-                                    target_lang
-                                ),
-                                'description': translate_text(
-                                    item.get('description', ''),
-                                    source_lang,
-                                    target_lang
-                                ),
-                                'icon': item.get('icon', '')
-                            }
-                            translated_what_i_did.append(translated_item)
-
-                    translated_subtitle = {}
-                    if source_translation.get('subtitle'):
-                        subtitle = source_translation['subtitle']
-                        translated_subtitle = {
-                            'start': translate_text(subtitle.get('start', ''), source_lang, target_lang),
-                            'end': translate_text(subtitle.get('end', ''), source_lang, target_lang),
-                        }
-
-                    ProjectTranslation.objects.update_or_create(
-                        project=project,
-                        language=target_lang,
-                        defaults={
-                            'title': translated_title,
-                            'subtitle': translated_subtitle,
-                            'description': translated_description,
-                            'info': translated_info,
-                            'summary': translated_summary,
-                            'tech_summary': translated_tech_summary,
-                            'introduction': translated_introduction,
-                            'challenges': translated_challenges,
-                            'solutions': translated_solutions,
-                            'what_i_did': translated_what_i_did,
-                            'extra_info': source_translation.get('extra_info', {}),
-                        }
+                        source_translation
                     )
         else:
             for lang, translation_data in translations_data.items():
@@ -422,7 +261,8 @@ class ProjectDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
                         }
                     )
 
-        response_serializer = self.get_serializer(project)
+        # 重新加载，避免返回预加载时的旧翻译
+        response_serializer = self.get_serializer(self.get_object())
         return Response(response_serializer.data)
 
     def destroy(self, request, *args, **kwargs):
@@ -445,9 +285,13 @@ class ProjectSkillCreateApiView(generics.CreateAPIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class ProjectSkillListApiView(generics.ListAPIView):
+class ProjectSkillListApiView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     serializer_class = ProjectSkillSerializer
     permission_classes = [AllowAny]
+    cache_namespaces = ('skills',)
+
+    def get_conditional_state(self):
+        return aggregate_last_modified(ProjectSkill.objects.all(), 'updated_at')
 
     def get_queryset(self):
         return ProjectSkill.objects.all().order_by('-created_at')
@@ -0,0 +1,190 @@
+import json
+import logging
+import re
+
+from bs4 import BeautifulSoup
+from django.contrib.postgres.search import SearchVector
+from django.db.models import Value
+from django.db.models.signals import post_delete, post_save
+
+from api.blog.models import PostTranslation
+from api.blog.translation import iter_tiptap_text_nodes
+from api.projects.models import ProjectTranslation
+from api.search.models import SearchDocument
+
+logger = logging.getLogger(__name__)
+
+# 各语言的全文搜索配置，中文、日文没有内置分词器，先切成二元组再用 simple
+LANGUAGE_CONFIGS = {
+    'en': 'english',
+    'zh': 'simple',
+    'ja': 'simple',
+}
+CJK_LANGUAGES = {'zh', 'ja'}
+
+# 平假名、片假名、CJK 统一表意文字及扩展 A、兼容表意文字
+CJK_RUN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+
+
+def cjk_bigrams(run):
+    """'缓存优化' -> ['缓存', '存优', '优化']，单字保持不变"""
+    if len(run) < 2:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def segment_cjk_text(text):
+    """把文本中的连续 CJK 字符替换为空格分隔的二元组，其余部分不变"""
+    return CJK_RUN.sub(lambda match: f" {' '.join(cjk_bigrams(match.group()))} ", text)
+
+
+def rich_text_to_plain(content):
+    """TipTap JSON 或 HTML 转为纯文本"""
+    if not content:
+        return ''
+    try:
+        doc = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        doc = None
+    if isinstance(doc, dict) and doc.get('type') == 'doc':
+        return '\n'.join(node['text'].strip() for node in iter_tiptap_text_nodes(doc))
+    return BeautifulSoup(content, 'html.parser').get_text('\n', strip=True)
+
+
+def collect_strings(value):
+    """提取 JSON 字段中的全部字符串"""
+    stack, strings = [value], []
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            if item.strip():
+                strings.append(item.strip())
+        elif isinstance(item, dict):
+            stack.extend(reversed(list(item.values())))
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
+    return strings
+
+
+def build_search_vector(language, weighted_parts):
+    """
+    按语言生成加权的 SearchVector 表达式
+
+    Args:
+        weighted_parts: [(权重 'A'-'D', 文本)]
+    """
+    config = LANGUAGE_CONFIGS.get(language, 'simple')
+    vector = None
+    for weight, text in weighted_parts:
+        if not text:
+            continue
+        if language in CJK_LANGUAGES:
+            text = segment_cjk_text(text)
+        part = SearchVector(Value(text), weight=weight, config=config)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def save_document(lookup, kind, language, title, weighted_parts):
+    body = '\n'.join(text for weight, text in weighted_parts
+                     if text and weight != 'A')
+    document, _ = SearchDocument.objects.update_or_create(
+        **lookup, language=language,
+        defaults={'kind': kind, 'title': title[:200], 'body': body},
+    )
+    SearchDocument.objects.filter(pk=document.pk).update(
+        search_vector=build_search_vector(language, weighted_parts))
+    return document
+
+
+def index_post_translation(translation):
+    """更新一篇文章某种语言的索引：标题 A，摘要 B，正文 C"""
+    return save_document(
+        {'post_id': translation.post_id},
+        SearchDocument.KIND_POST,
+        translation.language,
+        translation.title or '',
+        [
+            ('A', translation.title or ''),
+            ('B', translation.description or ''),
+            ('C', rich_text_to_plain(translation.content)),
+        ],
+    )
+
+
+def index_project_translation(translation):
+    """更新一个项目某种语言的索引：标题 A，简介 B，其余文本字段 C"""
+    details = [
+        translation.tech_summary,
+        translation.introduction,
+        translation.solutions,
+        *collect_strings(translation.info),
+        *collect_strings(translation.challenges),
+        *collect_strings([
+            {key: item.get(key) for key in ('title', 'description')}
+            for item in translation.what_i_did or [] if isinstance(item, dict)
+        ]),
+    ]
+    return save_document(
+        {'project_id': translation.project_id},
+        SearchDocument.KIND_PROJECT,
+        translation.language,
+        translation.title or '',
+        [
+            ('A', translation.title or ''),
+            ('B', '\n'.join(filter(None, [
+                translation.description, translation.summary]))),
+            ('C', '\n'.join(filter(None, details))),
+        ],
+    )
+
+
+def on_post_translation_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_post_translation(instance)
+
+
+def on_post_translation_deleted(sender, instance, **kwargs):
+    SearchDocument.objects.filter(
+        post_id=instance.post_id, language=instance.language).delete()
+
+
+def on_project_translation_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_project_translation(instance)
+
+
+def on_project_translation_deleted(sender, instance, **kwargs):
+    SearchDocument.objects.filter(
+        project_id=instance.project_id, language=instance.language).delete()
+
+
+def connect_search_indexing():
+    """注册译文保存、删除时更新索引，在 ApiConfig.ready 中调用"""
+    post_save.connect(on_post_translation_saved, sender=PostTranslation,
+                      dispatch_uid='search:post-translation-saved')
+    post_delete.connect(on_post_translation_deleted, sender=PostTranslation,
+                        dispatch_uid='search:post-translation-deleted')
+    post_save.connect(on_project_translation_saved, sender=ProjectTranslation,
+                      dispatch_uid='search:project-translation-saved')
+    post_delete.connect(on_project_translation_deleted, sender=ProjectTranslation,
+                        dispatch_uid='search:project-translation-deleted')
+
+
+def rebuild_search_index():
+    """
+    重建全部索引，用于首次部署和修改分词规则之后
+
+    Returns:
+        int: 索引的文档数
+    """
+    SearchDocument.objects.all().delete()
+    count = 0
+    for translation in PostTranslation.objects.iterator():
+        index_post_translation(translation)
+        count += 1
+    for translation in ProjectTranslation.objects.iterator():
+        index_project_translation(translation)
+        count += 1
+    logger.info(f"Rebuilt search index with {count} documents")
+    return count
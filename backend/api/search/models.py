@@ -0,0 +1,51 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+from api.blog.models import Post
+from api.projects.models import Project
+
+
+class SearchDocument(models.Model):
+    """
+    全文搜索索引，每篇文章 / 每个项目的每种语言一行
+
+    search_vector 按语言使用不同的分词配置：英文用 english（词干化），
+    中文、日文先切成二元组再用 simple，见 api/search/index.py。
+    title / body 保存纯文本，用于高亮摘要。
+    """
+    KIND_POST = 'post'
+    KIND_PROJECT = 'project'
+    KIND_CHOICES = (
+        (KIND_POST, 'Post'),
+        (KIND_PROJECT, 'Project'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='search_documents')
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='search_documents')
+    language = models.CharField(max_length=2)
+    title = models.CharField(max_length=200)
+    body = models.TextField(blank=True)
+    search_vector = SearchVectorField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'api_search_document'
+        indexes = [
+            GinIndex(fields=['search_vector'],
+                     name='search_document_vector_gin'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'language'], name='search_document_post_language'),
+            models.UniqueConstraint(
+                fields=['project', 'language'], name='search_document_project_language'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.post_id or self.project_id} - {self.language}"
@@ -0,0 +1,114 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Case, F, FloatField, Q, Subquery, When
+from django.utils.html import escape
+
+from api.search.index import CJK_LANGUAGES, CJK_RUN, LANGUAGE_CONFIGS, cjk_bigrams
+from api.search.models import SearchDocument
+
+WORD = re.compile(r'\w+')
+# 标题 A、摘要 B、正文 C、未使用 D 的权重
+RANK_WEIGHTS = [0.1, 0.2, 0.4, 1.0]
+
+
+def split_terms(text):
+    """查询文本拆成词：连续 CJK 字符作为一个词，其余按单词拆分"""
+    terms = []
+    for word in WORD.findall(text):
+        terms.extend(part.lower()
+                     for part in CJK_RUN.split(word) if part.strip('_'))
+        terms.extend(CJK_RUN.findall(word))
+    # 去重并保持顺序
+    return list(dict.fromkeys(terms))
+
+
+def build_cjk_tsquery(terms):
+    """
+    生成中文、日文索引使用的 tsquery
+
+    CJK 词拆成二元组并要求相邻（'缓存' <-> '存优'），单字按前缀匹配，
+    其他单词原样匹配，各词之间为 AND。
+    """
+    parts = []
+    for term in terms:
+        if CJK_RUN.fullmatch(term):
+            if len(term) == 1:
+                parts.append(f"'{term}':*")
+            else:
+                parts.append(' <-> '.join(f"'{gram}'" for gram in cjk_bigrams(term)))
+        else:
+            parts.append(f"'{term}'")
+    return ' & '.join(f'({part})' for part in parts)
+
+
+def search_documents(text, language=None):
+    """
+    按相关度排序的搜索结果
+
+    英文文档用 websearch_to_tsquery('english')，中文、日文文档用二元组 tsquery，
+    两类条件 OR 在一起，走同一个 GIN 索引。未指定语言时同一对象只保留相关度最高的语言。
+
+    Returns:
+        (查询集, 查询词)，查询词用于高亮；没有可搜索的词时查询集为空
+    """
+    terms = split_terms(text)
+    if not terms:
+        return SearchDocument.objects.none(), terms
+
+    cjk_languages = sorted(CJK_LANGUAGES)
+    other_languages = sorted(set(LANGUAGE_CONFIGS) - CJK_LANGUAGES)
+    cjk_query = SearchQuery(build_cjk_tsquery(terms), config='simple', search_type='raw')
+    english_query = SearchQuery(text, config='english', search_type='websearch')
+
+    matches = Q(language__in=cjk_languages, search_vector=cjk_query) | \
+        Q(language__in=other_languages, search_vector=english_query)
+    rank = Case(
+        When(language__in=cjk_languages,
+             then=SearchRank(F('search_vector'), cjk_query, weights=RANK_WEIGHTS)),
+        default=SearchRank(F('search_vector'), english_query, weights=RANK_WEIGHTS),
+        output_field=FloatField(),
+    )
+
+    queryset = SearchDocument.objects.filter(matches)
+    if language:
+        queryset = queryset.filter(language=language)
+    else:
+        best = queryset.annotate(rank=rank).order_by(
+            'kind', 'post_id', 'project_id', '-rank'
+        ).distinct('kind', 'post_id', 'project_id').values('pk')
+        queryset = SearchDocument.objects.filter(pk__in=Subquery(best))
+
+    queryset = queryset.annotate(rank=rank).order_by('-rank', 'pk')
+    return queryset, terms
+
+
+def highlight(text, terms, width=160):
+    """
+    截取第一个命中词附近的片段，命中词用 <mark> 包裹，其余内容转义
+
+    按子串匹配，'cache' 可以命中 'caches'。
+    """
+    if not text:
+        return ''
+    if not terms:
+        return escape(text[:width])
+
+    pattern = re.compile('|'.join(
+        re.escape(term) for term in sorted(terms, key=len, reverse=True)
+    ), re.IGNORECASE)
+
+    match = pattern.search(text)
+    start = max(0, match.start() - width // 3) if match else 0
+    snippet = text[start:start + width]
+
+    pieces, last = [], 0
+    for found in pattern.finditer(snippet):
+        pieces.append(escape(snippet[last:found.start()]))
+        pieces.append(f'<mark>{escape(found.group())}</mark>')
+        last = found.end()
+    pieces.append(escape(snippet[last:]))
+
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + width < len(text) else ''
+    return f"{prefix}{''.join(pieces)}{suffix}"
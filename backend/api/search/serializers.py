@@ -0,0 +1,43 @@
+from rest_framework import serializers
+
+from api.search.models import SearchDocument
+from api.search.query import highlight
+
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    """搜索结果，context 中的 terms 为查询词，用于生成高亮"""
+    rank = serializers.FloatField(read_only=True)
+    slug = serializers.SerializerMethodField()
+    category = serializers.SerializerMethodField()
+    date = serializers.SerializerMethodField()
+    title_highlight = serializers.SerializerMethodField()
+    highlight = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SearchDocument
+        fields = [
+            'kind', 'language', 'rank', 'slug', 'title', 'title_highlight',
+            'highlight', 'category', 'date'
+        ]
+
+    def get_target(self, obj):
+        return obj.post if obj.kind == SearchDocument.KIND_POST else obj.project
+
+    def get_slug(self, obj):
+        return self.get_target(obj).slug
+
+    def get_category(self, obj):
+        if obj.kind != SearchDocument.KIND_POST or obj.post.category is None:
+            return None
+        return {'title': obj.post.category.title, 'slug': obj.post.category.slug}
+
+    def get_date(self, obj):
+        target = self.get_target(obj)
+        value = target.date if obj.kind == SearchDocument.KIND_POST else target.created_at
+        return serializers.DateTimeField().to_representation(value)
+
+    def get_title_highlight(self, obj):
+        return highlight(obj.title, self.context.get('terms', []), width=200)
+
+    def get_highlight(self, obj):
+        return highlight(obj.body, self.context.get('terms', []))
@@ -0,0 +1,6 @@
+from django.urls import path
+from api.search import views
+
+urlpatterns = [
+    path('search/', views.SearchAPIView.as_view(), name='search'),
+]
@@ -0,0 +1,63 @@
+from django.db.models import Q
+from rest_framework import generics, status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from api.core.pagination import CustomPageNumberPagination
+from api.search.models import SearchDocument
+from api.search.query import search_documents
+from api.search.serializers import SearchResultSerializer
+
+
+class SearchAPIView(generics.ListAPIView):
+    """
+    全文搜索文章和项目
+
+    查询参数：
+        q: 关键词，必填
+        lang: 只搜索该语言，默认搜索全部语言，同一对象只返回最相关的一种
+        type: post / project
+        category: 分类 slug，只返回该分类下的文章
+        status: 文章状态，默认 Active；仅管理员可以搜索其他状态
+    """
+    serializer_class = SearchResultSerializer
+    permission_classes = [AllowAny]
+    pagination_class = CustomPageNumberPagination
+
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('q', '').strip():
+            return Response(
+                {"error": "请提供搜索关键词 q"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return super().list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset, self.terms = search_documents(
+            params.get('q', '').strip(), params.get('lang'))
+
+        kind = params.get('type')
+        if kind in (SearchDocument.KIND_POST, SearchDocument.KIND_PROJECT):
+            queryset = queryset.filter(kind=kind)
+
+        category = params.get('category')
+        if category:
+            queryset = queryset.filter(post__category__slug=category)
+
+        post_status = params.get('status', 'Active')
+        if not self.request.user.is_staff:
+            post_status = 'Active'
+        if post_status == 'Active':
+            # 项目没有状态，视为已发布
+            queryset = queryset.filter(
+                Q(kind=SearchDocument.KIND_PROJECT) | Q(post__status='Active'))
+        else:
+            queryset = queryset.filter(post__status=post_status)
+
+        return queryset.select_related('post__category', 'project')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['terms'] = getattr(self, 'terms', [])
+        return context
@@ -1,8 +1,51 @@
-from django.test import SimpleTestCase
+import base64
+import io
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.request import Request
-from rest_framework.test import APIRequestFactory
+from rest_framework.test import APIClient, APIRequestFactory
 
+from api.blog.models import (
+    AuthorCategoryStats, AuthorDailyStats, Bookmark, Category, Comment, Post,
+    PostTranslation)
+from api.blog.serializers import PostSerializer
+from api.blog import translation as blog_translation
+from api.core import translation
+from api.core.metrics import (
+    HOSTNAME as metrics_hostname, OSS_LATENCY, registry as metrics_registry)
+from api.core.pagination import CustomPageNumberPagination
+from api.core.profiling import timed
+from api.core.cache import response_cache
+from api.core.models import TranslationMemory, User
+from api.management.commands import explain_hot_queries
+from api.core.view_counter import local_buffer, post_views, redis_buffer
+from api.gallery.models import Gallery
+from api.gallery.utils import process_uploaded_photo
+from api.jobs.models import Job
+from api.jobs.worker import JobWorker
+from api.oss import utils as oss_utils
+from api.oss.catalog import catalog_ready, reconcile_if_due
+from api.oss.models import OSSCatalogSync, OSSObject
+from api.oss.client import OSSClientManager, oss_clients
+from api.oss.sts import STSCredentialsCache, sts_credentials
+from api.projects.models import Project, ProjectSkill, ProjectTranslation
 from api.projects.views import ProjectListApiView
+from api.search.models import SearchDocument
 
 
 class ProjectListApiViewTests(SimpleTestCase):
@@ -41,3 +84,1849 @@ class ProjectListApiViewTests(SimpleTestCase):
             self.get_ordering('invalid'),
             ('-created_at',)
         )
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class PostListQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            User.objects.create(
+                email=f'author{i}@example.com', username=f'author{i}')
+            for i in range(3)
+        ]
+        categories = [
+            Category.objects.create(title=f'Category {i}', user=users[i])
+            for i in range(3)
+        ]
+
+        for i in range(12):
+            user = users[i % 3]
+            post = Post.objects.create(
+                user=user,
+                profile=user.profile,
+                category=categories[i % 3],
+                status='Active',
+            )
+            post.likes.set(users[:i % 3 + 1])
+            for language in ['zh', 'en', 'ja']:
+                PostTranslation.objects.create(
+                    post=post,
+                    language=language,
+                    title=f'{language} title {i}',
+                    content=f'<p>{language} content {i}</p>',
+                )
+
+    def count_queries(self, url):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def test_post_list_query_count_is_independent_of_page_size(self):
+        small, _ = self.count_queries('/api/v1/post/lists/?pageSize=2')
+        large, response = self.count_queries('/api/v1/post/lists/?pageSize=12')
+
+        self.assertEqual(len(response.data['results']), 12)
+        self.assertEqual(small, large)
+
+    def test_category_post_list_query_count_is_constant(self):
+        url = '/api/v1/post/category/posts/category-0/'
+        queries, response = self.count_queries(url)
+
+        self.assertEqual(len(response.data), 4)
+        self.assertLessEqual(queries, 8)
+
+    def test_serialized_post_keeps_nested_shape(self):
+        _, response = self.count_queries('/api/v1/post/lists/?pageSize=12')
+        post = response.data['results'][-1]
+
+        self.assertEqual(post['category']['post_count'], 4)
+        self.assertEqual(post['user']['profile']['role']['name'], 'author')
+        self.assertEqual(len(post['likes']), 1)
+        self.assertEqual(set(post['translations']), {'zh', 'en', 'ja'})
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class TranslationProjectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(
+            email='author@example.com', username='author')
+        cls.post = Post.objects.create(
+            user=user, profile=user.profile, status='Active')
+        for language in ['zh', 'en', 'ja']:
+            PostTranslation.objects.create(
+                post=cls.post,
+                language=language,
+                title=f'{language} title',
+                description=f'{language} description',
+                content=f'<p>{language} content</p>',
+            )
+
+        cls.project = Project.objects.create(created_by=user)
+        for language in ['zh', 'en', 'ja']:
+            ProjectTranslation.objects.create(
+                project=cls.project,
+                language=language,
+                title=f'{language} project',
+                introduction=f'{language} introduction',
+                solutions=f'{language} solutions',
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_post_list_returns_requested_language_without_content(self):
+        response = self.client.get('/api/v1/post/lists/?lang=en')
+        translations = response.data['results'][0]['translations']
+
+        self.assertEqual(list(translations), ['en'])
+        self.assertEqual(
+            translations['en'],
+            {'title': 'en title', 'description': 'en description',
+             'is_ai_generated': False}
+        )
+
+    def test_post_list_returns_requested_fields(self):
+        response = self.client.get(
+            '/api/v1/post/lists/?lang=ja&fields=title,content')
+        translations = response.data['results'][0]['translations']
+
+        self.assertEqual(
+            translations,
+            {'ja': {'title': 'ja title', 'content': '<p>ja content</p>'}}
+        )
+
+    def test_post_detail_keeps_content_for_requested_language(self):
+        response = self.client.get(
+            f'/api/v1/post/detail/{self.post.slug}/?lang=zh')
+        translations = response.data['translations']
+
+        self.assertEqual(list(translations), ['zh'])
+        self.assertEqual(translations['zh']['content'], '<p>zh content</p>')
+
+    def test_project_list_omits_heavy_fields(self):
+        response = self.client.get('/api/v1/projects/list/?lang=en')
+        translation = response.data[0]['translations']['en']
+
+        self.assertEqual(translation['title'], 'en project')
+        self.assertNotIn('introduction', translation)
+        self.assertNotIn('solutions', translation)
+
+    def test_project_detail_returns_all_languages_without_parameters(self):
+        response = self.client.get(
+            f'/api/v1/projects/detail/{self.project.slug}/')
+        translations = response.data['translations']
+
+        self.assertEqual(set(translations), {'zh', 'en', 'ja'})
+        self.assertEqual(translations['en']['solutions'], 'en solutions')
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class GalleryTimelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(
+            email='photographer@example.com', username='photographer')
+        taken_dates = [
+            (2024, 12, 1), (2024, 12, 5), (2024, 3, 2),
+            (2023, 7, 1), (2023, 6, 1), (2022, 1, 1),
+        ]
+        for year, month, day in taken_dates:
+            Gallery.objects.create(
+                image_url='https://example.com/photo.jpg',
+                thumbnail_url='https://example.com/thumb.jpg',
+                taken_at=datetime(year, month, day, tzinfo=dt_timezone.utc),
+                uploaded_by=user,
+            )
+        Gallery.objects.create(
+            image_url='https://example.com/hidden.jpg',
+            thumbnail_url='https://example.com/hidden.jpg',
+            taken_at=datetime(2024, 1, 1, tzinfo=dt_timezone.utc),
+            is_published=False,
+            uploaded_by=user,
+        )
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.data
+
+    def test_timeline_groups_by_year_in_two_queries(self):
+        queries, data = self.get('/api/v1/gallery/timeline/')
+
+        self.assertEqual(queries, 2)
+        self.assertEqual(list(data['timeline']), ['2024', '2023', '2022'])
+        self.assertEqual(data['timeline']['2024']['count'], 3)
+        self.assertEqual(len(data['timeline']['2024']['photos']), 3)
+        self.assertEqual(data['total_photos'], 6)
+
+    def test_timeline_limits_photos_per_year(self):
+        _, data = self.get('/api/v1/gallery/timeline/?per_year=1')
+        year = data['timeline']['2024']
+
+        self.assertEqual(year['count'], 3)
+        self.assertEqual(len(year['photos']), 1)
+        self.assertTrue(year['has_more'])
+        self.assertEqual(year['photos'][0]['taken_at'][:10], '2024-12-05')
+
+    def test_year_view_groups_by_month_in_two_queries(self):
+        queries, data = self.get('/api/v1/gallery/timeline/2024/')
+
+        self.assertEqual(queries, 2)
+        self.assertEqual(list(data['months']), ['2024-12', '2024-03'])
+        self.assertEqual(data['months']['2024-12']['count'], 2)
+        self.assertEqual(data['total_photos'], 3)
+
+    def test_year_view_paginates_photos(self):
+        _, data = self.get('/api/v1/gallery/timeline/2024/?page=2&pageSize=2')
+
+        self.assertEqual(list(data['months']), ['2024-03'])
+        self.assertEqual(data['months']['2024-03']['count'], 1)
+        self.assertEqual(data['totalPages'], 2)
+
+
+class StubTranslationHandler(BaseHTTPRequestHandler):
+    """模拟 DeepSeek 接口：返回 "[目标语言] 原文"，并记录并发数"""
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(
+            int(self.headers['Content-Length'])))
+        prompt = payload['messages'][-1]['content']
+        target = prompt.split(' to ', 1)[1].split('.', 1)[0]
+        text = prompt.split('translate:\n', 1)[1]
+
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+
+        body = json.dumps({
+            'choices': [{'message': {'content': f'[{target}] {text}'}}]
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubTranslationServerMixin:
+    delay = 0.05
+
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(
+            ('127.0.0.1', 0), StubTranslationHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.delay = self.delay
+        thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True)
+        thread.start()
+        translation.translation_memory.clear()
+
+        env = mock.patch.dict(os.environ, {
+            'DEEPSEEK_API_KEY': 'test-key',
+            'DEEPSEEK_API_URL': f'http://127.0.0.1:{self.server.server_port}/chat/completions',
+            'TRANSLATION_MAX_WORKERS': '4',
+        })
+        env.start()
+        self.addCleanup(env.stop)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+
+class ParallelTranslationTests(StubTranslationServerMixin, TestCase):
+    source = {
+        'title': 'Title',
+        'subtitle': {'start': 'Start', 'end': 'End'},
+        'description': 'Description',
+        'summary': 'Summary',
+        'tech_summary': '',
+        'introduction': 'Introduction',
+        'solutions': 'Solutions',
+        'info': ['Info 1', 'Info 2'],
+        'challenges': ['Challenge'],
+        'what_i_did': [
+            {'title': 'Did', 'description': 'Did description', 'icon': 'star'}
+        ],
+        'extra_info': {'year': 2024},
+    }
+
+    def test_translate_many_keeps_order_and_reassembles_chunks(self):
+        long_text = '\n\n'.join(f'Paragraph {i}' for i in range(10))
+        results = translation.translate_many(
+            [
+                ('First', 'en', 'ja'),
+                (long_text, 'en', 'zh'),
+                ('Same', 'en', 'en'),
+                ('', 'en', 'ja'),
+            ],
+            max_chunk_size=30
+        )
+
+        self.assertEqual(results[0], '[Japanese] First')
+        self.assertEqual(results[1].count('[Chinese]'), 5)
+        self.assertTrue(results[1].startswith('[Chinese] Paragraph 0'))
+        self.assertTrue(results[1].endswith('Paragraph 9'))
+        self.assertEqual(results[2:], ['Same', ''])
+
+    def test_project_translation_runs_concurrently_within_limit(self):
+        started = time.monotonic()
+        results = translation.translate_project_translations(
+            self.source, 'en', ['zh', 'ja'])
+        elapsed = time.monotonic() - started
+
+        # 每种语言 12 个非空文本，共 24 次请求，4 并发约 6 轮
+        self.assertEqual(self.server.requests, 24)
+        self.assertEqual(self.server.max_in_flight, 4)
+        self.assertLess(elapsed, 24 * self.delay)
+
+        japanese = results['ja']
+        self.assertEqual(japanese['title'], '[Japanese] Title')
+        self.assertEqual(japanese['subtitle']['end'], '[Japanese] End')
+        self.assertEqual(japanese['tech_summary'], '')
+        self.assertEqual(japanese['info'], ['[Japanese] Info 1', '[Japanese] Info 2'])
+        self.assertEqual(
+            japanese['what_i_did'],
+            [{'title': '[Japanese] Did',
+              'description': '[Japanese] Did description', 'icon': 'star'}]
+        )
+        self.assertEqual(japanese['extra_info'], {'year': 2024})
+        self.assertEqual(results['zh']['challenges'], ['[Chinese] Challenge'])
+
+
+def stub_completion(prompt, drop_id=None):
+    """按 <<<编号>>> 批量格式或单段格式返回 "T:原文"，drop_id 模拟模型漏掉一段"""
+    body = prompt.split('\n\n', 1)[1]
+    if '<<<' in body:
+        parts = blog_translation.SEGMENT_MARKER.split(body)
+        content = '\n'.join(
+            f'<<<{parts[i]}>>>\nT:{parts[i + 1].strip()}'
+            for i in range(1, len(parts), 2) if int(parts[i]) != drop_id)
+    else:
+        content = 'T:' + body.split('原文：\n', 1)[1]
+    message = mock.Mock(content=content)
+    return mock.Mock(choices=[mock.Mock(message=message)])
+
+
+class TranslationMemoryTests(StubTranslationServerMixin, TestCase):
+    delay = 0
+
+    def test_repeated_texts_are_served_from_memory(self):
+        items = [('Hello', 'en', 'ja'), ('World', 'en', 'ja')]
+        translation.translate_many(items)
+        self.assertEqual(self.server.requests, 2)
+
+        # 清空进程内缓存后仍可从数据库命中
+        translation.translation_memory.clear()
+        results = translation.translate_many(items + [('Hello', 'en', 'zh')])
+
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(results[:2], ['[Japanese] Hello', '[Japanese] World'])
+        stats = translation.translation_memory.stats()
+        self.assertEqual((stats['db_hits'], stats['misses']), (2, 1))
+
+    def test_failed_translations_are_not_remembered(self):
+        with mock.patch.dict(os.environ, {'DEEPSEEK_API_KEY': ''}):
+            self.assertEqual(
+                translation.translate_chunk('Hello', 'en', 'ja'), 'Hello')
+
+        self.assertEqual(
+            translation.translate_chunk('Hello', 'en', 'ja'), '[Japanese] Hello')
+
+    def test_editing_one_paragraph_only_translates_that_paragraph(self):
+        prompts = []
+
+        def create(**kwargs):
+            prompt = kwargs['messages'][-1]['content']
+            prompts.append(prompt)
+            return stub_completion(prompt)
+
+        with mock.patch.object(blog_translation.client.chat.completions, 'create', side_effect=create):
+            blog_translation.translate_rich_text(
+                '<p>One</p><p>Two</p><p>Three</p>', 'en', 'zh')
+            html = blog_translation.translate_rich_text(
+                '<p>One</p><p>Two edited</p><p>Three</p>', 'en', 'zh')
+
+        self.assertEqual(len(prompts), 2)
+        self.assertTrue(prompts[1].endswith('\nTwo edited'))
+        self.assertEqual(html, '<p>T:One</p><p>T:Two edited</p><p>T:Three</p>')
+
+
+class JobQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email='author@example.com', username='author')
+        cls.category = Category.objects.create(title='News')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def create_post(self):
+        return self.client.post('/api/v1/author/dashboard/post-create/', {
+            'user_id': self.user.id,
+            'category': self.category.id,
+            'need_ai_generate': True,
+            'zh': {'title': '标题', 'description': '描述', 'content': '<p>正文</p>'},
+        }, format='json')
+
+    def test_post_create_enqueues_jobs_without_translating(self):
+        with mock.patch.object(blog_translation, 'translate_post') as translate:
+            response = self.create_post()
+
+        translate.assert_not_called()
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['translating'])
+        jobs = Job.objects.filter(status='pending')
+        self.assertEqual(
+            sorted(jobs.values_list('language', flat=True)), ['en', 'ja'])
+        self.assertEqual(jobs.first().payload['title'], '标题')
+
+    def test_post_source_edit_requeues_ai_translations(self):
+        self.create_post()
+        post = Post.objects.get()
+        PostTranslation.objects.create(
+            post=post, language='en', title='Title', is_ai_generated=True)
+        Job.objects.all().delete()
+
+        response = self.client.put(
+            f'/api/v1/author/dashboard/post-detail/{self.user.id}/{post.id}/',
+            {'need_ai_generate': True, 'zh': {'title': '新标题', 'content': '<p>正文</p>'}},
+            format='json')
+
+        self.assertEqual(len(response.data['translation_jobs']), 2)
+        job = Job.objects.get(language='en')
+        self.assertEqual(job.payload['title'], '新标题')
+
+    def test_enqueue_deduplicates_pending_jobs(self):
+        first = Job.objects.enqueue(
+            'post', 1, 'en', 'zh', {'title': 'old'})
+        second = Job.objects.enqueue(
+            'post', 1, 'en', 'zh', {'title': 'new'})
+
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(
+            Job.objects.get().payload, {'title': 'new'})
+
+    def test_enqueue_race_updates_concurrently_created_job(self):
+        existing = Job.objects.enqueue('post', 1, 'en', 'zh', {'title': 'old'})
+        # 模拟另一个请求在本次查询之后、创建之前已插入待执行任务
+        with mock.patch('api.jobs.models.JobQuerySet.first', return_value=None):
+            job = Job.objects.enqueue('post', 1, 'en', 'zh', {'title': 'new'})
+
+        self.assertEqual(job.id, existing.id)
+        self.assertEqual(Job.objects.get().payload, {'title': 'new'})
+
+    def test_worker_retries_with_backoff_then_succeeds(self):
+        self.create_post()
+        worker = JobWorker(workers=1)
+        calls = []
+
+        def translate(post_id, lang_code, source_lang, source_data):
+            calls.append(lang_code)
+            if len(calls) == 1:
+                raise RuntimeError('LLM timeout')
+            PostTranslation.objects.create(
+                post_id=post_id, language=lang_code, title='translated')
+
+        with mock.patch('api.jobs.handlers.translate_post', side_effect=translate):
+            self.assertEqual(worker.run_pending(), 2)
+            failed = Job.objects.get(last_error='LLM timeout')
+            self.assertEqual(failed.status, 'pending')
+            self.assertEqual(failed.attempts, 1)
+            self.assertGreater(failed.run_after, failed.updated_at)
+
+            # 退避时间未到，不会被重复领取
+            self.assertEqual(worker.run_pending(), 0)
+
+            Job.objects.filter(id=failed.id).update(
+                run_after=failed.updated_at)
+            self.assertEqual(worker.run_pending(), 1)
+
+        statuses = set(Job.objects.values_list('status', flat=True))
+        self.assertEqual(statuses, {'succeeded'})
+        self.assertEqual(PostTranslation.objects.filter(
+            is_ai_generated=False, title='translated').count(), 2)
+
+    def test_stale_running_jobs_are_reclaimed_until_attempts_run_out(self):
+        stale = timezone.now() - timedelta(hours=1)
+        retrying = Job.objects.create(
+            kind='post', object_id=1, language='en', status='running',
+            attempts=1, locked_at=stale)
+        exhausted = Job.objects.create(
+            kind='post', object_id=2, language='en', status='running',
+            attempts=5, locked_at=stale)
+
+        claimed = Job.objects.claim_next('test', timedelta(minutes=15))
+
+        self.assertEqual((claimed.id, claimed.attempts), (retrying.id, 2))
+        self.assertIsNone(Job.objects.claim_next('test', timedelta(minutes=15)))
+        exhausted.refresh_from_db()
+        self.assertEqual(exhausted.status, 'failed')
+        self.assertIsNotNone(exhausted.finished_at)
+
+    def test_retry_is_dropped_when_a_new_job_is_queued_meanwhile(self):
+        job = Job.objects.enqueue('post', 1, 'en', 'zh', {})
+        job = Job.objects.claim_next('test', timedelta(minutes=15))
+        newer = Job.objects.enqueue('post', 1, 'en', 'zh', {'title': 'new'})
+
+        # 模拟新任务在 superseded 检查之后才提交
+        with mock.patch('api.jobs.models.JobQuerySet.exists', return_value=False):
+            job.mark_failed(RuntimeError('LLM timeout'))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(Job.objects.get(status='pending').id, newer.id)
+
+    def test_worker_thread_survives_database_errors(self):
+        worker = JobWorker(workers=1, poll_interval=0, error_backoff=0)
+        calls = []
+
+        def run_pending():
+            calls.append(1)
+            if len(calls) == 1:
+                raise OperationalError('server closed the connection unexpectedly')
+            worker.stop()
+            return 0
+
+        with mock.patch.object(worker, 'run_pending', side_effect=run_pending), \
+                self.assertLogs('api.jobs.worker', 'ERROR'):
+            worker.run()
+
+        self.assertEqual(len(calls), 2)
+
+    def test_missing_post_fails_without_retry(self):
+        Job.objects.enqueue('post', 999, 'en', 'zh', {})
+        JobWorker(workers=1).run_pending()
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.attempts, 1)
+
+    def test_status_endpoint_filters_by_object(self):
+        self.create_post()
+        Job.objects.enqueue('post', 999, 'en', 'zh', {})
+        post = Post.objects.get()
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(
+            f'/api/v1/translation/jobs/?kind=post&object_id={post.id}')
+
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            {job['status'] for job in response.data['results']}, {'pending'})
+
+    def test_gallery_jobs_only_show_under_generic_route(self):
+        translation_job = Job.objects.enqueue('post', 1, 'en', 'zh', {})
+        gallery_job = Job.objects.enqueue(Job.KIND_GALLERY, 1, '', '', {})
+        self.client.force_authenticate(self.user)
+
+        listed = self.client.get('/api/v1/translation/jobs/')
+        self.assertEqual([job['id'] for job in listed.data['results']], [translation_job.id])
+        self.assertEqual(
+            self.client.get(f'/api/v1/translation/jobs/{gallery_job.id}/').status_code, 404)
+
+        self.assertEqual(self.client.get('/api/v1/jobs/').data['count'], 2)
+        detail = self.client.get(f'/api/v1/jobs/{gallery_job.id}/')
+        self.assertEqual(detail.data['kind'], Job.KIND_GALLERY)
+
+
+class IncrementalTranslationTests(StubTranslationServerMixin, TestCase):
+    source = ParallelTranslationTests.source
+
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create(email='owner@example.com', username='owner')
+        self.project = Project.objects.create(created_by=user)
+
+    def translate(self, source):
+        # 清空翻译记忆，确保请求数只反映增量翻译的效果
+        TranslationMemory.objects.all().delete()
+        translation.translation_memory.clear()
+        self.server.requests = 0
+        Job.objects.enqueue(
+            'project', self.project.id, 'en', 'zh', source)
+        JobWorker(workers=1).run_pending()
+        return ProjectTranslation.objects.get(project=self.project, language='en')
+
+    def test_only_changed_fields_and_items_are_retranslated(self):
+        self.translate(self.source)
+        self.assertEqual(self.server.requests, 12)
+
+        edited = json.loads(json.dumps(self.source))
+        edited['info'] = ['Info 0', 'Info 1', 'Info 2']
+        edited['what_i_did'].insert(
+            0, {'title': 'New', 'description': 'New description', 'icon': 'bolt'})
+        result = self.translate(edited)
+
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(result.info, ['[English] Info 0', '[English] Info 1', '[English] Info 2'])
+        self.assertEqual(
+            [item['title'] for item in result.what_i_did], ['[English] New', '[English] Did'])
+        self.assertEqual(result.what_i_did[0]['icon'], 'bolt')
+
+    def test_human_edited_target_fields_are_kept(self):
+        self.translate(self.source)
+        ProjectTranslation.objects.filter(project=self.project, language='en').update(
+            summary='Hand written summary')
+
+        edited = dict(self.source, summary='New summary', title='New title')
+        result = self.translate(edited)
+
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(result.title, '[English] New title')
+        self.assertEqual(result.summary, 'Hand written summary')
+
+
+class SegmentBatchTranslationTests(TestCase):
+    def setUp(self):
+        TranslationMemory.objects.all().delete()
+        translation.translation_memory.clear()
+        env = mock.patch.dict(os.environ, {'TRANSLATION_BATCH_TOKENS': '200'})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_long_article_is_translated_in_a_few_batches(self):
+        paragraphs = [f'第{i}段：' + '内容' * 20 for i in range(100)]
+        html = ''.join(f'<p>{text}</p>' for text in paragraphs)
+        prompts = []
+
+        def create(**kwargs):
+            prompts.append(kwargs['messages'][-1]['content'])
+            return stub_completion(prompts[-1])
+
+        with mock.patch.object(blog_translation.client.chat.completions, 'create', side_effect=create):
+            result = blog_translation.translate_rich_text(html, 'en', 'zh')
+
+        self.assertEqual(len(prompts), 25)
+        self.assertEqual(
+            result, ''.join(f'<p>T:{text}</p>' for text in paragraphs))
+
+    def test_mismatched_batch_is_split_and_retried(self):
+        segments = [f'段落{i}' for i in range(8)]
+        prompts = []
+
+        def create(**kwargs):
+            prompts.append(kwargs['messages'][-1]['content'])
+            # 第一次批量请求漏掉编号 5
+            return stub_completion(prompts[-1], drop_id=5 if len(prompts) == 1 else None)
+
+        with mock.patch.object(blog_translation.client.chat.completions, 'create', side_effect=create):
+            results = blog_translation.translate_segments(segments, 'en', 'zh')
+
+        self.assertEqual(results, [f'T:{segment}' for segment in segments])
+        self.assertEqual(len(prompts), 3)
+
+    def test_api_errors_are_raised_without_splitting(self):
+        segments = [f'段落{i}' for i in range(8)]
+        prompts = []
+
+        def create(**kwargs):
+            prompts.append(kwargs['messages'][-1]['content'])
+            raise RuntimeError('429 Too Many Requests')
+
+        with mock.patch.object(blog_translation.client.chat.completions, 'create', side_effect=create):
+            with self.assertRaisesMessage(RuntimeError, '429'):
+                blog_translation.translate_segments(segments, 'en', 'zh')
+
+        self.assertEqual(len(prompts), 1)
+
+    def test_partly_translated_content_is_not_saved(self):
+        user = User.objects.create(email='partial@example.com', username='partial')
+        post = Post.objects.create(user=user, profile=user.profile)
+        source = {'title': '标题', 'content': '<p>一</p><p>二</p>'}
+
+        with mock.patch.object(blog_translation, 'call_openai_translate', return_value='Title'), \
+                mock.patch.object(blog_translation, 'translate_segments',
+                                  return_value=['One', None]):
+            with self.assertRaises(RuntimeError):
+                blog_translation.translate_post(post.id, 'en', 'zh', source)
+            doc = {'type': 'doc', 'content': [{'type': 'paragraph', 'content': [
+                {'type': 'text', 'text': '一'}, {'type': 'text', 'text': '二'}]}]}
+            with self.assertRaises(RuntimeError):
+                blog_translation.translate_rich_text(json.dumps(doc), 'en', 'zh')
+
+        self.assertFalse(PostTranslation.objects.filter(post=post).exists())
+
+    def test_long_plain_text_is_not_truncated(self):
+        text = '\n'.join(f'第{i}行' + '文字' * 50 for i in range(30))
+
+        with mock.patch.object(blog_translation.client.chat.completions, 'create',
+                               side_effect=lambda **kwargs: stub_completion(kwargs['messages'][-1]['content'])):
+            result = blog_translation.call_openai_translate(text, 'en', 'zh')
+
+        self.assertEqual(result, '\n'.join(f'T:{line}' for line in text.split('\n')))
+
+    def test_tiptap_skips_code_blocks_and_inline_code(self):
+        node = {'type': 'paragraph', 'content': [
+            {'type': 'text', 'text': '正文'},
+            {'type': 'text', 'text': 'print()', 'marks': [{'type': 'code'}]},
+        ]}
+        for _ in range(50):
+            node = {'type': 'blockquote', 'content': [node]}
+        doc = {'type': 'doc', 'content': [
+            node,
+            {'type': 'codeBlock', 'content': [{'type': 'text', 'text': 'x = 1'}]},
+        ]}
+
+        with mock.patch.object(blog_translation.client.chat.completions, 'create',
+                               side_effect=lambda **kwargs: stub_completion(kwargs['messages'][-1]['content'])):
+            result = blog_translation.translate_rich_text(
+                json.dumps(doc), 'en', 'zh')
+
+        texts = [node['text'] for node in blog_translation.iter_tiptap_text_nodes(
+            json.loads(result))]
+        self.assertEqual(texts, ['T:正文'])
+        self.assertIn('"x = 1"', result)
+        self.assertIn('"print()"', result)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True, RESPONSE_CACHE_ALLOW_LOCMEM=True)
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email='cache@example.com', username='cache')
+        cls.category = Category.objects.create(title='Cache', user=cls.user)
+        cls.post = Post.objects.create(
+            user=cls.user, profile=cls.user.profile,
+            category=cls.category, status='Active')
+        PostTranslation.objects.create(
+            post=cls.post, language='en', title='Cached', content='<p>x</p>')
+
+    def setUp(self):
+        cache.clear()
+        response_cache.reset_stats()
+        self.client = APIClient()
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        return response, len(context.captured_queries)
+
+    def test_repeated_list_request_is_served_from_cache(self):
+        first, first_queries = self.get('/api/v1/post/lists/?lang=en')
+        second, second_queries = self.get('/api/v1/post/lists/?lang=en')
+        other, _ = self.get('/api/v1/post/lists/?lang=ja')
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(other['X-Cache'], 'MISS')
+        self.assertGreater(first_queries, 0)
+        # 命中缓存时只剩条件请求的聚合查询
+        self.assertEqual(second_queries, 1)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(response_cache.stats()['posts'], {
+            'hits': 1, 'misses': 2, 'hit_ratio': 1 / 3})
+
+    def test_translation_change_invalidates_post_and_category_caches(self):
+        self.get('/api/v1/post/lists/')
+        self.get('/api/v1/post/category/list/')
+
+        PostTranslation.objects.filter(post=self.post).first().save()
+        response, _ = self.get('/api/v1/post/lists/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(
+            self.get('/api/v1/post/category/list/')[0]['X-Cache'], 'HIT')
+
+        Post.objects.create(user=self.user, category=self.category)
+        self.assertEqual(
+            self.get('/api/v1/post/category/list/')[0]['X-Cache'], 'MISS')
+
+    def test_likes_invalidate_posts_and_detail_views_do_not(self):
+        url = f'/api/v1/post/detail/{self.post.slug}/'
+        self.get('/api/v1/post/lists/')
+        self.get(url)
+
+        self.assertEqual(self.get(url)[0]['X-Cache'], 'HIT')
+        self.assertEqual(
+            self.get('/api/v1/post/lists/')[0]['X-Cache'], 'HIT')
+        post_views.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 2)
+
+        self.post.likes.add(self.user)
+        self.assertEqual(
+            self.get('/api/v1/post/lists/')[0]['X-Cache'], 'MISS')
+
+    def test_evicted_version_key_does_not_revive_old_entries(self):
+        key = response_cache._version_key('posts')
+        self.get('/api/v1/post/lists/')
+        for _ in range(3):
+            Post.objects.create(user=self.user, category=self.category,
+                                status='Active')
+            self.get('/api/v1/post/lists/')
+
+        # 模拟 Redis 只淘汰了版本号键，之前各版本的响应仍在缓存中
+        cache.delete(key)
+        response, _ = self.get('/api/v1/post/lists/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(
+            self.get('/api/v1/post/lists/')[0]['X-Cache'], 'HIT')
+
+    @override_settings(RESPONSE_CACHE_ALLOW_LOCMEM=False)
+    def test_process_local_cache_is_not_used(self):
+        response_cache._warned_locmem = False
+        with self.assertLogs('api.core.cache', 'WARNING'):
+            self.assertFalse(response_cache.enabled)
+        self.assertNotIn('X-Cache', self.get('/api/v1/post/lists/')[0])
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email='etag@example.com', username='etag')
+        cls.post = Post.objects.create(
+            user=cls.user, profile=cls.user.profile, status='Active')
+        cls.translation = PostTranslation.objects.create(
+            post=cls.post, language='en', title='ETag', content='<p>x</p>')
+
+    def setUp(self):
+        cache.clear()
+        local_buffer.clear()
+        self.client = APIClient()
+        self.url = f'/api/v1/post/detail/{self.post.slug}/'
+
+    def test_matching_etag_returns_304_before_serializing(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with mock.patch.object(PostSerializer, 'to_representation') as serialize:
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        serialize.assert_not_called()
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+        # 304 仍然计入浏览量
+        post_views.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 2)
+
+    def test_translation_edit_and_likes_change_validators(self):
+        etag = self.client.get(self.url)['ETag']
+
+        self.translation.title = 'Edited'
+        self.translation.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.post.likes.add(self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_reverse_clear_of_likes_changes_validators(self):
+        self.post.likes.add(self.user)
+        etag = self.client.get(self.url)['ETag']
+
+        self.user.likes_user.clear()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_deleting_a_translation_changes_validators(self):
+        extra = PostTranslation.objects.create(post=self.post, language='ja', title='ETag')
+        etag = self.client.get(self.url)['ETag']
+
+        extra.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_skill_clear_and_delete_change_project_validators(self):
+        project = Project.objects.create(created_by=self.user)
+        skill = ProjectSkill.objects.create(name='Django', type='Backend')
+        other = ProjectSkill.objects.create(name='Redis', type='Backend')
+        project.skills.add(skill, other)
+        url = f'/api/v1/projects/detail/{project.slug}/'
+
+        for change in (skill.projects.clear, other.delete):
+            etag = self.client.get(url)['ETag']
+            change()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_on_list(self):
+        response = self.client.get('/api/v1/post/lists/')
+        not_modified = self.client.get(
+            '/api/v1/post/lists/',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+
+@override_settings(VIEW_COUNT_FLUSH_INTERVAL=0, VIEW_COUNT_DEDUP_WINDOW=0)
+class ViewCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email='views@example.com', username='views')
+        cls.post = Post.objects.create(
+            user=cls.user, profile=cls.user.profile, status='Active')
+        cls.photo = Gallery.objects.create(
+            slug='photo', image_url='https://example.com/p.jpg',
+            thumbnail_url='https://example.com/t.jpg', uploaded_by=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        local_buffer.clear()
+        self.client = APIClient()
+
+    def test_detail_hits_do_not_write_until_flushed(self):
+        url = f'/api/v1/post/detail/{self.post.slug}/'
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as context:
+            for _ in range(5):
+                self.client.get(url)
+            self.client.get('/api/v1/gallery/detail/photo/')
+        writes = [query['sql'] for query in context.captured_queries
+                  if query['sql'].startswith('UPDATE')]
+        self.assertEqual(writes, [])
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 0)
+
+        call_command('flush_view_counts', stdout=io.StringIO())
+        self.post.refresh_from_db()
+        self.photo.refresh_from_db()
+        self.assertEqual((self.post.views, self.photo.view_count), (6, 1))
+
+        # 已写回的计数不会重复累加
+        call_command('flush_view_counts', stdout=io.StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 6)
+
+    def test_flush_is_one_update_per_counter(self):
+        other = Post.objects.create(user=self.user, status='Active')
+        for slug, times in [(self.post.slug, 3), (other.slug, 2)]:
+            for _ in range(times):
+                self.client.get(f'/api/v1/post/detail/{slug}/')
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(post_views.flush(), 5)
+        # 只处理有浏览的对象，不再读取整张表；其余查询是作者汇总表的更新
+        sql = [query['sql'] for query in context.captured_queries]
+        self.assertEqual(
+            len([query for query in sql if query.startswith('UPDATE "api_post"')]), 1)
+        self.assertFalse(any(
+            query.startswith('SELECT') and 'WHERE' not in query for query in sql))
+        self.assertEqual(
+            dict(Post.objects.values_list('slug', 'views')),
+            {self.post.slug: 3, other.slug: 2})
+
+    def test_buffered_counts_survive_cache_eviction(self):
+        self.client.get(f'/api/v1/post/detail/{self.post.slug}/')
+        # locmem 超过 MAX_ENTRIES 时会淘汰键，计数不放在缓存中
+        cache.clear()
+
+        self.assertEqual(post_views.flush(), 1)
+
+    def test_evicting_redis_writes_views_through(self):
+        client = mock.Mock()
+        client.config_get.return_value = {'maxmemory-policy': 'allkeys-lru'}
+        self.addCleanup(setattr, redis_buffer, '_safe', None)
+
+        with mock.patch('api.core.view_counter.counts_shared', return_value=True), \
+                mock.patch.object(redis_buffer, 'client', return_value=client), \
+                self.assertLogs('api.core.view_counter', 'WARNING'):
+            self.client.get(f'/api/v1/post/detail/{self.post.slug}/')
+
+        client.incrby.assert_not_called()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 1)
+
+    @override_settings(VIEW_COUNT_DEDUP_WINDOW=600)
+    def test_repeat_views_in_dedup_window_count_once(self):
+        url = f'/api/v1/post/detail/{self.post.slug}/'
+        self.client.get(url, REMOTE_ADDR='10.0.0.1')
+        self.client.get(url, REMOTE_ADDR='10.0.0.1')
+        self.client.get(url, REMOTE_ADDR='10.0.0.2')
+
+        post_views.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 2)
+
+
+class AuthorDashboardStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(
+            email='author@example.com', username='author')
+        cls.readers = [
+            User.objects.create(email=f'r{i}@example.com', username=f'r{i}')
+            for i in range(3)
+        ]
+        cls.category = Category.objects.create(title='Tech', slug='tech')
+        cls.posts = [
+            Post.objects.create(user=cls.author, category=cls.category,
+                                status='Active', views=10 * (i + 1))
+            for i in range(2)
+        ]
+
+    def url(self):
+        return f'/api/v1/author/dashboard/stats/{self.author.id}/'
+
+    def totals(self):
+        rows = AuthorDailyStats.objects.filter(user=self.author)
+        return {field: sum(getattr(row, field) for row in rows)
+                for field in ('posts', 'views', 'likes', 'bookmarks', 'comments')}
+
+    def category_stats(self):
+        return list(AuthorCategoryStats.objects.filter(user=self.author).order_by(
+            'category_id').values_list('category__slug', 'posts', 'likes'))
+
+    def like_counts(self):
+        return [Post.objects.get(pk=post.pk).like_count for post in self.posts]
+
+    def test_rollup_follows_likes_bookmarks_comments_and_deletes(self):
+        first, second = self.posts
+        first.likes.add(*self.readers)
+        self.readers[0].likes_user.add(second)
+        Bookmark.objects.create(user=self.readers[0], post=first)
+        Comment.objects.create(post=second, name='r', email='r@example.com')
+        self.assertEqual(self.totals(), {
+            'posts': 2, 'views': 30, 'likes': 4, 'bookmarks': 1, 'comments': 1})
+        self.assertEqual(self.like_counts(), [3, 1])
+        self.assertEqual(self.category_stats(), [('tech', 2, 4)])
+
+        first.likes.remove(self.readers[1])
+        second.likes.clear()
+        self.readers[2].likes_user.clear()
+        self.assertEqual(self.totals()['likes'], 1)
+        self.assertEqual(self.like_counts(), [1, 0])
+
+        first.delete()
+        self.assertEqual(self.totals(), {
+            'posts': 1, 'views': 20, 'likes': 0, 'bookmarks': 0, 'comments': 1})
+        self.assertEqual(self.category_stats(), [('tech', 1, 0)])
+
+    def test_removing_a_missing_like_does_not_subtract(self):
+        first, second = self.posts
+        first.likes.add(self.readers[0])
+        self.readers[0].likes_user.add(second)
+
+        # 第二次取消（如并发的两个取消点赞请求）对应的点赞已不存在
+        for _ in range(2):
+            first.likes.remove(self.readers[0])
+            self.readers[0].likes_user.remove(second)
+
+        self.assertEqual(self.like_counts(), [0, 0])
+        self.assertEqual(self.totals()['likes'], 0)
+        self.assertEqual(self.category_stats(), [('tech', 2, 0)])
+
+    def test_category_change_moves_posts_and_likes(self):
+        other = Category.objects.create(title='Life', slug='life')
+        first = self.posts[0]
+        first.likes.add(*self.readers[:2])
+
+        # 实例上的 like_count 已过期，保存时不能覆盖数据库中的值
+        post = Post.objects.get(pk=first.pk)
+        first.category = other
+        first.save()
+        post.title = 'renamed'
+        post.save()
+
+        self.assertEqual(self.like_counts()[0], 2)
+        self.assertEqual(self.category_stats(), [('tech', 1, 0), ('life', 1, 2)])
+
+    def test_flushed_views_are_credited_to_author(self):
+        for _ in range(3):
+            self.client.get(f'/api/v1/post/detail/{self.posts[1].slug}/')
+        post_views.flush()
+
+        today = AuthorDailyStats.objects.get(
+            user=self.author, day=timezone.localdate())
+        # 两篇文章都在今天创建，创建时的浏览量也计入当天
+        self.assertEqual(today.views, 10 + 20 + 3)
+
+    def test_dashboard_reads_rollup_with_distinct_like_counts(self):
+        first, second = self.posts
+        first.likes.add(*self.readers)
+        second.likes.add(self.readers[0])
+        Bookmark.objects.create(user=self.readers[0], post=first)
+        Bookmark.objects.create(user=self.readers[1], post=first)
+
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get(self.url())
+        self.assertEqual(response.status_code, 200)
+        # 用户 + 汇总表 + 分类汇总 + 热门文章 + 分类，与作者的文章数无关
+        self.assertEqual(len(context.captured_queries), 5)
+        self.assertFalse(any(
+            'COUNT' in query['sql'] for query in context.captured_queries))
+
+        data = response.json()
+        self.assertEqual(
+            (data['posts'], data['likes'], data['bookmarks'], data['views']),
+            (2, 4, 2, 30))
+        self.assertEqual(data['category_likes'], [
+            {'title': 'Tech', 'like_count': 4}])
+        self.assertEqual(data['popular_posts'][0]['like_count'], 3)
+        self.assertEqual(data['categories'][0]['post_count'], 2)
+
+    def test_rebuild_matches_incremental_rollup(self):
+        self.posts[0].likes.add(*self.readers)
+        Comment.objects.create(
+            post=self.posts[0], name='r', email='r@example.com')
+        expected = (self.totals(), self.category_stats(), self.like_counts())
+
+        AuthorDailyStats.objects.all().delete()
+        AuthorCategoryStats.objects.all().delete()
+        Post.objects.update(like_count=0)
+        call_command('rebuild_author_stats', stdout=io.StringIO())
+        self.assertEqual(
+            (self.totals(), self.category_stats(), self.like_counts()), expected)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email='cursor@example.com', username='cursor')
+        posts = [Post.objects.create(user=cls.user, status='Active')
+                 for _ in range(7)]
+        # 制造相同的发布时间，翻页要靠 id 区分
+        same = datetime(2024, 5, 1, 12, 0, 0, 123456, tzinfo=dt_timezone.utc)
+        Post.objects.filter(pk__in=[post.pk for post in posts[:4]]).update(date=same)
+
+        taken = [None, None, datetime(2024, 1, 1, tzinfo=dt_timezone.utc),
+                 datetime(2023, 1, 1, tzinfo=dt_timezone.utc), None]
+        for i, taken_at in enumerate(taken):
+            Gallery.objects.create(
+                slug=f'cursor-{i}', image_url='https://example.com/p.jpg',
+                thumbnail_url='https://example.com/t.jpg', taken_at=taken_at,
+                uploaded_by=cls.user)
+
+    def walk(self, url, page_size):
+        client = APIClient()
+        seen, pages = [], []
+        response = client.get(url, {'pagination': 'cursor', 'pageSize': page_size})
+        while True:
+            data = response.json()
+            pages.append(data)
+            seen.extend(item['slug'] for item in data['results'])
+            if not data['nextCursor']:
+                return seen, pages
+            response = client.get(url, {'cursor': data['nextCursor'],
+                                        'pageSize': page_size})
+
+    def test_posts_cursor_walk_matches_page_ordering(self):
+        expected = list(Post.objects.order_by('-date', 'id')
+                        .values_list('slug', flat=True))
+        seen, pages = self.walk('/api/v1/post/lists/', 3)
+
+        self.assertEqual(seen, expected)
+        self.assertEqual([page['page'] for page in pages], [1, 2, 3])
+        self.assertEqual(pages[0]['count'], 7)
+        self.assertEqual(pages[0]['totalPages'], 3)
+        self.assertFalse(pages[0]['countEstimated'])
+
+    def test_gallery_cursor_walk_handles_null_taken_at(self):
+        expected = list(Gallery.objects.order_by('-taken_at', '-created_at', 'id')
+                        .values_list('slug', flat=True))
+        seen, _ = self.walk('/api/v1/gallery/list/', 2)
+        self.assertEqual(seen, expected)
+
+    def test_cursor_page_skips_count_and_offset(self):
+        first = APIClient().get('/api/v1/post/lists/',
+                                {'pagination': 'cursor', 'pageSize': 3}).json()
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get('/api/v1/post/lists/', {
+                'cursor': first['nextCursor'], 'pageSize': 3, 'count': 'none'})
+        self.assertIsNone(response.json()['count'])
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        # 只剩 ETag 用的聚合查询，没有分页的 COUNT(*)
+        self.assertNotIn('COUNT(*)', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_invalid_cursor_is_404(self):
+        response = APIClient().get('/api/v1/post/lists/', {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_wrong_typed_cursor_values_are_404(self):
+        pagination = CustomPageNumberPagination()
+        for values in (['yesterday', 1], ['2024-05-01T12:00:00+00:00', 'abc'],
+                       [{'a': 1}, 1], ['2024-05-01T12:00:00+00:00', 2 ** 80],
+                       ['2024-05-01T12:00:00+00:00', None]):
+            cursor = pagination.encode_cursor(values, 1)
+            response = APIClient().get('/api/v1/post/lists/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, values)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email='search@example.com', username='search', is_staff=True)
+        cls.category = Category.objects.create(title='Backend', slug='backend')
+        cls.post = Post.objects.create(
+            user=cls.user, category=cls.category, status='Active')
+        PostTranslation.objects.create(
+            post=cls.post, language='zh', title='Django 缓存优化指南',
+            content=json.dumps({'type': 'doc', 'content': [
+                {'type': 'paragraph', 'content': [
+                    {'type': 'text', 'text': '使用 Redis 做页面缓存，减少数据库查询。'}]},
+            ]}))
+        PostTranslation.objects.create(
+            post=cls.post, language='en', title='Caching guide for Django',
+            content='<p>Use Redis to cache pages and reduce database queries.</p>')
+        cls.draft = Post.objects.create(user=cls.user, status='Draft')
+        PostTranslation.objects.create(
+            post=cls.draft, language='zh', title='缓存草稿', content='<p>草稿</p>')
+        cls.project = Project.objects.create(created_by=cls.user)
+        ProjectTranslation.objects.create(
+            project=cls.project, language='ja', title='キャッシュサーバー',
+            summary='分散キャッシュの設計')
+
+    def search(self, **params):
+        return APIClient().get('/api/v1/search/', params)
+
+    def test_cjk_bigram_search_ranks_and_highlights(self):
+        data = self.search(q='缓存', lang='zh').json()
+        self.assertEqual([item['slug'] for item in data['results']],
+                         [self.post.slug])
+        self.assertIn('<mark>缓存</mark>', data['results'][0]['title_highlight'])
+        self.assertIn('<mark>缓存</mark>', data['results'][0]['highlight'])
+
+        # 二元组要求相邻，'存优' 之外的 '缓优' 不会命中
+        self.assertEqual(self.search(q='缓优', lang='zh').json()['count'], 0)
+        self.assertEqual(
+            self.search(q='キャッシュ').json()['results'][0]['slug'],
+            self.project.slug)
+
+    def test_english_search_is_stemmed(self):
+        data = self.search(q='cached queries', lang='en').json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'][0]['language'], 'en')
+
+    def test_one_result_per_object_and_filters(self):
+        data = self.search(q='Redis').json()
+        self.assertEqual(data['count'], 1)
+
+        self.assertEqual(self.search(q='缓存', type='post').json()['count'], 1)
+        self.assertEqual(
+            self.search(q='缓存', category='other').json()['count'], 0)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        drafts = client.get('/api/v1/search/', {'q': '缓存', 'status': 'Draft'})
+        self.assertEqual(drafts.json()['results'][0]['slug'], self.draft.slug)
+        # 非管理员不能搜索草稿
+        self.assertEqual(
+            self.search(q='草稿', status='Draft').json()['count'], 0)
+
+    def test_index_follows_translation_changes(self):
+        translation = self.post.translations.get(language='en')
+        translation.title = 'Profiling guide'
+        translation.content = '<p>Flame graphs</p>'
+        translation.save()
+        self.assertEqual(self.search(q='flame', lang='en').json()['count'], 1)
+        self.assertEqual(self.search(q='redis', lang='en').json()['count'], 0)
+
+        post_id = self.post.pk
+        self.post.delete()
+        self.assertFalse(SearchDocument.objects.filter(post_id=post_id).exists())
+
+    def test_missing_query_is_400(self):
+        self.assertEqual(self.search().status_code, 400)
+
+
+class ExplainHotQueriesTests(TestCase):
+    def test_seeded_explain_reports_every_query_and_rolls_back(self):
+        out = io.StringIO()
+        call_command('explain_hot_queries', seed=200, stdout=out)
+
+        output = out.getvalue()
+        for name in ('post list', 'unseen notifications', 'gallery list'):
+            self.assertIn(f'== {name}', output)
+        self.assertIn('post_active_date_idx', output)
+        # 生成的数据已回滚
+        self.assertFalse(Post.objects.exists())
+
+    def test_hot_queries_follow_view_ordering(self):
+        user = User.objects.create(email='hot@example.com', username='hot')
+        category = Category.objects.create(title='Hot', slug='hot')
+        post = Post.objects.create(user=user, category=category, status='Active')
+
+        queries = dict(explain_hot_queries.hot_queries(user, category, post))
+        self.assertIn('ORDER BY "api_post"."id" DESC', str(queries['dashboard posts'].query))
+        self.assertIn('ORDER BY "api_post"."date" DESC, "api_post"."id" ASC',
+                      str(queries['post list (cursor)'].query))
+
+
+@override_settings(PROFILING_ENABLED=True, RESPONSE_CACHE_ENABLED=False)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email='profile@example.com', username='profile')
+        Post.objects.create(user=cls.user, status='Active')
+
+    def test_server_timing_reports_db_and_logs_json(self):
+        with self.assertLogs('api.core.profiling', 'INFO') as logs, \
+                CaptureQueriesContext(connection) as context:
+            response = APIClient().get('/api/v1/post/lists/')
+
+        timing = response['Server-Timing']
+        self.assertIn(f'desc="{len(context.captured_queries)} queries"', timing)
+        self.assertIn('total;dur=', timing)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'PostListAPIView')
+        self.assertEqual(record['db_queries'], len(context.captured_queries))
+
+    def test_external_calls_are_timed_once_when_nested(self):
+        @timed('deepseek')
+        def outer():
+            return inner()
+
+        @timed('deepseek')
+        def inner():
+            return 'ok'
+
+        with mock.patch('django.core.mail.EmailMessage.send',
+                        side_effect=lambda **kwargs: outer()):
+            response = APIClient().post('/api/v1/contact/', {
+                'name': 'Reader', 'email': 'reader@example.com',
+                'subject': 'Hi', 'message': 'Hello there, this is a message.'})
+
+        self.assertEqual(response.status_code, 200)
+        timing = dict(entry.split(';', 1)
+                      for entry in response['Server-Timing'].split(', '))
+        self.assertIn('smtp', timing)
+        self.assertTrue(timing['deepseek'].endswith('desc="1 calls"'))
+
+    def test_slow_sampled_requests_dump_cprofile_stats(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+                PROFILING_SAMPLE_RATE=1, PROFILING_SLOW_MS=0,
+                PROFILING_DUMP_DIR=directory), self.assertLogs('api.core.profiling'):
+            APIClient().get('/api/v1/post/lists/')
+            dumps = os.listdir(directory)
+        self.assertEqual(len(dumps), 1)
+        self.assertIn('PostListAPIView', dumps[0])
+
+    def test_disabled_by_default(self):
+        with override_settings(PROFILING_ENABLED=False):
+            response = APIClient().get('/api/v1/post/lists/')
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email='metrics@example.com', username='metrics')
+        Post.objects.create(user=cls.user, status='Active')
+
+    def scraper(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer secret')
+        return client
+
+    def test_exposes_request_histograms_and_queue_depth(self):
+        Job.objects.enqueue('post', 1, 'en', 'zh', {})
+        client = self.scraper()
+        client.get('/api/v1/post/lists/')
+
+        response = client.get('/metrics')
+        body = response.content.decode()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn(
+            'http_request_duration_seconds_bucket{view="PostListAPIView",method="GET",le="+Inf"}', body)
+        self.assertIn('http_request_db_queries_count{view="PostListAPIView",method="GET"}', body)
+        self.assertIn('jobs_queued{kind="post",status="pending"} 1', body)
+
+    def test_token_usage_and_translation_memory_lookups(self):
+        usage = mock.Mock(prompt_tokens=12, completion_tokens=30)
+        reply = mock.Mock(choices=[mock.Mock(message=mock.Mock(content='Hello'))], usage=usage)
+        before = metrics_registry.render()
+        with mock.patch.object(blog_translation.client.chat.completions, 'create',
+                               return_value=reply):
+            blog_translation.call_openai_translate('指标测试文本', 'en', 'zh')
+        after = metrics_registry.render()
+
+        def value(body, sample):
+            for line in body.splitlines():
+                if line.startswith(sample + ' '):
+                    return float(line.rsplit(' ', 1)[1])
+            return 0.0
+
+        self.assertEqual(value(after, 'deepseek_tokens_total{type="completion"}') -
+                         value(before, 'deepseek_tokens_total{type="completion"}'), 30)
+        self.assertEqual(value(after, 'translation_memory_lookups_total{result="miss"}') -
+                         value(before, 'translation_memory_lookups_total{result="miss"}'), 1)
+        self.assertEqual(
+            value(after, 'deepseek_request_duration_seconds_count{operation="text"}') -
+            value(before, 'deepseek_request_duration_seconds_count{operation="text"}'), 1)
+
+    def test_multiprocess_directory_is_aggregated(self):
+        # 本进程之前的测试可能已有上传计数，这里只统计其他进程写出的
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_MULTIPROC_DIR=directory), \
+                mock.patch.dict(OSS_LATENCY._values, clear=True):
+            # 模拟另一个容器中 worker 进程写出的计数
+            with open(os.path.join(directory, 'metrics-worker-1.json'), 'w') as f:
+                json.dump({'oss_operation_duration_seconds': {
+                    '["upload"]': [1] + [0] * 11 + [0.004]}}, f)
+            metrics_registry.flush()
+            body = self.scraper().get('/metrics').content.decode()
+
+        self.assertIn('oss_operation_duration_seconds_count{operation="upload"} 1', body)
+        self.assertIn('oss_operation_duration_seconds_bucket{operation="upload",le="0.005"} 1', body)
+
+    def test_files_of_exited_local_processes_are_pruned(self):
+        exited = subprocess.Popen(['true'])
+        exited.wait()
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_MULTIPROC_DIR=directory), \
+                mock.patch.dict(OSS_LATENCY._values, clear=True):
+            for name in (f'metrics-{metrics_hostname}-{exited.pid}.json',
+                         f'metrics-{metrics_hostname}-{os.getppid()}.json'):
+                with open(os.path.join(directory, name), 'w') as f:
+                    json.dump({'oss_operation_duration_seconds': {
+                        '["upload"]': [1] + [0] * 11 + [0.004]}}, f)
+            body = self.scraper().get('/metrics').content.decode()
+            remaining = sorted(os.listdir(directory))
+
+        self.assertIn('oss_operation_duration_seconds_count{operation="upload"} 1', body)
+        self.assertEqual(remaining, sorted([
+            f'metrics-{metrics_hostname}-{os.getppid()}.json',
+            f'metrics-{metrics_hostname}-{os.getpid()}.json']))
+
+    def test_token_required_when_configured(self):
+        client = APIClient()
+        self.assertEqual(client.get('/metrics').status_code, 403)
+        client.credentials(HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(client.get('/metrics').status_code, 403)
+        self.assertEqual(self.scraper().get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_closed_without_token_unless_debug(self):
+        self.assertEqual(APIClient().get('/metrics').status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(APIClient().get('/metrics').status_code, 200)
+
+
+class OSSClientManagerTests(TestCase):
+    def setUp(self):
+        env = mock.patch.dict(os.environ, {
+            'OSS_ACCESS_KEY_ID': 'key-1', 'OSS_ACCESS_KEY_SECRET': 'secret'})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_client_is_shared_until_fork(self):
+        manager = OSSClientManager()
+        client = manager.get_client()
+        self.assertIs(manager.get_client(), client)
+
+        manager._after_fork()
+        self.assertIsNot(manager.get_client(), client)
+
+    def test_static_access_key_from_environment(self):
+        provider = OSSClientManager().build_credentials_provider()
+        self.assertEqual(provider.get_credentials().access_key_id, 'key-1')
+
+    def test_credentials_chain_supplies_refreshed_sts_credentials(self):
+        issued = [
+            mock.Mock(access_key_id=f'sts-{i}', access_key_secret='secret',
+                      security_token=f'token-{i}')
+            for i in range(2)
+        ]
+        with mock.patch.dict(os.environ, {'OSS_ACCESS_KEY_ID': ''}), \
+                mock.patch('api.oss.client.CredentialsClient') as chain:
+            chain.return_value.get_credential.side_effect = issued
+            provider = OSSClientManager().build_credentials_provider()
+            first, second = provider.get_credentials(), provider.get_credentials()
+
+        # 每次签名都向凭证链取凭证，凭证链过期前换发的新凭证立即生效
+        self.assertEqual((first.access_key_id, first.security_token), ('sts-0', 'token-0'))
+        self.assertEqual((second.access_key_id, second.security_token), ('sts-1', 'token-1'))
+
+    def test_benchmark_reuses_connections(self):
+        out = io.StringIO()
+        call_command('benchmark_oss', requests=5, concurrency=1,
+                     handshake_ms=0, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].endswith('新建连接 10'))
+        self.assertTrue(lines[1].endswith('新建连接 1'))
+
+    def test_benchmark_streams_large_upload_in_parts(self):
+        out = io.StringIO()
+        with mock.patch.dict(os.environ, {'OSS_UPLOAD_PART_SIZE': str(512 * 1024)}):
+            call_command('benchmark_oss', requests=1, concurrency=1, handshake_ms=0,
+                         upload_mb=4, stdout=out)
+        legacy, stream = out.getvalue().splitlines()[2:4]
+        legacy_peak = float(legacy.split('峰值内存 ')[1].split()[0])
+        stream_peak = float(stream.split('峰值内存 ')[1].split()[0])
+        self.assertGreaterEqual(legacy_peak, 4)
+        self.assertLess(stream_peak, 2)
+
+
+class FakeOSSClient:
+    """记录批量删除调用；fail_keys 中的对象删除失败，batch_error 模拟批量接口不可用"""
+
+    def __init__(self, fail_keys=(), skip_keys=(), batch_error=None, objects=(), blobs=None):
+        self.objects = list(objects)
+        self.blobs = dict(blobs or {})
+        self.fail_keys = set(fail_keys)
+        self.skip_keys = set(skip_keys)
+        self.batch_error = batch_error
+        self.batches = []
+        self.single_deletes = []
+        self.lock = threading.Lock()
+
+    def delete_multiple_objects(self, request):
+        if self.batch_error:
+            raise self.batch_error
+        keys = [item.key for item in request.objects]
+        self.batches.append(keys)
+        return mock.Mock(deleted_objects=[
+            mock.Mock(key=key) for key in keys
+            if key not in self.fail_keys and key not in self.skip_keys])
+
+    def list_objects_v2_paginator(self):
+        pages = [self.objects[i:i + 2] for i in range(0, len(self.objects), 2)]
+        return mock.Mock(iter_page=lambda request: [
+            mock.Mock(contents=[obj for obj in page if obj.key.startswith(request.prefix)])
+            for page in pages])
+
+    def put_object(self, request):
+        return mock.Mock(etag='"etag"')
+
+    def uploader(self, **options):
+        return mock.Mock(upload_from=lambda request, reader: mock.Mock(etag='"etag"'))
+
+    def head_object(self, request):
+        if request.key not in self.blobs:
+            raise RuntimeError('Http Status Code: 404.')
+        return mock.Mock(content_length=len(self.blobs[request.key]), etag='"blob"',
+                         last_modified=None)
+
+    def get_object(self, request):
+        data = self.blobs[request.key]
+        return mock.Mock(body=mock.Mock(iter_bytes=lambda block_size: [
+            data[i:i + block_size] for i in range(0, len(data), block_size)]))
+
+    def delete_object(self, request):
+        with self.lock:
+            self.single_deletes.append(request.key)
+        if request.key in self.fail_keys:
+            raise RuntimeError('AccessDenied')
+        if request.key.startswith('gone/'):
+            raise RuntimeError('NoSuchKey')
+
+
+class OSSBatchDeleteTests(TestCase):
+    def delete(self, client, keys):
+        with mock.patch.object(oss_utils, 'get_oss_client', return_value=client), \
+                mock.patch('builtins.print'):
+            return oss_utils.delete_files_from_oss_batch(keys)
+
+    def test_deletes_in_chunks_of_1000_without_cap(self):
+        client = FakeOSSClient()
+        keys = [f'uploads/{i}.jpg' for i in range(2500)]
+        result = self.delete(client, keys + keys[:10])
+
+        self.assertEqual([len(batch) for batch in client.batches], [1000, 1000, 500])
+        self.assertEqual(client.single_deletes, [])
+        self.assertEqual(result['total_requested'], 2510)
+        self.assertEqual(result['total_deleted'], 2500)
+        self.assertEqual(result['failed'], [])
+
+    def test_unconfirmed_keys_are_retried_individually(self):
+        client = FakeOSSClient(skip_keys=['uploads/b.jpg'], fail_keys=['uploads/c.jpg'])
+        result = self.delete(client, ['uploads/a.jpg', 'uploads/b.jpg', 'uploads/c.jpg'])
+
+        self.assertCountEqual(client.single_deletes, ['uploads/b.jpg', 'uploads/c.jpg'])
+        self.assertCountEqual(result['deleted'], ['uploads/a.jpg', 'uploads/b.jpg'])
+        self.assertEqual(result['failed'], [{'key': 'uploads/c.jpg', 'error': 'AccessDenied'}])
+
+    def test_falls_back_to_single_deletes_when_batch_api_fails(self):
+        client = FakeOSSClient(batch_error=RuntimeError('MethodNotAllowed'))
+        result = self.delete(client, ['uploads/a.jpg', 'gone/b.jpg'])
+
+        self.assertCountEqual(client.single_deletes, ['uploads/a.jpg', 'gone/b.jpg'])
+        self.assertEqual(result['total_deleted'], 2)
+        self.assertEqual(result['total_failed'], 0)
+
+
+def oss_listing(key, minutes_ago):
+    return mock.Mock(key=key, size=100, etag='"e"',
+                     last_modified=datetime(2026, 1, 1, 12, 0, tzinfo=dt_timezone.utc) -
+                     timedelta(minutes=minutes_ago))
+
+
+class OSSCatalogTests(TestCase):
+    def setUp(self):
+        self.client_stub = FakeOSSClient(objects=[
+            oss_listing('uploads/', 0),
+            oss_listing('uploads/gallery/cat.jpg', 1),
+            oss_listing('uploads/gallery/dog.png', 2),
+            oss_listing('uploads/notes.txt', 3),
+            oss_listing('uploads/cat-2.webp', 4),
+        ])
+        patcher = mock.patch.object(
+            oss_clients, 'get_client', return_value=self.client_stub)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reconcile_upserts_and_removes_stale_objects(self):
+        OSSObject.objects.create(key='uploads/deleted.jpg', last_modified=datetime.now(dt_timezone.utc))
+        out = io.StringIO()
+        call_command('reconcile_oss_catalog', stdout=out)
+
+        self.assertIn('共 4 个对象，新增 4，删除 1', out.getvalue())
+        cat = OSSObject.objects.get(key='uploads/gallery/cat.jpg')
+        self.assertEqual((cat.directory, cat.is_image), ('uploads/gallery', True))
+        self.assertFalse(OSSObject.objects.get(key='uploads/notes.txt').is_image)
+
+    def test_listing_is_served_from_catalog(self):
+        call_command('reconcile_oss_catalog', stdout=io.StringIO())
+        self.client_stub.list_objects_v2_paginator = mock.Mock(
+            side_effect=AssertionError('bucket should not be listed'))
+
+        with self.assertNumQueries(3):
+            response = APIClient().get('/api/v1/oss/images/list/',
+                                       {'search': 'CAT', 'page': 2, 'page_size': 1})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['total_pages'], 2)
+        entry = response.data['results'][0]
+        self.assertEqual(entry['name'], 'uploads/cat-2.webp')
+        self.assertEqual(entry['directoryName'], 'uploads')
+
+        # 与从 bucket 列举时一致，匹配整个 key 的子串
+        response = APIClient().get('/api/v1/oss/images/list/', {'search': 'gallery/'})
+        self.assertEqual(response.data['count'], 2)
+        del self.client_stub.list_objects_v2_paginator
+        bucket = oss_utils.list_files_from_bucket('uploads/', 'gallery/')
+        self.assertEqual(bucket['count'], 2)
+
+    def test_catalog_is_used_only_after_reconcile_completes(self):
+        with mock.patch('builtins.print'):
+            oss_utils.upload_file_to_oss(
+                SimpleUploadedFile('first.jpg', b'x'), directory='uploads/gallery')
+        # 首次上传写入了目录，但目录并不完整，仍从 bucket 列举
+        response = APIClient().get('/api/v1/oss/images/list/')
+        self.assertEqual(response.data['count'], 3)
+
+        call_command('reconcile_oss_catalog', prefix='uploads/gallery/', stdout=io.StringIO())
+        self.assertTrue(catalog_ready('uploads/gallery/'))
+        self.assertFalse(catalog_ready('uploads/'))
+
+        call_command('reconcile_oss_catalog', stdout=io.StringIO())
+        self.assertTrue(catalog_ready('uploads/'))
+
+    @override_settings(OSS_CATALOG_MAX_AGE=3600, OSS_CATALOG_RECONCILE_INTERVAL=600)
+    def test_stale_catalog_falls_back_to_bucket_until_reconciled(self):
+        call_command('reconcile_oss_catalog', stdout=io.StringIO())
+        self.assertIsNone(reconcile_if_due(self.client_stub, 'test-bucket'))
+
+        OSSCatalogSync.objects.update(completed_at=timezone.now() - timedelta(hours=2))
+        self.assertFalse(catalog_ready('uploads/'))
+
+        # STS 直传的对象只出现在 bucket 中，下一次定期对账后进入目录
+        self.client_stub.objects.append(oss_listing('uploads/direct.jpg', 5))
+        result = reconcile_if_due(self.client_stub, 'test-bucket')
+        self.assertEqual(result['added'], 1)
+        self.assertTrue(catalog_ready('uploads/'))
+        self.assertTrue(OSSObject.objects.filter(key='uploads/direct.jpg').exists())
+
+    def test_upload_and_delete_keep_catalog_in_sync(self):
+        with mock.patch('builtins.print'):
+            result = oss_utils.upload_file_to_oss(
+                SimpleUploadedFile('photo.jpg', b'x' * 10), directory='uploads/gallery')
+            row = OSSObject.objects.get(key=result['object_key'])
+            self.assertEqual((row.size, row.etag), (10, '"etag"'))
+
+            oss_utils.delete_file_from_oss(result['object_key'])
+        self.assertFalse(OSSObject.objects.filter(key=result['object_key']).exists())
+
+
+class GalleryDirectUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(
+            email='uploader@example.com', username='uploader',
+            is_staff=True, is_superuser=True)
+
+    def setUp(self):
+        self.client_stub = FakeOSSClient()
+        patcher = mock.patch.object(
+            oss_clients, 'get_client', return_value=self.client_stub)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        credentials = mock.patch.object(oss_clients, 'get_credentials', return_value=mock.Mock(
+            access_key_id='STS.id', access_key_secret='secret', security_token='token'))
+        credentials.start()
+        self.addCleanup(credentials.stop)
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    @override_settings(GALLERY_MAX_UPLOAD_SIZE=5 * 1024 * 1024)
+    @mock.patch.dict(os.environ, {'OSS_BUCKET': 'test-bucket', 'OSS_REGION': 'oss-cn-shanghai'})
+    def test_init_returns_post_policy_limited_to_key_and_size(self):
+        response = self.api.post('/api/v1/gallery/upload/init/',
+                                 {'file_name': '../IMG_0001.JPG', 'content_type': 'image/jpeg'})
+        self.assertEqual(response.status_code, 200)
+        key = response.data['object_key']
+        self.assertRegex(key, r'^uploads/gallery/original/IMG_0001_\w{6}\.jpg$')
+        self.assertEqual(response.data['method'], 'POST')
+        self.assertEqual(response.data['url'], 'https://test-bucket.oss-cn-shanghai.aliyuncs.com')
+
+        fields = response.data['fields']
+        self.assertEqual((fields['key'], fields['Content-Type']), (key, 'image/jpeg'))
+        self.assertEqual(fields['x-oss-security-token'], 'token')
+        self.assertRegex(fields['x-oss-credential'],
+                         r'^STS\.id/\d{8}/cn-shanghai/oss/aliyun_v4_request$')
+        policy = json.loads(base64.b64decode(fields['policy']))
+        self.assertIn(['eq', '$key', key], policy['conditions'])
+        self.assertIn(['content-length-range', 1, 5 * 1024 * 1024], policy['conditions'])
+        self.assertEqual(fields['x-oss-signature'], oss_utils.sign_post_policy(
+            fields['policy'], 'secret', fields['x-oss-date'][:8], 'cn-shanghai'))
+
+        rejected = self.api.post('/api/v1/gallery/upload/init/', {'file_name': 'run.exe'})
+        self.assertEqual(rejected.status_code, 400)
+
+    def test_form_upload_streams_original_and_defers_processing(self):
+        from PIL import Image
+
+        image = io.BytesIO()
+        Image.new('RGB', (640, 480), 'navy').save(image, format='PNG')
+        upload = SimpleUploadedFile('night.png', image.getvalue(), content_type='image/png')
+
+        with mock.patch('api.gallery.utils.create_thumbnail') as thumbnail, \
+                mock.patch('builtins.print'):
+            response = self.api.post('/api/v1/gallery/create/',
+                                     {'file': upload, 'title': 'Night'}, format='multipart')
+
+        thumbnail.assert_not_called()
+        self.assertEqual(response.status_code, 202)
+        photo = Gallery.objects.get(id=response.data['id'])
+        self.assertFalse(photo.is_published)
+        self.assertEqual(photo.thumbnail_url, photo.image_url)
+        job = Job.objects.get(id=response.data['job_id'])
+        self.assertEqual((job.kind, job.object_id), (Job.KIND_GALLERY, photo.id))
+        self.assertRegex(job.payload['object_key'], r'^uploads/gallery/original/night_\w{6}\.png$')
+
+    def test_finalize_enqueues_processing_and_worker_publishes(self):
+        from PIL import Image
+
+        image = io.BytesIO()
+        Image.new('RGB', (1200, 900), 'teal').save(image, format='PNG')
+        key = 'uploads/gallery/original/sea_abc123.png'
+
+        missing = self.api.post('/api/v1/gallery/upload/finalize/',
+                                {'object_key': key}, format='json')
+        self.assertEqual(missing.status_code, 400)
+        outside = self.api.post('/api/v1/gallery/upload/finalize/',
+                                {'object_key': 'uploads/other.png'}, format='json')
+        self.assertEqual(outside.status_code, 400)
+
+        self.client_stub.blobs[key] = image.getvalue()
+        response = self.api.post('/api/v1/gallery/upload/finalize/',
+                                 {'object_key': key, 'title': 'Sea'}, format='json')
+        self.assertEqual(response.status_code, 202)
+        photo = Gallery.objects.get(id=response.data['id'])
+        self.assertFalse(photo.is_published)
+        self.assertTrue(OSSObject.objects.filter(key=key).exists())
+        job = Job.objects.get(id=response.data['job_id'])
+        self.assertEqual((job.kind, job.object_id), (Job.KIND_GALLERY, photo.id))
+
+        duplicate = self.api.post('/api/v1/gallery/upload/finalize/',
+                                  {'object_key': key, 'title': 'Sea'}, format='json')
+        self.assertEqual((duplicate.status_code, duplicate.data['id']), (409, photo.id))
+        self.assertEqual(Gallery.objects.count(), 1)
+
+        # 任务执行前管理员修改的字段不会被任务覆盖
+        Gallery.objects.filter(id=photo.id).update(title='Edited', tags=['sea'])
+        with mock.patch('builtins.print'):
+            JobWorker(workers=1).run_pending()
+
+        job.refresh_from_db()
+        photo.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertTrue(photo.is_published)
+        self.assertEqual((photo.title, photo.tags), ('Edited', ['sea']))
+        self.assertEqual(photo.photo_properties['width'], 1200)
+        self.assertTrue(photo.thumbnail_url.endswith(
+            f'uploads/gallery/thumbnails/gallery-{photo.id}.jpg'))
+
+        # 重试时覆盖同一个缩略图对象
+        with mock.patch('builtins.print'):
+            process_uploaded_photo(photo, key)
+        self.assertEqual(Gallery.objects.get(id=photo.id).thumbnail_url, photo.thumbnail_url)
+
+
+class STSCredentialsCacheTests(SimpleTestCase):
+    def credentials(self, index):
+        return {'AccessKeyId': f'STS.{index}', 'AccessKeySecret': 'secret',
+                'SecurityToken': 'token', 'Expiration': '2026-10-17T00:15:00Z'}
+
+    def test_concurrent_callers_share_one_assume_role(self):
+        cache = STSCredentialsCache()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return self.credentials(len(calls))
+
+        with mock.patch.object(cache, 'fetch', side_effect=fetch):
+            threads = [threading.Thread(target=cache.get) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(cache.get()['AccessKeyId'], 'STS.1')
+        self.assertEqual(len(calls), 1)
+
+    def test_refreshes_ahead_of_expiry_and_keeps_valid_credentials_on_error(self):
+        cache = STSCredentialsCache()
+        now = [1000.0]
+        fetch = mock.Mock(side_effect=[
+            self.credentials(1), RuntimeError('STS unavailable'), self.credentials(2)])
+
+        with mock.patch.object(cache, 'fetch', fetch), \
+                mock.patch('api.oss.sts.time.monotonic', lambda: now[0]), \
+                mock.patch('builtins.print'):
+            cache.get()
+            now[0] += 599
+            self.assertEqual(cache.get()['AccessKeyId'], 'STS.1')
+            self.assertEqual(fetch.call_count, 1)
+
+            # 进入提前刷新窗口：刷新失败仍返回旧凭证，下次再刷新
+            now[0] += 2
+            self.assertEqual(cache.get()['AccessKeyId'], 'STS.1')
+            self.assertEqual(cache.get()['AccessKeyId'], 'STS.2')
+        self.assertEqual(fetch.call_count, 3)
+
+    def test_view_serves_cached_credentials(self):
+        sts_credentials.reset()
+        self.addCleanup(sts_credentials.reset)
+        with mock.patch.object(sts_credentials, 'fetch',
+                               return_value=self.credentials(1)) as fetch:
+            for _ in range(3):
+                response = APIClient().get('/api/v1/oss/credentials/')
+                self.assertEqual(response.data['AccessKeyId'], 'STS.1')
+        self.assertEqual(fetch.call_count, 1)
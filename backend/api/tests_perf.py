@@ -0,0 +1,379 @@
+"""
+接口性能预算测试：批量生成数据，逐个请求所有 GET 接口，检查查询数和 p95 延迟
+
+只在测试中使用，由 manage.py test api 一并执行。默认只检查查询数；
+p95 延迟依赖机器性能，设置 PERF_LATENCY=1 时才检查。
+"""
+import gc
+import json
+import math
+import os
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import DurationField, ExpressionWrapper, F, Value
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.blog.models import Bookmark, Category, Comment, Notification, Post, PostTranslation
+from api.blog.stats import rebuild_author_stats
+from api.core.models import User
+from api.gallery.models import Gallery
+from api.jobs.models import Job
+from api.oss.catalog import build_catalog_object
+from api.oss.models import OSSCatalogSync, OSSObject
+from api.projects.models import Project, ProjectSkill, ProjectTranslation
+from api.search.index import rebuild_search_index
+
+LANGUAGES = ['zh', 'en', 'ja']
+DEFAULT_SEED_POSTS = 2000
+
+# 每个 GET 接口的查询数上限和 p95 延迟预算（毫秒）
+# 查询数上限与数据量无关，数据量增加后仍然超出说明出现了 N+1
+ENDPOINT_BUDGETS = {
+    'post/category/list/': {
+        'url': 'post/category/list/', 'max_queries': 2, 'p95_ms': 150},
+    'post/category/update/<int:category_id>/': {
+        'url': 'post/category/update/{category_id}/', 'max_queries': 5, 'p95_ms': 100,
+        'auth': True},
+    # 未分页的接口耗时随数据量线性增长，预算按默认数据量设定，
+    # PERF_SEED_POSTS 调大后会先超出预算
+    'post/category/posts/<category_slug>/': {
+        'url': 'post/category/posts/{category_slug}/', 'max_queries': 6, 'p95_ms': 500},
+    'post/lists/': {
+        'url': 'post/lists/', 'max_queries': 6, 'p95_ms': 250},
+    'post/detail/<slug>/': {
+        'url': 'post/detail/{post_slug}/', 'max_queries': 5, 'p95_ms': 150},
+    'author/dashboard/stats/<user_id>/': {
+        'url': 'author/dashboard/stats/{author_id}/', 'max_queries': 5, 'p95_ms': 300},
+    'author/dashboard/comment-list/<user_id>/': {
+        'url': 'author/dashboard/comment-list/{author_id}/', 'max_queries': 2, 'p95_ms': 500},
+    'author/dashboard/noti-list/<user_id>/': {
+        'url': 'author/dashboard/noti-list/{author_id}/', 'max_queries': 2, 'p95_ms': 250},
+    'author/dashboard/post-detail/<user_id>/<post_id>/': {
+        'url': 'author/dashboard/post-detail/{author_id}/{post_id}/', 'max_queries': 5,
+        'p95_ms': 150},
+    'user/profile/<user_id>/': {
+        'url': 'user/profile/{author_id}/', 'max_queries': 4, 'p95_ms': 100},
+    'cache/stats/': {
+        'url': 'cache/stats/', 'max_queries': 0, 'p95_ms': 100, 'auth': True},
+    'gallery/list/': {
+        'url': 'gallery/list/', 'max_queries': 3, 'p95_ms': 250},
+    'gallery/detail/<slug:slug>/': {
+        'url': 'gallery/detail/{photo_slug}/', 'max_queries': 2, 'p95_ms': 100},
+    # 不传 per_year 时返回全部照片
+    'gallery/timeline/': {
+        'url': 'gallery/timeline/', 'max_queries': 2, 'p95_ms': 600},
+    'gallery/timeline/<int:year>/': {
+        'url': 'gallery/timeline/{year}/', 'max_queries': 2, 'p95_ms': 300},
+    'jobs/': {
+        'url': 'jobs/', 'max_queries': 2, 'p95_ms': 150, 'auth': True},
+    'jobs/<int:job_id>/': {
+        'url': 'jobs/{job_id}/', 'max_queries': 1, 'p95_ms': 100, 'auth': True},
+    'translation/jobs/': {
+        'url': 'translation/jobs/', 'max_queries': 2, 'p95_ms': 150, 'auth': True},
+    'translation/jobs/<int:job_id>/': {
+        'url': 'translation/jobs/{job_id}/', 'max_queries': 1, 'p95_ms': 100, 'auth': True},
+    'projects/list/': {
+        'url': 'projects/list/', 'max_queries': 4, 'p95_ms': 250},
+    'projects/detail/<slug:project_slug>/': {
+        'url': 'projects/detail/{project_slug}/', 'max_queries': 4, 'p95_ms': 150},
+    'projects/skill/list/': {
+        'url': 'projects/skill/list/', 'max_queries': 2, 'p95_ms': 150},
+    'projects/skill/<int:skill_id>/': {
+        'url': 'projects/skill/{skill_id}/', 'max_queries': 1, 'p95_ms': 100, 'auth': True},
+    'search/': {
+        'url': 'search/?q=cache', 'max_queries': 2, 'p95_ms': 300},
+    'oss/images/list/': {
+        'url': 'oss/images/list/?search=perf&page=3', 'max_queries': 3, 'p95_ms': 150},
+}
+
+# 有 GET 但不纳入预算的接口及原因
+SKIPPED_ROUTES = {
+    'oss/credentials/': '请求阿里云 STS，耗时取决于外部服务',
+}
+
+
+def iter_api_routes(patterns=None, prefix=''):
+    """遍历 api.urls 中的路由，产出 (路由字符串, 视图类)"""
+    if patterns is None:
+        patterns = get_resolver('api.urls').url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_api_routes(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif isinstance(pattern, URLPattern):
+            yield prefix + str(pattern.pattern), getattr(pattern.callback, 'view_class', None)
+
+
+def get_routes():
+    """支持 GET 的全部 API 路由"""
+    return [route for route, view_class in iter_api_routes()
+            if view_class is not None and hasattr(view_class, 'get')]
+
+
+def seed_perf_data(posts=DEFAULT_SEED_POSTS, photos=DEFAULT_SEED_POSTS, projects=20, comments_per_post=3):
+    """
+    批量生成接近线上比例的数据：每篇文章和项目三种语言译文，带点赞、评论、通知
+
+    Returns:
+        dict: 用于填充 ENDPOINT_BUDGETS 中 url 的参数
+    """
+    author = User.objects.create(email='perf-author@example.com', username='perf-author')
+    readers = [
+        User.objects.create(email=f'perf-reader-{i}@example.com', username=f'perf-reader-{i}')
+        for i in range(10)
+    ]
+    categories = Category.objects.bulk_create([
+        Category(title=f'Category {i}', slug=f'perf-category-{i}', user=author)
+        for i in range(8)
+    ])
+
+    statuses = ['Active'] * 8 + ['Draft', 'Disabled']
+    post_objects = Post.objects.bulk_create([
+        Post(user=author, profile=author.profile, slug=f'perf-post-{i}',
+             category=categories[i % len(categories)],
+             status=statuses[i % len(statuses)], views=i)
+        for i in range(posts)
+    ])
+    # bulk_create 时 date 都是当前时间，按 id 错开
+    Post.objects.filter(user=author).update(date=F('date') - ExpressionWrapper(
+        F('id') * Value(timedelta(hours=5)), output_field=DurationField()))
+
+    content = json.dumps({'type': 'doc', 'content': [
+        {'type': 'paragraph', 'content': [
+            {'type': 'text', 'text': 'Notes on cache invalidation and query planning. ' * 20}]}
+        for _ in range(5)
+    ]})
+    PostTranslation.objects.bulk_create([
+        PostTranslation(post=post, language=language, title=f'Post {post.pk} {language}',
+                        description='A short description about caching', content=content)
+        for post in post_objects for language in LANGUAGES
+    ])
+
+    Likes = Post.likes.through
+    Likes.objects.bulk_create([
+        Likes(post_id=post.pk, user_id=reader.pk)
+        for i, post in enumerate(post_objects)
+        for reader in readers[:i % len(readers)]
+    ])
+    Comment.objects.bulk_create([
+        Comment(post=post, name=f'Reader {j}', email='reader@example.com', comment='Nice')
+        for post in post_objects for j in range(comments_per_post)
+    ])
+    Bookmark.objects.bulk_create([
+        Bookmark(user=readers[i % len(readers)], post=post)
+        for i, post in enumerate(post_objects)
+    ])
+    Notification.objects.bulk_create([
+        Notification(user=author, post=post, type='Like', seen=i % 10 != 0)
+        for i, post in enumerate(post_objects)
+    ])
+
+    now = timezone.now()
+    Gallery.objects.bulk_create([
+        Gallery(slug=f'perf-photo-{i}', title=f'Photo {i}',
+                image_url='https://example.com/photo.jpg',
+                thumbnail_url='https://example.com/thumb.jpg',
+                taken_at=now - timedelta(days=i * 3), uploaded_by=author,
+                category=['street', 'travel'][i % 2])
+        for i in range(photos)
+    ])
+    OSSObject.objects.bulk_create([
+        build_catalog_object(
+            f"uploads/{['gallery', 'posts'][i % 2]}/perf-{i}.{['jpg', 'png', 'txt'][i % 3]}",
+            1024, '"perf"', now - timedelta(minutes=i))
+        for i in range(posts * 5)
+    ])
+    OSSCatalogSync.objects.create(
+        prefix='', objects_count=posts * 5, completed_at=now)
+
+    skills = ProjectSkill.objects.bulk_create([
+        ProjectSkill(name=f'Perf skill {i}', type='Backend') for i in range(10)
+    ])
+    project_objects = Project.objects.bulk_create([
+        Project(created_by=author, slug=f'perf-project-{i}', priority=i % 5)
+        for i in range(projects)
+    ])
+    Skills = Project.skills.through
+    Skills.objects.bulk_create([
+        Skills(project_id=project.pk, projectskill_id=skill.pk)
+        for project in project_objects for skill in skills[:4]
+    ])
+    ProjectTranslation.objects.bulk_create([
+        ProjectTranslation(project=project, language=language, title=f'Project {project.pk}',
+                           subtitle={'start': '2024', 'end': '2025'},
+                           summary='Cache layer for a content site',
+                           what_i_did=[{'title': 'API', 'description': 'Built it', 'icon': 'x'}])
+        for project in project_objects for language in LANGUAGES
+    ])
+
+    job = Job.objects.create(
+        kind=Job.KIND_POST, object_id=post_objects[0].pk,
+        language='en', source_lang='zh')
+
+    # bulk_create 不触发信号，汇总表和搜索索引按线上方式重建
+    rebuild_author_stats()
+    rebuild_search_index()
+    # 刚批量写入的表没有统计信息，规划器会按空表选择执行计划，
+    # 结果取决于 autovacuum 是否恰好执行过，先手动 ANALYZE
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    first_photo = Gallery.objects.get(slug='perf-photo-0')
+    return {
+        'author_id': author.pk,
+        'category_id': categories[0].pk,
+        'category_slug': categories[0].slug,
+        'post_id': post_objects[0].pk,
+        'post_slug': post_objects[0].slug,
+        'photo_slug': first_photo.slug,
+        'year': first_photo.taken_at.year,
+        'job_id': job.pk,
+        'project_slug': project_objects[0].slug,
+        'skill_id': skills[0].pk,
+    }
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def measure_endpoint(client, url, repeat):
+    """
+    请求 repeat 次，返回状态码、最大查询数和延迟分位数
+
+    第一次请求作为预热，不计入延迟。测量前先回收并冻结已有对象，
+    避免测试进程中积累的对象触发的全量 GC 落到某一次请求上。
+    """
+    client.get(url)
+    gc.collect()
+    gc.freeze()
+    latencies, queries, status_code = [], 0, None
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = client.get(url)
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries = max(queries, len(context.captured_queries))
+        status_code = response.status_code
+    gc.unfreeze()
+    return {
+        'status': status_code,
+        'queries': queries,
+        'p50_ms': round(percentile(latencies, 0.5), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+    }
+
+
+def latency_checks_enabled():
+    """是否检查 p95 延迟预算，由 PERF_LATENCY 开启"""
+    return os.environ.get('PERF_LATENCY', '').lower() in ('1', 'true', 'yes')
+
+
+def run_perf_suite(client, admin_client, params, repeat=None, latency_scale=None,
+                   check_latency=None):
+    """
+    按 ENDPOINT_BUDGETS 请求所有接口
+
+    Args:
+        client: 匿名客户端
+        admin_client: 已登录管理员的客户端，用于需要认证的接口
+        params: seed_perf_data 的返回值
+        repeat: 每个接口的请求次数，默认读取 PERF_REPEAT
+        latency_scale: 延迟预算倍数，默认读取 PERF_LATENCY_SCALE，慢机器上调大
+        check_latency: 是否把 p95 延迟计入 passed，默认读取 PERF_LATENCY
+
+    Returns:
+        dict: 报告，endpoints 中每项带 passed 标记
+    """
+    repeat = repeat or int(os.environ.get('PERF_REPEAT', 5))
+    latency_scale = latency_scale or float(os.environ.get('PERF_LATENCY_SCALE', 1))
+    if check_latency is None:
+        check_latency = latency_checks_enabled()
+
+    endpoints = {}
+    for route, budget in ENDPOINT_BUDGETS.items():
+        url = '/api/v1/' + budget['url'].format(**params)
+        result = measure_endpoint(
+            admin_client if budget.get('auth') else client, url, repeat)
+        p95_budget = budget['p95_ms'] * latency_scale
+        result.update({
+            'url': url,
+            'max_queries': budget['max_queries'],
+            'p95_budget_ms': p95_budget,
+            'passed': (
+                result['status'] == 200
+                and result['queries'] <= budget['max_queries']
+                and (not check_latency or result['p95_ms'] <= p95_budget)
+            ),
+        })
+        endpoints[route] = result
+
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'repeat': repeat,
+        'latency_scale': latency_scale,
+        'latency_checked': check_latency,
+        'volumes': {
+            'posts': Post.objects.count(),
+            'post_translations': PostTranslation.objects.count(),
+            'likes': Post.likes.through.objects.count(),
+            'comments': Comment.objects.count(),
+            'photos': Gallery.objects.count(),
+            'projects': Project.objects.count(),
+        },
+        'endpoints': endpoints,
+    }
+
+
+def write_report(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False, VIEW_COUNT_FLUSH_INTERVAL=0,
+                   VIEW_COUNT_DEDUP_WINDOW=0)
+class EndpointBudgetTests(TestCase):
+    """
+    所有 GET 接口的查询数上限和 p95 延迟预算
+
+    默认只断言状态码和查询数；p95 延迟受 CI 机器负载影响，设置 PERF_LATENCY=1
+    （可配合 PERF_LATENCY_SCALE）时才断言，报告中始终记录测得的延迟。数据量由 PERF_SEED_POSTS 控制（默认 2000 篇文章，另有同样数量的照片、
+    约 9000 个点赞、6000 条评论和 10000 个 OSS 对象），设为 200 可快速检查查询数；
+    设置 PERF_REPORT 时把 JSON 报告写到该路径。
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        posts = int(os.environ.get('PERF_SEED_POSTS', DEFAULT_SEED_POSTS))
+        cls.params = seed_perf_data(posts=posts, photos=posts)
+        cls.admin = User.objects.create(
+            email='perf-admin@example.com', username='perf-admin',
+            is_staff=True, is_superuser=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_every_get_route_has_a_budget(self):
+        missing = [route for route in get_routes()
+                   if route not in ENDPOINT_BUDGETS
+                   and route not in SKIPPED_ROUTES]
+        self.assertEqual(missing, [])
+
+    def test_endpoints_stay_within_budget(self):
+        admin_client = APIClient()
+        admin_client.force_authenticate(self.admin)
+        report = run_perf_suite(APIClient(), admin_client, self.params)
+
+        if os.environ.get('PERF_REPORT'):
+            write_report(report, os.environ['PERF_REPORT'])
+
+        failures = {route: result for route, result in report['endpoints'].items()
+                    if not result['passed']}
+        self.assertEqual(failures, {}, json.dumps(failures, indent=2))
@@ -19,4 +19,10 @@ urlpatterns = [
 
     # 发送邮件
     path('', include('api.contact.urls')),
+
+    # 后台任务
+    path('', include('api.jobs.urls')),
+
+    # 全文搜索
+    path('', include('api.search.urls')),
 ]
@@ -56,6 +56,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # 请求级性能分析，PROFILING_ENABLED=true 时生效，放在最外层以覆盖整个请求
+    'api.core.profiling.ProfilingMiddleware',
+    # Prometheus 指标：各视图耗时和 SQL 数量
+    'api.core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -203,6 +207,95 @@ CORS_ALLOWED_ORIGINS = [
 
 AUTH_USER_MODEL = 'api.User'
 
+# 缓存配置：CACHE_BACKEND 可选 locmem（默认）、file、redis（需要安装 redis 包）
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'website',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# 公开接口响应缓存：写入时提升命名空间版本号使缓存失效，版本号必须放在所有进程
+# 共享的缓存（redis / file）中。locmem 只能让当前进程的缓存失效，任务 worker 和
+# 其他 gunicorn worker 的写入之后仍会返回旧数据，因此 locmem 下默认关闭，
+# 即使设置 RESPONSE_CACHE_ENABLED=true 也不生效；单进程开发环境可设置
+# RESPONSE_CACHE_ALLOW_LOCMEM=true 强制开启
+RESPONSE_CACHE_ENABLED = os.getenv(
+    'RESPONSE_CACHE_ENABLED', 'false' if CACHE_BACKEND == 'locmem' else 'true') == 'true'
+RESPONSE_CACHE_ALLOW_LOCMEM = os.getenv('RESPONSE_CACHE_ALLOW_LOCMEM', 'false') == 'true'
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+
+# 浏览量缓冲：写回间隔（秒，0 表示只通过 flush_view_counts 命令写回）
+# 和同一访客的去重窗口（秒，0 表示不去重）。CACHE_BACKEND=redis 时由任务 worker 写回；
+# 其他后端的缓冲区不跨进程（文件缓存的 incr 也不是原子的），由各 web 进程的后台线程写回
+VIEW_COUNT_FLUSH_INTERVAL = int(os.getenv('VIEW_COUNT_FLUSH_INTERVAL', 60))
+VIEW_COUNT_DEDUP_WINDOW = int(os.getenv('VIEW_COUNT_DEDUP_WINDOW', 0))
+# Redis 下是否缓冲：auto 按 maxmemory-policy 判断（noeviction、volatile-* 才缓冲，
+# 否则每次浏览直接写库），on / off 强制开启或关闭
+VIEW_COUNT_BUFFER = os.getenv('VIEW_COUNT_BUFFER', 'auto')
+
+# OSS 对象目录：任务 worker 每 OSS_CATALOG_RECONCILE_INTERVAL 秒与 bucket 对账一次
+# （0 表示只通过 reconcile_oss_catalog 命令对账）；最近一次对账早于 OSS_CATALOG_MAX_AGE 秒
+# （0 表示不过期）时目录视为过期，列表和搜索回退到从 bucket 列举
+OSS_CATALOG_RECONCILE_INTERVAL = int(os.getenv('OSS_CATALOG_RECONCILE_INTERVAL', 3600))
+OSS_CATALOG_MAX_AGE = int(os.getenv('OSS_CATALOG_MAX_AGE', 6 * 3600))
+
+# 请求级性能分析：Server-Timing 响应头和 JSON 日志
+# 按 PROFILING_SAMPLE_RATE（0-1）抽样用 cProfile 运行，
+# 耗时超过 PROFILING_SLOW_MS 毫秒的请求写入 PROFILING_DUMP_DIR
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false') == 'true'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_SLOW_MS = int(os.getenv('PROFILING_SLOW_MS', 500))
+PROFILING_DUMP_DIR = os.getenv(
+    'PROFILING_DUMP_DIR', os.path.join(BASE_DIR, 'profiles'))
+
+# 图库原图大小上限（字节）。超过 FILE_UPLOAD_MAX_MEMORY_SIZE（默认 2.5MB）的上传
+# 由 Django 写入临时文件，再分片流式上传到 OSS；EXIF 和缩略图由 gallery 任务在任务
+# worker 中处理，web 进程不解码图片，上限调大不会增加 web worker 内存占用
+GALLERY_MAX_UPLOAD_SIZE = int(os.getenv('GALLERY_MAX_UPLOAD_SIZE', 100 * 1024 * 1024))
+
+# Prometheus 指标（/metrics）：多进程部署时设置 METRICS_MULTIPROC_DIR 为各进程共享的目录，
+# 每个进程至多每 METRICS_FLUSH_INTERVAL 秒写出一次计数；抓取需带 Bearer METRICS_TOKEN，
+# 未设置 METRICS_TOKEN 时只在 DEBUG 下开放
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true') == 'true'
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR') or None
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # 每行一个 JSON，便于日志系统解析
+        'api.core.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 # 邮件配置
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'  # 使用Gmail，也可以用其他邮箱服务
@@ -23,6 +23,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from api.core.metrics import metrics_view
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Website Backend APIs",
@@ -42,4 +44,5 @@ urlpatterns = [
          name="schema-swagger-ui"),
     path('admin/', admin.site.urls),
     path('api/v1/', include('api.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]